@@ -0,0 +1,104 @@
+"""Checks that concurrent writers of a cache file lose no entries.
+
+PROCESSES processes with THREADS threads each set their own keys of a
+single JSON cache file, the file has to contain all of them afterwards.
+With --coarse-stat the modification time of the file is rounded to
+2 seconds and the inode is ignored, as on FAT file systems of flash
+drives, so that changes of other processes are not seen in the stat.
+
+It exits with 1 if entries are missing.
+
+    python benchmarks/cache_concurrency.py [--coarse-stat] [--ref REV]
+"""
+
+from __future__ import print_function
+
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import common
+
+PROCESSES = 6
+THREADS = 4
+KEYS = 200
+FILENAME = "concurrency.json"
+
+
+def coarse_stat():
+    """Rounds the mtime of cache files to 2 seconds, without inodes."""
+    import livecli.cache
+
+    file_stat = livecli.cache.CacheFile._file_stat
+
+    def _file_stat(self):
+        stat = file_stat(self)
+        if stat is None:
+            return None
+
+        return (int(stat[0]) // 2 * 2, stat[1], 0)
+
+    livecli.cache.CacheFile._file_stat = _file_stat
+
+
+def writer(num, coarse):
+    # Imported here, XDG_CACHE_HOME is set by the parent
+    import livecli.cache
+
+    if coarse:
+        coarse_stat()
+
+    cache = livecli.cache.Cache(FILENAME, key_prefix="p{0}".format(num))
+
+    def set_keys(thread):
+        for i in range(KEYS):
+            cache.set("t{0}-{1}".format(thread, i), i)
+            if i % 50 == 0:
+                time.sleep(0.3)
+
+    threads = [threading.Thread(target=set_keys, args=(thread,))
+               for thread in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if hasattr(livecli.cache, "flush"):
+        livecli.cache.flush()
+
+
+def benchmark():
+    coarse = "--coarse-stat" in sys.argv
+    tempdir = tempfile.mkdtemp(prefix="benchmark-")
+    os.environ["XDG_CACHE_HOME"] = tempdir
+    try:
+        start = time.time()
+        processes = [multiprocessing.Process(target=writer, args=(num, coarse))
+                     for num in range(PROCESSES)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.time() - start
+
+        with open(os.path.join(tempdir, "livecli", FILENAME)) as fd:
+            entries = json.load(fd)
+    finally:
+        shutil.rmtree(tempdir)
+
+    expected = PROCESSES * THREADS * KEYS
+    print("{0} of {1} entries in {2:.1f} s{3}".format(
+        len(entries), expected, elapsed, ", coarse stat" if coarse else ""))
+
+    if len(entries) != expected:
+        print("FAIL: {0} entries were lost".format(expected - len(entries)))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    common.main(benchmark)
@@ -0,0 +1,75 @@
+"""Operations per second of livecli.cache.Cache, for every backend.
+
+A cache of ENTRIES entries the size of a plugin token is read and
+written the way plugins do, the pending writes are flushed at the end
+and counted with the sets.
+
+    python benchmarks/cache_ops.py [--ref REV]
+"""
+
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import time
+
+import common
+
+ENTRIES = 200
+OPERATIONS = 2000
+
+
+class Session(object):
+    """Selects the backend like the cache-backend option does."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get_option(self, key):
+        return self.backend if key == "cache-backend" else None
+
+
+def ops_per_second(func, flush):
+    start = time.time()
+    for i in range(OPERATIONS):
+        func(i)
+    flush()
+    return OPERATIONS / (time.time() - start)
+
+
+def run(cache_module, backend):
+    filename = "{0}.json".format(backend)
+    if hasattr(cache_module, "backends"):
+        cache = cache_module.Cache(filename, key_prefix="benchmark",
+                                   session=Session(backend))
+    else:
+        cache = cache_module.Cache(filename, key_prefix="benchmark")
+
+    flush = getattr(cache_module, "flush", lambda: None)
+    for i in range(ENTRIES):
+        cache.set("key{0}".format(i), {"token": "x" * 64, "num": i})
+    flush()
+
+    gets = ops_per_second(lambda i: cache.get("key{0}".format(i % ENTRIES)), flush)
+    sets = ops_per_second(lambda i: cache.set("key{0}".format(i % ENTRIES),
+                                              {"token": "y" * 64, "num": i}), flush)
+
+    print("{0:6s}:  get {1:9.0f} ops/s  set {2:9.0f} ops/s".format(backend, gets, sets))
+
+
+def benchmark():
+    tempdir = tempfile.mkdtemp(prefix="benchmark-")
+    # Read by livecli.cache when it is imported
+    os.environ["XDG_CACHE_HOME"] = tempdir
+    try:
+        import livecli.cache
+
+        for backend in sorted(getattr(livecli.cache, "backends", ["json"])):
+            run(livecli.cache, backend)
+    finally:
+        shutil.rmtree(tempdir)
+
+
+if __name__ == "__main__":
+    common.main(benchmark)
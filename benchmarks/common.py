@@ -0,0 +1,70 @@
+"""Helpers of the benchmark scripts.
+
+The scripts are run from any directory with the Python of the box,
+they import the packages of this repository from source/:
+
+    python benchmarks/ringbuffer.py
+    python benchmarks/ringbuffer.py --ref 762ae1b
+
+With --ref the script is run a second time against the packages of
+that git revision, so that the numbers can be compared side by side.
+"""
+
+from __future__ import print_function
+
+import glob
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Set by run_ref() to the tree extracted from a git revision
+TREE = os.environ.get("BENCHMARK_TREE", ROOT)
+
+sys.path[0:0] = sorted(glob.glob(os.path.join(TREE, "source", "*", "usr", "lib",
+                                              "python2.7", "site-packages")))
+
+
+def label():
+    return os.environ.get("BENCHMARK_REF", "working tree")
+
+
+def run_ref(ref):
+    """Runs the calling script against the packages of ref."""
+    tree = tempfile.mkdtemp(prefix="benchmark-")
+    try:
+        archive = subprocess.check_output(["git", "archive", ref, "source"], cwd=ROOT)
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            tar.extractall(tree)
+
+        env = dict(os.environ, BENCHMARK_TREE=tree, BENCHMARK_REF=ref)
+        args = [arg for arg in sys.argv[1:] if arg not in ("--ref", ref)]
+        # A failing check of the old revision is reported by the
+        # script itself, the working tree is run anyway
+        subprocess.call([sys.executable, sys.argv[0]] + args, env=env)
+    finally:
+        shutil.rmtree(tree)
+
+
+def main(benchmark):
+    """Runs benchmark(), and with --ref REF first against REF."""
+    if "--ref" in sys.argv[1:-1] and "BENCHMARK_TREE" not in os.environ:
+        run_ref(sys.argv[sys.argv.index("--ref") + 1])
+        print()
+
+    print("== {0} (Python {1})".format(label(), sys.version.split()[0]))
+    benchmark()
+
+
+def per_call(func, number):
+    """Returns the seconds per call of func."""
+    start = time.time()
+    for _ in range(number):
+        func()
+    return (time.time() - start) / number
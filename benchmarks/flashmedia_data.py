@@ -0,0 +1,101 @@
+"""Synthetic FLV and F4V data for the flashmedia benchmarks, no recorded
+streams ship with the repository. The data is the same on every run.
+
+A stream has an onMetaData tag, the AAC and AVC sequence headers and
+then interleaved audio and video tags, with a keyframe every 30 video
+tags, like an HDS fragment or FLV file of a 30 fps live stream. A
+bootstrap has one segment run per fragment run.
+"""
+
+import random
+
+import common  # noqa: F401
+
+from livecli.packages.flashmedia.box import (Box, BoxPayloadABST, BoxPayloadAFRT,
+                                             BoxPayloadASRT, FragmentRunEntry,
+                                             RawPayload, SegmentRunEntry)
+from livecli.packages.flashmedia.tag import (AACAudioData, AudioData, AVCVideoData,
+                                             Header, ScriptData, Tag, VideoData,
+                                             AUDIO_CODEC_ID_AAC, TAG_TYPE_AUDIO,
+                                             TAG_TYPE_SCRIPT, TAG_TYPE_VIDEO,
+                                             VIDEO_CODEC_ID_AVC)
+from livecli.packages.flashmedia.types import ScriptDataECMAArray
+
+
+def flv_tags(count, seed=0):
+    """Returns the metadata and sequence header tags and count tags."""
+    rng = random.Random(seed)
+    noise = bytes(bytearray(rng.getrandbits(8) for _ in range(8192)))
+
+    def payload(size):
+        offset = rng.randint(0, len(noise) - size)
+        return noise[offset:offset + size]
+
+    metadata = ScriptDataECMAArray([("duration", 0.0), ("width", 1280.0),
+                                    ("height", 720.0), ("framerate", 30.0)])
+    tags = [Tag(TAG_TYPE_SCRIPT, 0, ScriptData("onMetaData", metadata)),
+            Tag(TAG_TYPE_AUDIO, 0, AudioData(AUDIO_CODEC_ID_AAC, 3, 1, 1,
+                                             AACAudioData(0, b"\x12\x10"))),
+            Tag(TAG_TYPE_VIDEO, 0, VideoData(1, VIDEO_CODEC_ID_AVC,
+                                             AVCVideoData(0, 0, payload(40))))]
+
+    timestamp = 0
+    for i in range(count):
+        timestamp += rng.randint(10, 40)
+        if i % 3 == 0:
+            frame_type = 1 if i % 90 == 0 else 2
+            data = VideoData(frame_type, VIDEO_CODEC_ID_AVC,
+                             AVCVideoData(1, 40, payload(rng.randint(500, 6000))))
+            tags.append(Tag(TAG_TYPE_VIDEO, timestamp, data))
+        else:
+            data = AudioData(AUDIO_CODEC_ID_AAC, 3, 1, 1,
+                             AACAudioData(1, payload(rng.randint(100, 400))))
+            tags.append(Tag(TAG_TYPE_AUDIO, timestamp, data))
+
+    return tags
+
+
+def flv_file(count, seed=0):
+    """Returns an FLV file of count tags."""
+    data = bytearray()
+    Header(has_audio=True, has_video=True).serialize(data)
+    for tag in flv_tags(count, seed):
+        data += tag.serialize()
+
+    return bytes(data)
+
+
+def hds_fragment(count, seed=0):
+    """Returns an HDS fragment, afra, moof and the mdat box with count tags."""
+    mdat = bytearray()
+    for tag in flv_tags(count, seed):
+        mdat += tag.serialize()
+
+    data = bytearray()
+    Box("afra", RawPayload(b"\x00" * 64)).serialize(data)
+    Box("moof", RawPayload(b"\x00" * 32)).serialize(data)
+    Box("mdat", RawPayload(bytes(mdat))).serialize(data)
+
+    return bytes(data)
+
+
+def bootstrap(runs, fragments_per_run=10, fragment_duration=4000):
+    """Returns a bootstrap (abst box) of a VOD stream with runs fragment
+       and segment runs, the time scale is 1000."""
+    fragment_runs = [FragmentRunEntry(1 + i * fragments_per_run,
+                                      i * fragments_per_run * fragment_duration,
+                                      fragment_duration, None)
+                     for i in range(runs)]
+    segment_runs = [SegmentRunEntry(1 + i, fragments_per_run) for i in range(runs)]
+    abst = BoxPayloadABST(version=0, bootstrap_info_version=1, profile=0,
+                          live=False, update=False, time_scale=1000,
+                          current_media_time=runs * fragments_per_run * fragment_duration,
+                          smpte_time_code_offset=0, movie_identifier="",
+                          server_entry_table=[], quality_entry_table=[],
+                          drm_data="", metadata="",
+                          segment_run_table_entries=[
+                              Box("asrt", BoxPayloadASRT(0, 0, [], segment_runs))],
+                          fragment_run_table_entries=[
+                              Box("afrt", BoxPayloadAFRT(0, 0, 1000, [], fragment_runs))])
+
+    return bytes(Box("abst", abst).serialize())
@@ -0,0 +1,127 @@
+"""Memory and throughput of the flashmedia tag and box objects, for an
+FLV file and an HDS fragment of synthetic tags (flashmedia_data.py).
+
+"objects" is the size of the Tag, Box and payload objects themselves,
+without the bytes of the media data, from sys.getsizeof(). "held" is
+all memory held by the parsed objects, where tracemalloc is available
+(Python 3). "parse" and "serialize" are the MB/s of the input.
+
+    python benchmarks/flashmedia_memory.py [--ref REV]
+"""
+
+from __future__ import print_function
+
+import gc
+import sys
+import time
+
+from io import BytesIO
+
+import common
+import flashmedia_data
+
+from livecli.packages.flashmedia import FLV
+from livecli.packages.flashmedia.box import Box
+from livecli.packages.flashmedia.packet import Packet
+from livecli.packages.flashmedia.tag import Tag
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+TAGS = 6000
+RUNS = 10
+
+
+def parse_flv(data):
+    return list(FLV(BytesIO(data)))
+
+
+def parse_hds_fragment(data):
+    """Returns the boxes of the fragment and the tags of its mdat."""
+    fd = BytesIO(data)
+    objects = []
+    while fd.tell() < len(data):
+        objects.append(Box.deserialize(fd, raw_payload=True))
+
+    mdat = bytes(objects[-1].payload.data)
+    offset = 0
+    while offset < len(mdat):
+        tag, offset = Tag.deserialize_from(mdat, offset)
+        objects.append(tag)
+
+    return objects
+
+
+def object_size(obj):
+    """Returns the size of a packet and of the packets it refers to."""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+        values = list(obj.__dict__.values())
+    else:
+        values = []
+
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            if hasattr(obj, name):
+                values.append(getattr(obj, name))
+
+    for value in values:
+        if isinstance(value, Packet):
+            size += object_size(value)
+
+    return size
+
+
+def held(parse, data):
+    """Returns the bytes allocated by parse and still held."""
+    gc.collect()
+    tracemalloc.start()
+    objects = parse(data)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+
+    return size
+
+
+def best(func, *args):
+    """Returns the fastest of RUNS calls of func in seconds."""
+    times = []
+    # As in timeit, the collector would walk all the parsed objects
+    gc.disable()
+    try:
+        for _ in range(RUNS):
+            start = time.time()
+            func(*args)
+            times.append(time.time() - start)
+    finally:
+        gc.enable()
+
+    return min(times)
+
+
+def serialize(objects):
+    for obj in objects:
+        obj.serialize()
+
+
+def benchmark():
+    for name, parse, data in (("FLV file", parse_flv, flashmedia_data.flv_file(TAGS)),
+                              ("HDS fragment", parse_hds_fragment,
+                               flashmedia_data.hds_fragment(TAGS))):
+        objects = parse(data)
+        size = sum(object_size(obj) for obj in objects)
+        megabytes = len(data) / 1e6
+
+        print("{0:12s}  {1:5d} objects  {2:6.0f} KB objects  {3:7s}  "
+              "parse {4:5.0f} MB/s  serialize {5:5.0f} MB/s".format(
+                  name, len(objects), size / 1024.0,
+                  "{0:4.0f} MB".format(held(parse, data) / 1e6) if tracemalloc else "",
+                  megabytes / best(parse, data), megabytes / best(serialize, objects)))
+
+
+if __name__ == "__main__":
+    common.main(benchmark)
@@ -0,0 +1,114 @@
+"""Parse time of the flashmedia F4V, bootstrap and FLV paths, for the
+synthetic data of flashmedia_data.py.
+
+"bootstrap" is Box.deserialize() of an abst box, "F4V fragment" the
+boxes of an HDS fragment and the tags of its mdat box and "FLV file"
+the tags of an FLV file. "convert_fragment" is what HDSStreamWriter
+does with a downloaded fragment: the mdat box is found and its tags
+are written to the buffer as FLV, read from the box while it is
+downloaded where the tree has stream payloads.
+
+    python benchmarks/flashmedia_parse.py [--ref REV]
+"""
+
+from __future__ import print_function
+
+import gc
+import time
+
+from io import BytesIO
+
+import common
+import flashmedia_data
+
+from livecli import Livecli
+from livecli.packages.flashmedia import FLV
+from livecli.packages.flashmedia.box import Box
+from livecli.packages.flashmedia.tag import Tag
+from livecli.stream import HDSStream
+from livecli.stream.hds import Fragment, HDSStreamReader, HDSStreamWriter
+
+BOOTSTRAP_RUNS = 5000
+TAGS = 3000
+RUNS = 10
+
+
+class Buffer(object):
+    """Counts the bytes written to it."""
+
+    def __init__(self):
+        self.written = 0
+
+    def write(self, data):
+        self.written += len(data)
+
+
+def parse_bootstrap(data):
+    Box.deserialize(BytesIO(data))
+
+
+def parse_f4v_fragment(data):
+    fd = BytesIO(data)
+    while fd.tell() < len(data):
+        box = Box.deserialize(fd, raw_payload=True)
+
+    mdat = bytes(box.payload.data)
+    offset = 0
+    while offset < len(mdat):
+        tag, offset = Tag.deserialize_from(mdat, offset)
+
+
+def parse_flv(data):
+    for tag in FLV(BytesIO(data)):
+        pass
+
+
+def convert_fragment(session, data):
+    """Returns the FLV bytes HDSStreamWriter writes for the fragment."""
+    stream = HDSStream(session, "http://benchmark/", "http://benchmark/stream", None)
+    reader = HDSStreamReader(stream)
+    reader.buffer = Buffer()
+    writer = HDSStreamWriter(reader)
+    fragment = Fragment(1, 1, 4000, "http://benchmark/streamSeg1-Frag1")
+
+    writer.convert_fragment(fragment, BytesIO(data))
+    return reader.buffer.written
+
+
+def best(func, *args):
+    """Returns the fastest of RUNS calls of func in seconds."""
+    times = []
+    # As in timeit, the collector would walk all the parsed objects
+    gc.disable()
+    try:
+        for _ in range(RUNS):
+            start = time.time()
+            func(*args)
+            times.append(time.time() - start)
+    finally:
+        gc.enable()
+
+    return min(times)
+
+
+def benchmark():
+    session = Livecli()
+    fragment = flashmedia_data.hds_fragment(TAGS)
+
+    for name, func, data in (("bootstrap", parse_bootstrap,
+                              flashmedia_data.bootstrap(BOOTSTRAP_RUNS)),
+                             ("F4V fragment", parse_f4v_fragment, fragment),
+                             ("FLV file", parse_flv, flashmedia_data.flv_file(TAGS))):
+        seconds = best(func, data)
+        print("{0:16s}  {1:7.1f} ms  {2:6.1f} MB/s".format(
+            name, seconds * 1000, len(data) / seconds / 1e6))
+
+    # Without output the mdat box was not found
+    assert convert_fragment(session, fragment) > 0
+    seconds = best(convert_fragment, session, fragment)
+    print("{0:16s}  {1:7.1f} ms  {2:6.1f} MB/s".format(
+        "convert_fragment", seconds * 1000, len(fragment) / seconds / 1e6))
+
+
+if __name__ == "__main__":
+    common.main(benchmark)
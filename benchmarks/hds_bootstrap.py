@@ -0,0 +1,72 @@
+"""Time to update and look up fragments in an HDS bootstrap with
+thousands of fragment and segment runs, as a long DVR window has.
+
+"update" is HDSStreamWorker.update_bootstrap() of an already parsed
+bootstrap, "lookup" the fragment_duration() and segment_from_fragment()
+calls that iter_segments() makes for every fragment, for LOOKUPS
+fragments spread over the whole bootstrap.
+
+    python benchmarks/hds_bootstrap.py [--ref REV]
+"""
+
+from __future__ import print_function
+
+import time
+
+from io import BytesIO
+
+import common
+import flashmedia_data
+
+from livecli import Livecli
+from livecli.buffers import RingBuffer
+from livecli.packages.flashmedia.box import Box
+from livecli.stream import HDSStream
+from livecli.stream.hds import HDSStreamReader, HDSStreamWorker, HDSStreamWriter
+
+RUNS = (1000, 5000)
+FRAGMENTS_PER_RUN = 10
+FRAGMENT_DURATION = 4000
+LOOKUPS = 500
+UPDATES = 10
+
+
+def new_worker(session, runs):
+    # The worker and writer threads are not started, the worker
+    # updates from the bootstrap once when it is created
+    data = flashmedia_data.bootstrap(runs, FRAGMENTS_PER_RUN, FRAGMENT_DURATION)
+    stream = HDSStream(session, "http://benchmark/", "http://benchmark/stream",
+                       Box.deserialize(BytesIO(data)))
+    reader = HDSStreamReader(stream)
+    reader.buffer = RingBuffer(session.get_option("ringbuffer-size"))
+    reader.writer = HDSStreamWriter(reader)
+    return HDSStreamWorker(reader)
+
+
+def benchmark():
+    session = Livecli()
+    for runs in RUNS:
+        worker = new_worker(session, runs)
+        fragments = range(worker.first_fragment, worker.last_fragment + 1,
+                          (worker.last_fragment - worker.first_fragment) // LOOKUPS)
+
+        times = []
+        for _ in range(UPDATES):
+            start = time.time()
+            worker.update_bootstrap()
+            times.append(time.time() - start)
+        update = min(times)
+
+        start = time.time()
+        for fragment in fragments:
+            worker.fragment_duration(fragment)
+            worker.segment_from_fragment(fragment)
+        lookup = (time.time() - start) / len(fragments)
+
+        print("{0:5d} runs:  update {1:7.2f} ms  lookup {2:8.2f} us/fragment".format(
+            runs, update * 1000, lookup * 1e6))
+        worker.writer.close()
+
+
+if __name__ == "__main__":
+    common.main(benchmark)
@@ -0,0 +1,112 @@
+"""Time to reload a live HLS playlist of 10000 segments, with 3 new
+segments per reload as on a DVR stream with a long window.
+
+"parse" is hls_playlist.load() of the whole playlist, "delta" the same
+with the segments that were seen before skipped, where the tree has
+that. "reload" is HLSStreamWorker.reload_playlist(), the playlist is
+served from memory by a requests adapter.
+
+    python benchmarks/hls_reload.py [--ref REV]
+"""
+
+from __future__ import print_function
+
+import time
+
+import common
+
+from requests import Response
+from requests.adapters import BaseAdapter
+
+from livecli import Livecli
+from livecli.buffers import RingBuffer
+from livecli.stream import HLSStream
+from livecli.stream import hls_playlist
+from livecli.stream.hls import HLSStreamReader, HLSStreamWorker, HLSStreamWriter
+
+URL = "http://benchmark/live.m3u8"
+SEGMENTS = 10000
+NEW_SEGMENTS = 3
+RELOADS = 10
+
+
+def playlist(first):
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:6",
+             "#EXT-X-MEDIA-SEQUENCE:{0}".format(first)]
+    for num in range(first, first + SEGMENTS):
+        lines.append("#EXTINF:6.000,")
+        lines.append("segment-{0}.ts".format(num))
+
+    return "\n".join(lines) + "\n"
+
+
+class PlaylistAdapter(BaseAdapter):
+    """Serves the current playlist for every request."""
+
+    def __init__(self):
+        BaseAdapter.__init__(self)
+        self.text = playlist(0)
+
+    def send(self, request, **kwargs):
+        res = Response()
+        res.status_code = 200
+        res.url = request.url
+        res.request = request
+        res.encoding = "utf-8"
+        res._content = self.text.encode("utf-8")
+        return res
+
+    def close(self):
+        pass
+
+
+def best(func, runs=RELOADS):
+    """Returns the fastest of runs calls of func in ms."""
+    times = []
+    for run in range(runs):
+        start = time.time()
+        func(run)
+        times.append(time.time() - start)
+
+    return min(times) * 1000
+
+
+def benchmark():
+    base = playlist(0)
+    changed = playlist(NEW_SEGMENTS)
+    last = SEGMENTS - 1
+
+    print("parse:   {0:7.1f} ms".format(best(lambda run: hls_playlist.load(changed, URL))))
+    try:
+        hls_playlist.load(changed, URL, skip_sequence=last)
+    except TypeError:
+        pass
+    else:
+        print("delta:   {0:7.1f} ms".format(
+            best(lambda run: hls_playlist.load(changed, URL, skip_sequence=last))))
+
+    session = Livecli()
+    adapter = PlaylistAdapter()
+    adapter.text = base
+    session.http.mount("http://benchmark/", adapter)
+
+    # The worker and writer threads are not started, the worker
+    # loads the playlist once when it is created
+    reader = HLSStreamReader(HLSStream(session, URL))
+    reader.buffer = RingBuffer(session.get_option("ringbuffer-size"))
+    reader.writer = HLSStreamWriter(reader)
+    worker = HLSStreamWorker(reader)
+
+    # Every reload gets a playlist with new segments
+    texts = [playlist(NEW_SEGMENTS * (run + 1)) for run in range(RELOADS)]
+
+    def reload_playlist(run):
+        adapter.text = texts[run]
+        worker.reload_playlist()
+
+    print("reload:  {0:7.1f} ms".format(best(reload_playlist)))
+    reader.writer.close()
+
+
+if __name__ == "__main__":
+    common.main(benchmark)
@@ -0,0 +1,109 @@
+"""Overhead of a log call for the caller, in ns per call.
+
+A disabled level only costs the level check. An enabled level is
+written to os.devnull, once from one thread and once from 4 threads,
+the time until the messages are written is shown as well. The last
+case writes to an output whose flush blocks for 2 ms, as a stalled
+terminal or a log file on slow flash storage does.
+
+    python benchmarks/logger.py [--ref REV]
+"""
+
+from __future__ import print_function
+
+import os
+import threading
+import time
+
+import common
+
+from livecli.logger import Logger
+
+CALLS = 100000
+
+
+class SlowOutput(object):
+    def __init__(self):
+        self.lines = 0
+
+    def write(self, line):
+        self.lines += 1
+
+    def flush(self):
+        time.sleep(0.002)
+
+
+def new_logger(output, level):
+    logger = Logger()
+    logger.set_output(output)
+    logger.set_level(level)
+    return logger
+
+
+def flush(logger):
+    # Loggers without the writer thread write in the calling thread
+    if hasattr(logger, "flush"):
+        logger.flush()
+
+
+def run_threads(threads, func):
+    threads = [threading.Thread(target=func) for _ in range(threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def overhead(output, level, threads=1):
+    """Returns the ns per call for the caller and until written."""
+    logger = new_logger(output, level)
+    module = logger.new_module("stream.hls")
+
+    def log():
+        for i in range(CALLS // threads):
+            module.debug("Adding segment {0} to queue", i)
+
+    start = time.time()
+    run_threads(threads, log)
+    called = time.time() - start
+    flush(logger)
+    written = time.time() - start
+
+    return called / CALLS * 1e9, written / CALLS * 1e9
+
+
+def slow_output():
+    """Returns the mean and 99th percentile of a call in us."""
+    output = SlowOutput()
+    logger = new_logger(output, "debug")
+    module = logger.new_module("stream.hls")
+    latencies = []
+
+    def log():
+        for i in range(200):
+            start = time.time()
+            module.debug("Download of segment {0} complete", i)
+            latencies.append(time.time() - start)
+            time.sleep(0.0005)
+
+    run_threads(4, log)
+    flush(logger)
+    latencies.sort()
+
+    return (sum(latencies) / len(latencies) * 1e6,
+            latencies[int(len(latencies) * 0.99)] * 1e6)
+
+
+def benchmark():
+    with open(os.devnull, "w") as devnull:
+        print("disabled:          {0:7.0f} ns/call".format(overhead(devnull, "info")[0]))
+        for threads in (1, 4):
+            print("enabled, {0} thr.:  {1:7.0f} ns/call, {2:7.0f} ns/call written".format(
+                threads, *overhead(devnull, "debug", threads)))
+
+    print("slow output:       {0:7.0f} us/call mean, {1:7.0f} us/call p99".format(
+        *slow_output()))
+
+
+if __name__ == "__main__":
+    common.main(benchmark)
@@ -0,0 +1,59 @@
+"""Parse throughput of hls_playlist.load() over the playlists of
+benchmarks/data/m3u8, master and media playlists as they are served by
+VOD and live services.
+
+Every playlist is parsed with its URL as base, so that relative URIs
+are joined as in HLSStream. The numbers are the best of RUNS runs.
+
+    python benchmarks/m3u8_parse.py [--ref REV]
+"""
+
+from __future__ import print_function
+
+import glob
+import io
+import os
+
+import common
+
+from livecli.stream import hls_playlist
+
+CORPUS = os.path.join(common.ROOT, "benchmarks", "data", "m3u8")
+BASE_URL = "https://cdn.example.net/hls/event/{0}"
+RUNS = 5
+DURATION = 0.2
+
+
+def parse_time(data, url):
+    """Returns the fastest seconds per parse of data."""
+    number = 1
+    while common.per_call(lambda: hls_playlist.load(data, url), number) * number < DURATION:
+        number *= 2
+
+    return min(common.per_call(lambda: hls_playlist.load(data, url), number)
+               for _ in range(RUNS))
+
+
+def benchmark():
+    total_size = total_time = 0
+    for filename in sorted(glob.glob(os.path.join(CORPUS, "*.m3u8"))):
+        with io.open(filename, encoding="utf-8") as fd:
+            data = fd.read()
+
+        name = os.path.basename(filename)
+        url = BASE_URL.format(name)
+        playlist = hls_playlist.load(data, url)
+        entries = len(playlist.playlists) if playlist.is_master else len(playlist.segments)
+        seconds = parse_time(data, url)
+        total_size += len(data)
+        total_time += seconds
+
+        print("{0:26s} {1:6s} {2:4d} entries  {3:8.1f} us  {4:6.1f} MB/s".format(
+            name, "master" if playlist.is_master else "media", entries,
+            seconds * 1e6, len(data) / seconds / 1e6))
+
+    print("{0:26s} {1:25s} {2:6.1f} MB/s".format("total", "", total_size / total_time / 1e6))
+
+
+if __name__ == "__main__":
+    common.main(benchmark)
@@ -0,0 +1,70 @@
+"""Startup time of a session, with the builtin plugins imported at once
+(eager) and with them listed in the plugin manifest (lazy).
+
+Every run is a new interpreter, it imports livecli, creates a session
+and resolves a single URL. The manifest is written to a temporary
+directory, the one of the user is left alone.
+
+    python benchmarks/plugin_startup.py [--ref REV]
+"""
+
+from __future__ import print_function
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import common
+
+RUNS = 10
+URL = "https://www.youtube.com/watch?v=aqz-KE-bpKQ"
+
+
+def child(mode, manifest):
+    """Measures a single startup, run in a new interpreter."""
+    start = time.time()
+
+    import livecli.session
+    if mode == "eager":
+        livecli.session.load_manifest = lambda filename, path: None
+        livecli.session.save_manifest = lambda filename, path, plugins: None
+    livecli.session.PLUGIN_MANIFEST = manifest
+
+    session = livecli.session.Livecli()
+    created = time.time()
+    session.resolve_url(URL)
+    resolved = time.time()
+
+    print(created - start, resolved - start)
+
+
+def run(mode, manifest):
+    env = dict(os.environ, BENCHMARK_CHILD=mode, BENCHMARK_MANIFEST=manifest)
+    output = subprocess.check_output([sys.executable, os.path.abspath(__file__)], env=env)
+    return [float(value) for value in output.split()]
+
+
+def benchmark():
+    tempdir = tempfile.mkdtemp(prefix="benchmark-")
+    manifest = os.path.join(tempdir, "plugins.json")
+    try:
+        # Writes the manifest, where the tree has one
+        run("lazy", manifest)
+
+        for mode in ("eager", "lazy"):
+            times = sorted(run(mode, manifest) for _ in range(RUNS))
+            created, resolved = times[len(times) // 2]
+            print("{0:5s}:  session {1:6.1f} ms  first URL {2:6.1f} ms".format(
+                mode, created * 1000, resolved * 1000))
+    finally:
+        shutil.rmtree(tempdir)
+
+
+if __name__ == "__main__":
+    if "BENCHMARK_CHILD" in os.environ:
+        child(os.environ["BENCHMARK_CHILD"], os.environ["BENCHMARK_MANIFEST"])
+    else:
+        common.main(benchmark)
@@ -0,0 +1,88 @@
+"""Latency of Livecli.resolve_url() over the URLs of
+benchmarks/data/urls.txt, the URLs found in the builtin plugins and
+a few of the protocol plugins.
+
+"cold" resolves the whole list in turn, it is longer than the cache
+of recent URLs, so every URL is looked up in the plugin index. "warm"
+resolves the first WARM_URLS of the list again and again, as a
+--server that is asked for the same channels does. "first" is the
+first URL of the first session, which builds the index, "second" that
+of the next session. The plugins are loaded from a plugin manifest in
+a temporary directory, where the tree has one, so these two include
+the import of the plugins that are tried, older trees import all of
+them with the session. plugin_startup.py compares both together.
+
+    python benchmarks/resolve_url.py [--ref REV]
+"""
+
+from __future__ import print_function
+
+import io
+import os
+import shutil
+import tempfile
+import time
+
+import common
+
+import livecli.session
+from livecli.exceptions import NoPluginError
+from livecli.utils import update_scheme
+
+CORPUS = os.path.join(common.ROOT, "benchmarks", "data", "urls.txt")
+ROUNDS = 20
+WARM_URLS = 16
+
+
+
+
+def resolve(session, url):
+    try:
+        return session.resolve_url_no_redirect(url)
+    except NoPluginError:
+        return None
+
+
+def per_url(session, urls):
+    """Returns the fastest us per URL of ROUNDS rounds over urls."""
+    times = []
+    for _ in range(ROUNDS):
+        start = time.time()
+        for url in urls:
+            resolve(session, url)
+        times.append(time.time() - start)
+
+    return min(times) / len(urls) * 1e6
+
+
+def benchmark():
+    with io.open(CORPUS, encoding="utf-8") as fd:
+        urls = fd.read().split()
+
+    tempdir = tempfile.mkdtemp(prefix="benchmark-")
+    try:
+        # Written by the first session, where the tree has a manifest
+        livecli.session.PLUGIN_MANIFEST = os.path.join(tempdir, "plugins.json")
+        livecli.session.Livecli()
+
+        for name in ("first", "second"):
+            session = livecli.session.Livecli()
+            start = time.time()
+            resolve(session, urls[0])
+            print("{0:7s}  {1:7.2f} ms".format(name + ":", (time.time() - start) * 1000))
+    finally:
+        shutil.rmtree(tempdir)
+
+    print("cold:    {0:7.1f} us/URL, {1} URLs, {2} plugins".format(
+        per_url(session, urls), len(urls), len(session.plugins)))
+    print("warm:    {0:7.1f} us/URL, {1} URLs".format(
+        per_url(session, urls[:WARM_URLS] * (len(urls) // WARM_URLS)), WARM_URLS))
+
+    index = getattr(session, "plugin_index", None)
+    if index is not None:
+        tried = sum(len(index.candidates(update_scheme("http://", url))) for url in urls)
+        print("tried:   {0:7.1f} plugins/URL".format(float(tried) / len(urls)))
+
+
+if __name__ == "__main__":
+    common.main(benchmark)
@@ -0,0 +1,47 @@
+"""Throughput of RingBuffer, in ns per byte.
+
+Chunks are written the way the stream writers do and read back with
+read() and, where the buffer has it, readinto().
+
+    python benchmarks/ringbuffer.py [--ref REV]
+"""
+
+from __future__ import print_function
+
+import common
+
+from livecli.buffers import RingBuffer
+
+TOTAL = 16 * 1024 * 1024
+CASES = [(188 * 8, 8192), (16384, 8192), (65536, 65536)]
+
+
+def run(write_size, read_size, use_readinto):
+    buffer = RingBuffer(16 * 1024 * 1024)
+    chunk = b"x" * write_size
+    dest = bytearray(read_size)
+
+    def copy():
+        for _ in range(TOTAL // write_size):
+            buffer.write(chunk)
+            while buffer.length >= read_size:
+                if use_readinto:
+                    buffer.readinto(dest)
+                else:
+                    buffer.read(read_size)
+
+    return common.per_call(copy, 3) / (TOTAL // write_size * write_size) * 1e9
+
+
+def benchmark():
+    has_readinto = hasattr(RingBuffer, "readinto")
+    for write_size, read_size in CASES:
+        line = "write {0:6d} / read {1:6d}:  read {2:5.2f} ns/B".format(
+            write_size, read_size, run(write_size, read_size, False))
+        if has_readinto:
+            line += "  readinto {0:5.2f} ns/B".format(run(write_size, read_size, True))
+        print(line)
+
+
+if __name__ == "__main__":
+    common.main(benchmark)
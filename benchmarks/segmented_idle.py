@@ -0,0 +1,146 @@
+"""Wakeups of idle HLS streams and the time close() takes.
+
+Streams of a live playlist that has no new segments only wait for the
+next reload, the script counts the context switches of the process
+while STREAMS of them are idle. close() is timed while a segment is
+downloading and on the idle streams, it exits with 1 if a close takes
+longer than CLOSE_LIMIT seconds.
+
+Wakeups are counted on Linux only, they are read from /proc.
+
+    python benchmarks/segmented_idle.py [--ref REV]
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import threading
+import time
+
+import common
+
+from livecli import Livecli
+from livecli.stream import HLSStream
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    # Python 2.7
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+STREAMS = 10
+SEGMENTS = 3
+SEGMENT_SIZE = 64 * 1024
+IDLE_TIME = 5.0
+CLOSE_LIMIT = 1.0
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    # Seconds before a segment is sent
+    delay = 0.0
+    reloads = 0
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, body):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.endswith(".m3u8"):
+            Handler.reloads += 1
+            lines = ["#EXTM3U", "#EXT-X-TARGETDURATION:2", "#EXT-X-MEDIA-SEQUENCE:0"]
+            for num in range(SEGMENTS):
+                lines += ["#EXTINF:2.0,", "/{0}.ts".format(num)]
+            if self.path.startswith("/vod"):
+                lines.append("#EXT-X-ENDLIST")
+            self.send("\n".join(lines).encode("ascii") + b"\n")
+        else:
+            time.sleep(Handler.delay)
+            self.send(b"\x47" * SEGMENT_SIZE)
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def start_server():
+    server = Server(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    return "http://127.0.0.1:{0}".format(server.server_address[1])
+
+
+def context_switches():
+    """Returns the voluntary context switches of all threads."""
+    total = 0
+    for tid in os.listdir("/proc/self/task"):
+        try:
+            with open("/proc/self/task/{0}/status".format(tid)) as fd:
+                for line in fd:
+                    if line.startswith("voluntary_ctxt_switches"):
+                        total += int(line.split()[1])
+        except IOError:
+            # The thread exited
+            pass
+
+    return total
+
+
+def timed_close(fd):
+    start = time.time()
+    fd.close()
+    return time.time() - start
+
+
+def benchmark():
+    url = start_server()
+    session = Livecli()
+    session.set_option("hls-segment-threads", 2)
+
+    # The streams are idle once they have read all segments
+    fds = [HLSStream(session, url + "/live.m3u8").open() for _ in range(STREAMS)]
+    for fd in fds:
+        size = 0
+        while size < SEGMENTS * SEGMENT_SIZE:
+            size += len(fd.read(SEGMENT_SIZE))
+    time.sleep(0.5)
+
+    if os.path.isdir("/proc/self/task"):
+        Handler.reloads = 0
+        switches = context_switches()
+        time.sleep(IDLE_TIME)
+        switches = context_switches() - switches
+        print("idle:      {0:7.1f} wakeups/s for {1} streams, {2} playlist reloads".format(
+            switches / IDLE_TIME, STREAMS, Handler.reloads))
+
+    Handler.delay = 3.0
+    downloading = []
+    for _ in range(3):
+        fd = HLSStream(session, url + "/vod.m3u8").open()
+        time.sleep(0.3)
+        downloading.append(timed_close(fd))
+    Handler.delay = 0.0
+
+    idle = [timed_close(fd) for fd in fds]
+
+    print("close:     {0:7.3f} s max while downloading, {1:.3f} s max idle".format(
+        max(downloading), max(idle)))
+
+    if max(downloading + idle) > CLOSE_LIMIT:
+        print("FAIL: close took longer than {0} s".format(CLOSE_LIMIT))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    common.main(benchmark)
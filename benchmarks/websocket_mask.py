@@ -0,0 +1,61 @@
+"""Time to mask a websocket payload with ABNF.mask(), next to the byte
+by byte loop it used before, for payloads from a few bytes to 1 MB.
+
+ABNF.mask() uses numpy or wsaccel where they are installed, the path
+that is taken is shown in the header.
+
+    python benchmarks/websocket_mask.py [--ref REV]
+"""
+
+from __future__ import print_function
+
+import array
+import os
+import sys
+
+import common
+
+from websocket import _abnf
+from websocket._abnf import ABNF
+
+SIZES = (4, 16, 125, 1024, 64 * 1024, 1024 * 1024)
+BYTES = 2 * 1024 * 1024
+
+
+def mask_loop(mask_key, data):
+    """The pure Python masking of websocket-client 0.47.0."""
+    _m = array.array("B", mask_key)
+    _d = array.array("B", data)
+    for i in range(len(_d)):
+        _d[i] ^= _m[i % 4]
+
+    if sys.version_info[0] >= 3:
+        return _d.tobytes()
+    else:
+        return _d.tostring()
+
+
+def benchmark():
+    if _abnf.numpy:
+        path = "numpy"
+    elif "XorMaskerSimple" in vars(_abnf):
+        path = "wsaccel"
+    else:
+        path = "pure Python"
+    print("ABNF.mask: {0}".format(path))
+
+    mask_key = os.urandom(4)
+    for size in SIZES:
+        data = os.urandom(size)
+        assert ABNF.mask(mask_key, data) == mask_loop(mask_key, data)
+
+        loop = common.per_call(lambda: mask_loop(mask_key, data),
+                               max(1, BYTES // 8 // (size + 64)))
+        mask = common.per_call(lambda: ABNF.mask(mask_key, data),
+                               max(3, BYTES // (size + 64)))
+        print("{0:8d} B:  loop {1:10.1f} us  ABNF.mask {2:9.1f} us  {3:6.1f}x".format(
+            size, loop * 1e6, mask * 1e6, loop / mask))
+
+
+if __name__ == "__main__":
+    common.main(benchmark)
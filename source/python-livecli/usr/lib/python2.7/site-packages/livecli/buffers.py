@@ -1,6 +1,10 @@
 from collections import deque
 from io import BytesIO
-from threading import Event, Lock
+from threading import Lock
+from time import time
+
+from .metrics import RATIO
+from .utils.events import Event
 
 
 class Chunk(BytesIO):
@@ -66,58 +70,187 @@ class Buffer(object):
 
         return data
 
+    def readinto(self, b):
+        dest = memoryview(b)
+        size = min(len(dest), self.length)
+        written = 0
+
+        while written < size:
+            current_chunk = (self.current_chunk or
+                             Chunk(self.chunks.popleft()))
+            written += current_chunk.readinto(dest[written:size])
+
+            if current_chunk.empty:
+                self.current_chunk = None
+            else:
+                self.current_chunk = current_chunk
+
+        self.length -= written
+
+        return written
+
     def close(self):
         self.closed = True
 
 
-class RingBuffer(Buffer):
-    """Circular buffer for use in multi-threaded consumer/filler."""
+class RingBuffer(object):
+    """Circular buffer for use in multi-threaded consumer/filler.
 
-    def __init__(self, size=8192 * 4):
-        Buffer.__init__(self)
+    Data is stored in a single preallocated bytearray and copied in
+    and out through memoryviews, so no per-chunk objects are created
+    once the buffer has grown to its full size.
+    """
+
+    # Initial storage size, grown on demand up to buffer_size
+    initial_size = 1024 * 64
 
+    def __init__(self, size=8192 * 4, metrics=None):
         self.buffer_size = size
         self.buffer_lock = Lock()
+        self.closed = False
+        self.length = 0
+
+        # Total number of bytes written
+        self.written = 0
+
+        self.metric_fill = None
+        self.metric_stall = None
+        if metrics:
+            self.metric_fill = metrics.histogram("buffer_fill_ratio", RATIO,
+                                                 help="Used part of the buffer when it is read")
+            self.metric_stall = metrics.histogram("reader_stall_seconds",
+                                                  help="Time a read waited for data")
+
+        self._data = bytearray(min(size, self.initial_size))
+        self._view = memoryview(self._data)
+        self._read_pos = 0
 
         self.event_free = Event()
         self.event_free.set()
         self.event_used = Event()
 
     def _check_events(self):
+        # Only touch the events when their state changes, setting or
+        # clearing an event takes a lock on every call
         if self.length > 0:
-            self.event_used.set()
-        else:
+            if not self.event_used.is_set():
+                self.event_used.set()
+        elif self.event_used.is_set():
             self.event_used.clear()
 
         if self.is_full:
-            self.event_free.clear()
-        else:
+            if self.event_free.is_set():
+                self.event_free.clear()
+        elif not self.event_free.is_set():
             self.event_free.set()
 
-    def _read(self, size=-1):
-        with self.buffer_lock:
-            data = Buffer.read(self, size)
+    def _grow(self, size):
+        """Reallocates the storage so that it can hold size bytes,
+           the current content is moved to the start of it."""
+        capacity = len(self._data)
+        if size <= capacity:
+            return
 
-            self._check_events()
+        capacity = min(max(capacity * 2, size), self.buffer_size)
+        data = bytearray(capacity)
+        view = memoryview(data)
+        length = self.length
+        self._copy_out(view, length)
 
-        return data
+        self._data = data
+        self._view = view
+        self._read_pos = 0
+        self.length = length
 
-    def read(self, size=-1, block=True, timeout=None):
-        if block and not self.closed:
+    def _copy_in(self, src, size):
+        """Copies size bytes from the memoryview src to the end of the
+           used region."""
+        if not size:
+            return
+
+        capacity = len(self._data)
+        pos = (self._read_pos + self.length) % capacity
+        first = min(size, capacity - pos)
+
+        self._view[pos:pos + first] = src[:first]
+        if first < size:
+            self._view[:size - first] = src[first:size]
+
+        self.length += size
+
+    def _copy_out(self, dest, size):
+        """Copies size bytes from the start of the used region to the
+           memoryview dest and frees them."""
+        if not size:
+            return
+
+        capacity = len(self._data)
+        pos = self._read_pos
+        first = min(size, capacity - pos)
+
+        dest[:first] = self._view[pos:pos + first]
+        if first < size:
+            dest[first:size] = self._view[:size - first]
+
+        self._read_pos = (pos + size) % capacity
+        self.length -= size
+
+        # Keep the data contiguous for as long as possible
+        if self.length == 0:
+            self._read_pos = 0
+
+    def _wait_used(self, block, timeout):
+        if self.metric_fill:
+            self.metric_fill.observe(float(self.length) / self.buffer_size)
+
+        if block and not self.closed and not self.event_used.is_set():
+            start = time()
             self.event_used.wait(timeout)
+            if self.metric_stall:
+                self.metric_stall.observe(time() - start)
 
             # If the event is still not set it's a timeout
             if not self.event_used.is_set() and self.length == 0:
                 raise IOError("Read timeout")
 
-        return self._read(size)
+    def read(self, size=-1, block=True, timeout=None):
+        self._wait_used(block, timeout)
+
+        with self.buffer_lock:
+            if size < 0 or size > self.length:
+                size = self.length
+
+            if not size:
+                return b""
+
+            data = bytearray(size)
+            self._copy_out(memoryview(data), size)
+
+            self._check_events()
+
+        return bytes(data)
+
+    def readinto(self, b, block=True, timeout=None):
+        """Reads data into the writable buffer b and returns the number
+           of bytes read, 0 means the buffer is closed and empty."""
+        self._wait_used(block, timeout)
+
+        dest = memoryview(b)
+        with self.buffer_lock:
+            size = min(len(dest), self.length)
+
+            self._copy_out(dest, size)
+            self._check_events()
+
+        return size
 
     def write(self, data):
         if self.closed:
             return
 
-        data_left = len(data)
-        data_total = len(data)
+        src = memoryview(data)
+        data_left = len(src)
+        written = 0
 
         while data_left > 0:
             self.event_free.wait()
@@ -127,9 +260,11 @@ class RingBuffer(Buffer):
 
             with self.buffer_lock:
                 write_len = min(self.free, data_left)
-                written = data_total - data_left
+                self._grow(self.length + write_len)
+                self._copy_in(src[written:written + write_len], write_len)
+                self.written += write_len
 
-                Buffer.write(self, data[written:written + write_len])
+                written += write_len
                 data_left -= write_len
 
                 self._check_events()
@@ -147,7 +282,7 @@ class RingBuffer(Buffer):
         self.event_used.wait(timeout)
 
     def close(self):
-        Buffer.close(self)
+        self.closed = True
 
         # Make sure we don't let a .write() and .read() block forever
         self.event_free.set()
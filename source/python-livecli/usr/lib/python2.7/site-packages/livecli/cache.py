@@ -1,10 +1,32 @@
+import atexit
 import json
 import os
 import shutil
 import tempfile
 
+from collections import OrderedDict
+from copy import deepcopy
+from threading import Lock, RLock, Timer
 from time import time
-from .compat import is_win32
+from .compat import is_py2, is_win32
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+try:
+    if is_py2:
+        import anydbm as dbm
+    else:
+        import dbm
+except ImportError:
+    dbm = None
 
 try:
     import xbmc
@@ -33,50 +55,154 @@ if is_kodi:
     if not xbmcvfs.exists(temp_livecli):
         xbmcvfs.mkdirs(temp_livecli)
 
+# Seconds to wait for more changes before a cache file is written,
+# Kodi may not run exit handlers so it is written immediately
+WRITE_DELAY = 0 if is_kodi else 1.0
 
-class Cache(object):
-    """Caches Python values as JSON and prunes expired entries."""
+# Entries kept per file by the memory backend
+MEMORY_MAX_ENTRIES = 1024
 
-    def __init__(self, filename, key_prefix=""):
-        self.key_prefix = key_prefix
-        self.filename = os.path.join(cache_dir, filename)
+# Seconds between the removals of all expired entries of a dbm file
+DBM_PRUNE_INTERVAL = 60 * 60
 
-        self._cache = {}
 
-    def _load(self):
-        if os.path.exists(self.filename):
-            try:
-                with open(self.filename, "r") as fd:
-                    self._cache = json.load(fd)
-            except Exception:
-                self._cache = {}
-        else:
-            self._cache = {}
+class CacheFile(object):
+    """The entries of a JSON cache file, shared by every Cache
+    of the file in the process.
+
+    The file is only read again when its modification time or size
+    changes. Changes are written after WRITE_DELAY seconds, merged
+    with the file as it is on disk under an exclusive lock, so that
+    the changes of other processes are kept. Nothing is written if no entry
+    was changed or pruned.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.entries = {}
+        self.lock = RLock()
+
+        self._stat = None
+        self._changed = set()
+        self._timer = None
+
+    def _file_stat(self):
+        try:
+            stat = os.stat(self.filename)
+            return (stat.st_mtime, stat.st_size, stat.st_ino)
+        except OSError:
+            return None
+
+    def _read(self):
+        try:
+            # The file is replaced by a rename, it is never
+            # read while it is half written
+            with open(self.filename, "r") as fd:
+                return json.load(fd)
+        except Exception:
+            return {}
+
+    def _merge(self, force=False):
+        """Reads the file again if it changed on disk, entries changed
+           in this process and not written yet are kept."""
+        stat = self._file_stat()
+        if stat == self._stat and not force:
+            return
+
+        entries = self._read()
+        if not isinstance(entries, dict):
+            entries = {}
+
+        for key in self._changed:
+            if key in self.entries:
+                entries[key] = self.entries[key]
+            else:
+                entries.pop(key, None)
+
+        self.entries = entries
+        self._stat = stat
 
     def _prune(self):
         now = time()
-        pruned = []
-
-        for key, value in self._cache.items():
-            expires = value.get("expires", time())
-            if expires <= now:
-                pruned.append(key)
+        pruned = [key for key, value in self.entries.items()
+                  if value.get("expires", now) <= now]
 
         for key in pruned:
-            self._cache.pop(key, None)
+            self.entries.pop(key, None)
+            self._changed.add(key)
 
         return len(pruned) > 0
 
+    def get(self, key):
+        """Returns the entry of key or None if it is missing or expired."""
+        with self.lock:
+            self._merge()
+
+            entry = self.entries.get(key)
+            if entry is not None and entry.get("expires", time()) <= time():
+                # Pruned from the file with the next write
+                self._changed.add(key)
+                self.schedule()
+                return None
+
+            return entry
+
+    def set(self, key, entry):
+        with self.lock:
+            self._merge()
+
+            self.entries[key] = entry
+            self._changed.add(key)
+            self.schedule()
+
+    def schedule(self):
+        """Writes the changes after WRITE_DELAY seconds, further changes
+           in the meantime are written along with them."""
+        if not WRITE_DELAY:
+            return self.flush()
+
+        if self._timer is None:
+            self._timer = Timer(WRITE_DELAY, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            if not self._changed:
+                return
+
+            try:
+                with self._lock_file():
+                    # Changes made by other processes since the last read,
+                    # the stat may not show them with a coarse mtime
+                    self._merge(force=True)
+                    self._prune()
+                    self._save()
+                    self._stat = self._file_stat()
+            except (IOError, OSError):
+                # Silently ignore errors
+                pass
+
+            self._changed.clear()
+
+    def _lock_file(self):
+        return _FileLock(self.filename + ".lock")
+
     def _save(self):
         if is_kodi:
             fd, tempname = tempfile.mkstemp(dir=temp_livecli)
         else:
-            fd, tempname = tempfile.mkstemp()
+            if not os.path.exists(os.path.dirname(self.filename)):
+                os.makedirs(os.path.dirname(self.filename))
+            fd, tempname = tempfile.mkstemp(dir=os.path.dirname(self.filename))
         fd = os.fdopen(fd, "w")
-        json.dump(self._cache, fd, indent=2, separators=(",", ": "))
+        json.dump(self.entries, fd, separators=(",", ":"))
         fd.close()
 
-        # Silently ignore errors
         try:
             if not os.path.exists(os.path.dirname(self.filename)):
                 os.makedirs(os.path.dirname(self.filename))
@@ -84,30 +210,269 @@ class Cache(object):
             shutil.move(tempname, self.filename)
         except (IOError, OSError):
             os.remove(tempname)
+            raise
 
-    def set(self, key, value, expires=60 * 60 * 24 * 7):
-        self._load()
-        self._prune()
 
+class _FileLock(object):
+    """An exclusive fcntl lock of a file, does nothing without fcntl."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.fd = None
+
+    def __enter__(self):
+        if fcntl:
+            if not os.path.exists(os.path.dirname(self.filename)):
+                os.makedirs(os.path.dirname(self.filename))
+            self.fd = open(self.filename, "a")
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+        return self
+
+    def __exit__(self, *args):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            self.fd.close()
+            self.fd = None
+
+
+class MemoryCache(object):
+    """Keeps the entries in memory only, the least recently used
+       entries are removed after MEMORY_MAX_ENTRIES."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None or entry["expires"] <= time():
+                return None
+
+            self.entries[key] = entry
+            return entry
+
+    def set(self, key, entry):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = entry
+            while len(self.entries) > MEMORY_MAX_ENTRIES:
+                self.entries.popitem(last=False)
+
+    def flush(self):
+        pass
+
+
+class SQLiteCache(object):
+    """Stores the entries in a sqlite database next to the JSON file.
+
+    The expires column is indexed, expired entries are removed with
+    every write without reading the others.
+    """
+
+    def __init__(self, filename):
+        self.filename = os.path.splitext(filename)[0] + ".sqlite"
+        self.lock = Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            if not os.path.exists(os.path.dirname(self.filename)):
+                os.makedirs(os.path.dirname(self.filename))
+
+            conn = sqlite3.connect(self.filename, timeout=10,
+                                   check_same_thread=False)
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS cache ("
+                             "key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+                conn.execute("CREATE INDEX IF NOT EXISTS cache_expires "
+                             "ON cache (expires)")
+            self._conn = conn
+
+        return self._conn
+
+    def get(self, key):
+        try:
+            with self.lock:
+                row = self._connect().execute(
+                    "SELECT value, expires FROM cache WHERE key = ? AND expires > ?",
+                    (key, time())).fetchone()
+        except (sqlite3.Error, OSError):
+            return None
+
+        if row is None:
+            return None
+
+        return dict(value=json.loads(row[0]), expires=row[1])
+
+    def set(self, key, entry):
+        try:
+            with self.lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute("DELETE FROM cache WHERE expires <= ?", (time(),))
+                    conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                                 (key, json.dumps(entry["value"]), entry["expires"]))
+        except (sqlite3.Error, OSError):
+            # Silently ignore errors
+            pass
+
+    def flush(self):
+        pass
+
+
+class DBMCache(object):
+    """Stores the entries in a dbm database next to the JSON file.
+
+    The database is opened for every operation under the same lock
+    as the JSON backend, some dbm modules allow only one process to
+    open it at a time.
+    """
+
+    def __init__(self, filename):
+        self.filename = os.path.splitext(filename)[0] + ".dbm"
+        self.lock = Lock()
+        self._pruned = 0
+
+    @staticmethod
+    def _key(key):
+        return key.encode("utf8") if not isinstance(key, bytes) else key
+
+    def _prune(self, db):
+        now = time()
+        if self._pruned > now - DBM_PRUNE_INTERVAL:
+            return
+
+        for key in list(db.keys()):
+            try:
+                if json.loads(db[key].decode("utf8"))["expires"] <= now:
+                    del db[key]
+            except (ValueError, KeyError, TypeError):
+                del db[key]
+
+        self._pruned = now
+
+    def get(self, key):
+        try:
+            with self.lock, _FileLock(self.filename + ".lock"):
+                db = dbm.open(self.filename, "r")
+                try:
+                    value = db.get(self._key(key))
+                finally:
+                    db.close()
+        except Exception:
+            # The database does not exist yet or is being written
+            return None
+
+        if value is None:
+            return None
+
+        try:
+            entry = json.loads(value.decode("utf8"))
+        except ValueError:
+            return None
+
+        if entry["expires"] <= time():
+            return None
+
+        return entry
+
+    def set(self, key, entry):
+        try:
+            with self.lock, _FileLock(self.filename + ".lock"):
+                db = dbm.open(self.filename, "c")
+                try:
+                    self._prune(db)
+                    db[self._key(key)] = json.dumps(entry).encode("utf8")
+                finally:
+                    db.close()
+        except Exception:
+            # Silently ignore errors
+            pass
+
+    def flush(self):
+        pass
+
+
+backends = {
+    "json": CacheFile,
+    "memory": MemoryCache,
+}
+
+if sqlite3:
+    backends["sqlite"] = SQLiteCache
+
+if dbm:
+    backends["dbm"] = DBMCache
+
+_backends = {}
+_backends_lock = Lock()
+
+
+def cache_backend(name, filename):
+    """Returns the backend that stores the entries of filename,
+       there is one per process. Unknown or unavailable backends
+       fall back to the JSON file."""
+    if name not in backends:
+        name = "json"
+
+    with _backends_lock:
+        key = (name, filename)
+        if key not in _backends:
+            _backends[key] = backends[name](filename)
+
+        return _backends[key]
+
+
+@atexit.register
+def flush():
+    """Writes the pending changes of all cache files."""
+    with _backends_lock:
+        files = list(_backends.values())
+
+    for file in files:
+        file.flush()
+
+
+class Cache(object):
+    """Caches Python values as JSON and prunes expired entries.
+
+    The entries are stored by the backend that the cache-backend
+    option of session selects, a JSON file by default.
+    """
+
+    def __init__(self, filename, key_prefix="", session=None):
+        self.key_prefix = key_prefix
+        self.filename = os.path.join(cache_dir, filename)
+        self.session = session
+
+    @property
+    def backend(self):
+        # Looked up on every access, plugins are bound to
+        # their cache before the options are set
+        name = self.session and self.session.get_option("cache-backend")
+        return cache_backend(name or "json", self.filename)
+
+    def set(self, key, value, expires=60 * 60 * 24 * 7):
         if self.key_prefix:
             key = "{0}:{1}".format(self.key_prefix, key)
 
         expires += time()
 
-        self._cache[key] = dict(value=value, expires=expires)
-        self._save()
+        # Stored as it would be read back from JSON
+        value = json.loads(json.dumps(value))
 
-    def get(self, key, default=None):
-        self._load()
-
-        if self._prune():
-            self._save()
+        self.backend.set(key, dict(value=value, expires=expires))
 
+    def get(self, key, default=None):
         if self.key_prefix:
             key = "{0}:{1}".format(self.key_prefix, key)
 
-        if key in self._cache and "value" in self._cache[key]:
-            return self._cache[key]["value"]
+        entry = self.backend.get(key)
+        if entry is not None and "value" in entry:
+            return deepcopy(entry["value"])
         else:
             return default
 
@@ -24,11 +24,18 @@ if is_py2:
     def bytes(b, enc="ascii"):
         return _str(b)
 
+    def compat_view(b, size):
+        # file.write() in text mode does not accept memoryview
+        return buffer(b, 0, size)  # noqa
+
 elif is_py3:
     bytes = bytes
     str = str
     range = range
 
+    def compat_view(b, size):
+        return memoryview(b)[:size]
+
 try:
     from urllib.parse import (
         urlparse, urlunparse, urljoin, quote, unquote, parse_qsl, urlencode
@@ -94,6 +101,7 @@ __all__ = [
     "compat_getargspec",
     "compat_queue",
     "compat_unescape",
+    "compat_view",
     "compat_which",
     "crypto_AES",
     "crypto_Blowfish",
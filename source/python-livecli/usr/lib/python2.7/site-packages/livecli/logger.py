@@ -1,6 +1,133 @@
+import atexit
 import sys
 
-from threading import Lock
+from collections import deque
+from threading import Condition, Lock, Thread
+from time import sleep
+
+# Messages waiting for the writer thread, when it cannot keep up
+# with them the loggers wait until it wrote a batch
+QUEUE_SIZE = 4096
+
+# Messages written to an output before it is flushed
+BATCH_SIZE = 256
+
+# Seconds the writer waits for more messages after a small batch,
+# waking it up for every single message costs more than writing it
+LINGER = 0.005
+
+
+class LogWriter(Thread):
+    """Writes the messages of all loggers in the background, the
+       outputs are flushed after each batch of queued messages."""
+
+    def __init__(self, queue_size=QUEUE_SIZE):
+        Thread.__init__(self, name="Thread-livecli-logger")
+        self.daemon = True
+        self.queue_size = queue_size
+
+        # Appending to a deque needs no lock, the condition is only
+        # notified when the writer waits for messages
+        self._queue = deque()
+        self._cond = Condition(Lock())
+        self._idle = False
+        self._busy = False
+        self._full = 0
+
+    def put(self, output, line):
+        """Queues a line, waits while the queue is full."""
+        if len(self._queue) >= self.queue_size:
+            with self._cond:
+                # Counted before the check, run() notifies after
+                # every batch while someone is waiting
+                self._full += 1
+                while len(self._queue) >= self.queue_size:
+                    self._cond.wait()
+                self._full -= 1
+
+        self._queue.append((output, line))
+        if self._idle:
+            with self._cond:
+                self._cond.notify_all()
+
+    def flush(self):
+        """Waits until the queued messages are written."""
+        with self._cond:
+            while self._queue or self._busy:
+                self._cond.wait()
+
+    def _write(self, batch):
+        outputs = []
+        for output, line in batch:
+            try:
+                output.write(line)
+            except Exception:
+                # The output was closed, e.g. a broken pipe
+                continue
+
+            if output not in outputs:
+                outputs.append(output)
+
+        for output in outputs:
+            try:
+                if hasattr(output, "flush"):
+                    output.flush()
+            except Exception:
+                pass
+
+    def run(self):
+        queue = self._queue
+        while True:
+            with self._cond:
+                self._busy = False
+                while not queue:
+                    self._idle = True
+                    # Wakes up flush()
+                    self._cond.notify_all()
+                    if not queue:
+                        self._cond.wait()
+                self._idle = False
+                self._busy = True
+
+            batch = []
+            try:
+                while len(batch) < BATCH_SIZE:
+                    batch.append(queue.popleft())
+            except IndexError:
+                pass
+
+            if self._full:
+                with self._cond:
+                    self._cond.notify_all()
+
+            self._write(batch)
+            if len(batch) < BATCH_SIZE:
+                sleep(LINGER)
+
+
+_writer = None
+_writer_lock = Lock()
+
+
+def writer():
+    global _writer
+
+    if _writer is not None:
+        return _writer
+
+    with _writer_lock:
+        if _writer is None:
+            _writer = LogWriter()
+            _writer.start()
+
+    return _writer
+
+
+@atexit.register
+def flush():
+    """Waits until the messages of all loggers are written."""
+    if _writer is not None:
+        _writer.flush()
 
 
 class Logger(object):
@@ -30,37 +157,46 @@ class Logger(object):
     def set_prefix(self, text):
         self.prefix = str(text)
 
+    def flush(self):
+        """Waits until the queued messages are written, use it before
+           writing to the output directly."""
+        flush()
+
     def msg(self, module, level, msg, *args, **kwargs):
         if self.level < level or level > len(Logger.Levels):
             return
 
+        # Formatted here, the arguments may change later
         msg = msg.format(*args, **kwargs)
-
-        with self.lock:
-            self.output.write(self.prefix + Logger.Format.format(
-                module=module,
-                level=Logger.Levels[level],
-                msg=msg))
-            if hasattr(self.output, "flush"):
-                self.output.flush()
+        writer().put(self.output, self.prefix + Logger.Format.format(
+            module=module,
+            level=Logger.Levels[level],
+            msg=msg))
 
 
 class LoggerModule(object):
+    """Logs the messages of a module, the level is checked before
+       anything else so that disabled levels cost very little."""
+
     def __init__(self, manager, module):
         self.manager = manager
         self.module = module
 
     def error(self, msg, *args, **kwargs):
-        self.manager.msg(self.module, 1, msg, *args, **kwargs)
+        if self.manager.level >= 1:
+            self.manager.msg(self.module, 1, msg, *args, **kwargs)
 
     def warning(self, msg, *args, **kwargs):
-        self.manager.msg(self.module, 2, msg, *args, **kwargs)
+        if self.manager.level >= 2:
+            self.manager.msg(self.module, 2, msg, *args, **kwargs)
 
     def info(self, msg, *args, **kwargs):
-        self.manager.msg(self.module, 3, msg, *args, **kwargs)
+        if self.manager.level >= 3:
+            self.manager.msg(self.module, 3, msg, *args, **kwargs)
 
     def debug(self, msg, *args, **kwargs):
-        self.manager.msg(self.module, 4, msg, *args, **kwargs)
+        if self.manager.level >= 4:
+            self.manager.msg(self.module, 4, msg, *args, **kwargs)
 
 
 __all__ = ["Logger"]
@@ -0,0 +1,145 @@
+"""Counters and histograms recorded by the streams of a session.
+
+Recording a value takes a lock and a few additions, the histograms
+have fixed buckets, so the metrics are always collected.
+"""
+
+import json
+import os
+
+from bisect import bisect_left
+from threading import Lock
+
+from .compat import is_win32
+
+__all__ = ["Counter", "Histogram", "Metrics"]
+
+SECONDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES = tuple(1024 * 4 ** i for i in range(10))  # 1 KB to 256 MB
+BYTES_PER_SECOND = tuple(64 * 1024 * 2 ** i for i in range(12))  # 64 KB/s to 128 MB/s
+RATIO = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+COUNT = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class Counter(object):
+    """A value that only goes up."""
+
+    type = "counter"
+
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self._lock = Lock()
+
+    def inc(self, value=1):
+        with self._lock:
+            self.value += value
+
+    def snapshot(self):
+        return dict(type=self.type, help=self.help, value=self.value)
+
+
+class Histogram(object):
+    """Counts the observed values by bucket, a value is counted in
+       the first bucket whose upper bound is not smaller than it."""
+
+    type = "histogram"
+
+    def __init__(self, name, buckets, help=""):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0
+        self._lock = Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self.counts)
+            count, total = self.count, self.sum
+
+        # Cumulative counts, as in the Prometheus format
+        buckets = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+            cumulative += bucket_count
+            buckets.append([bound, cumulative])
+
+        return dict(type=self.type, help=self.help, count=count,
+                    sum=total, buckets=buckets)
+
+
+class Metrics(object):
+    """The metrics of a session by name.
+
+    The same metric is returned for the same name, so the streams
+    of a session add to each other's values.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = Lock()
+
+    def _get(self, cls, name, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(name, *args, **kwargs)
+
+        return metric
+
+    def counter(self, name, help=""):
+        return self._get(Counter, name, help=help)
+
+    def histogram(self, name, buckets=SECONDS, help=""):
+        return self._get(Histogram, name, buckets, help=help)
+
+    def snapshot(self):
+        """Returns a dict of the current values of all metrics."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        return dict((metric.name, metric.snapshot()) for metric in metrics)
+
+    def dump(self, filename):
+        """Writes the snapshot as JSON, the file is replaced at once
+           so that readers never see it half written."""
+        tempname = "{0}.{1}".format(filename, os.getpid())
+        with open(tempname, "w") as fd:
+            json.dump(self.snapshot(), fd, indent=2, sort_keys=True)
+
+        if is_win32 and os.path.exists(filename):
+            os.remove(filename)
+        os.rename(tempname, filename)
+
+    def text(self):
+        """Returns the metrics in the Prometheus text format."""
+        lines = []
+        for name, metric in sorted(self.snapshot().items()):
+            name = "livecli_" + name
+            if metric["help"]:
+                lines.append("# HELP {0} {1}".format(name, metric["help"]))
+            lines.append("# TYPE {0} {1}".format(name, metric["type"]))
+
+            if metric["type"] == "counter":
+                lines.append("{0} {1}".format(name, metric["value"]))
+                continue
+
+            for bound, count in metric["buckets"]:
+                lines.append('{0}_bucket{{le="{1}"}} {2}'.format(name, bound, count))
+            lines.append("{0}_sum {1}".format(name, metric["sum"]))
+            lines.append("{0}_count {1}".format(name, metric["count"]))
+
+        return "\n".join(lines) + "\n"
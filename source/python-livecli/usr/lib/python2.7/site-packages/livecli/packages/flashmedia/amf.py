@@ -4,6 +4,8 @@ from .types import AMF0String, AMF0Value, U8, U16BE, U32BE
 
 
 class AMFHeader(Packet):
+    __slots__ = ("must_understand", "name", "value")
+
     exception = AMFError
 
     def __init__(self, name, value, must_understand=False):
@@ -36,6 +38,8 @@ class AMFHeader(Packet):
 
 
 class AMFMessage(Packet):
+    __slots__ = ("response_uri", "target_uri", "value")
+
     exception = AMFError
 
     def __init__(self, target_uri, response_uri, value):
@@ -69,6 +73,8 @@ class AMFMessage(Packet):
 
 
 class AMFPacket(Packet):
+    __slots__ = ("headers", "messages", "version")
+
     exception = AMFError
 
     def __init__(self, version, headers=None, messages=None):
@@ -1,5 +1,6 @@
 from ctypes import BigEndianStructure, Union, c_uint8, c_uint16, c_uint32
 from io import BytesIO
+from struct import error as struct_error
 
 from .compat import *
 from .error import *
@@ -9,6 +10,8 @@ from .util import *
 
 
 class Box(Packet):
+    __slots__ = ("extended_size", "payload", "type")
+
     exception = F4VError
 
     def __init__(self, type, payload, extended_size=False):
@@ -27,9 +30,11 @@ class Box(Packet):
         return size
 
     @classmethod
-    def _deserialize(cls, io, strict=False, raw_payload=False):
-        size = U32BE.read(io)
-        type_ = FourCC.read(io)
+    def _deserialize(cls, io, strict=False, raw_payload=False,
+                     stream_payload=False):
+        header = io.read(8)
+        size = U32BE.unpack_from(header, 0)[0]
+        type_ = FourCC.unpack_from(header, 4)[0]
         header_size = 8
         extended_size = False
 
@@ -38,6 +43,12 @@ class Box(Packet):
             header_size += 8
             extended_size = True
 
+        if stream_payload:
+            # The payload is left in the stream, it must be read or
+            # skipped before the next box can be deserialized
+            payload_size = size - header_size if size else None
+            return cls(type_, StreamPayload(io, payload_size), extended_size)
+
         if size == 0:
             data = io.read()
         else:
@@ -77,6 +88,8 @@ class Box(Packet):
 
 
 class BoxPayload(Packet):
+    __slots__ = ()
+
     exception = F4VError
 
     @property
@@ -98,6 +111,8 @@ class BoxPayload(Packet):
 
 
 class BoxContainer(BoxPayload):
+    __slots__ = ("boxes",)
+
     def __init__(self, boxes):
         self.boxes = boxes
 
@@ -129,6 +144,8 @@ class BoxContainer(BoxPayload):
 
 
 class BoxContainerSingle(BoxPayload):
+    __slots__ = ("box",)
+
     def __init__(self, box):
         self.box = box
 
@@ -147,6 +164,8 @@ class BoxContainerSingle(BoxPayload):
 
 
 class RawPayload(BoxPayload):
+    __slots__ = ("data",)
+
     def __init__(self, data):
         self.data = data
 
@@ -166,7 +185,104 @@ class RawPayload(BoxPayload):
         packet += self.data
 
 
+class StreamPayload(BoxPayload):
+    """A payload that is read from the stream on demand.
+
+    It is a file-like object returning at most size bytes,
+    size is None when the box extends to the end of the stream.
+    """
+
+    __slots__ = ("buffer", "chunk_size", "fd", "left", "offset",
+                 "payload_size")
+
+    def __init__(self, fd, size, chunk_size=8192):
+        self.fd = fd
+        self.payload_size = size
+        self.chunk_size = chunk_size
+        self.left = size
+        self.buffer = b""
+        self.offset = 0
+
+    def __repr__(self):
+        return "<StreamPayload size={0}>".format(self.size)
+
+    @property
+    def size(self):
+        return self.payload_size
+
+    def _fill(self, size):
+        """Reads ahead until size bytes are buffered
+           or the payload is exhausted."""
+        chunks = [self.buffer[self.offset:]]
+        buffered = len(chunks[0])
+
+        while buffered < size and self.left != 0:
+            read_size = max(size - buffered, self.chunk_size)
+            if self.left is not None:
+                read_size = min(read_size, self.left)
+
+            try:
+                data = self.fd.read(read_size)
+            except IOError as err:
+                raise F4VError("Failed to read data: {0}".format(str(err)))
+
+            if not data:
+                if self.left is not None:
+                    raise F4VError("End of stream before required data could be read")
+
+                self.left = 0
+                break
+
+            if self.left is not None:
+                self.left -= len(data)
+
+            chunks.append(data)
+            buffered += len(data)
+
+        self.buffer = b"".join(chunks)
+        self.offset = 0
+
+    def read(self, size=-1):
+        if size < 0:
+            chunks = [self.buffer[self.offset:]]
+            self.buffer, self.offset = b"", 0
+
+            while self.left != 0:
+                self._fill(self.chunk_size)
+                if not self.buffer:
+                    break
+
+                chunks.append(self.buffer)
+                self.buffer = b""
+
+            return b"".join(chunks)
+
+        if len(self.buffer) - self.offset < size:
+            self._fill(size)
+
+        data = self.buffer[self.offset:self.offset + size]
+        self.offset += len(data)
+
+        return data
+
+    def skip(self):
+        """Discards the rest of the payload."""
+        self.buffer, self.offset = b"", 0
+
+        while self.left != 0:
+            self._fill(self.chunk_size)
+            if not self.buffer:
+                break
+
+            self.buffer = b""
+
+    def _serialize(self, packet):
+        packet += self.read()
+
+
 class BoxPayloadFTYP(BoxPayload):
+    __slots__ = ("compatible_brands", "major_brand", "minor_version")
+
     def __init__(self, major_brand="f4v", minor_version=0,
                  compatible_brands=["isom", "mp42", "m4v"]):
         self.major_brand = major_brand
@@ -203,6 +319,9 @@ class BoxPayloadFTYP(BoxPayload):
 
 
 class BoxPayloadMVHD(BoxPayload):
+    __slots__ = ("creation_time", "duration", "matrix", "modification_time",
+                 "next_track_id", "rate", "time_scale", "version", "volume")
+
     def __init__(self, version=0, creation_time=0, modification_time=0,
                  time_scale=1000, duration=0, rate=1.0, volume=1.0,
                  matrix=[65536, 0, 0, 0, 65536, 0, 0, 0, 1073741824],
@@ -284,6 +403,8 @@ class BoxPayloadMVHD(BoxPayload):
 
 
 class SampleFlags(BoxPayload):
+    __slots__ = ("flags",)
+
     class Flags(Union):
         class Bits(BigEndianStructure):
             _fields_ = [("reserved", c_uint8, 6),
@@ -327,6 +448,10 @@ class SampleFlags(BoxPayload):
 
 
 class BoxPayloadTREX(BoxPayload):
+    __slots__ = ("default_sample_description_index", "default_sample_duration",
+                 "default_sample_flags", "default_sample_size", "track_id",
+                 "version")
+
     def __init__(self, version, track_id,
                  default_sample_description_index,
                  default_sample_duration, default_sample_size,
@@ -368,6 +493,10 @@ class BoxPayloadTREX(BoxPayload):
 
 
 class BoxPayloadTKHD(BoxPayload):
+    __slots__ = ("alternate_group", "creation_time", "duration", "flags",
+                 "height", "layer", "modification_time", "track_id",
+                 "transform_matrix", "version", "volume", "width")
+
     def __init__(self, version=0, flags=1, creation_time=0, modification_time=0,
                  track_id=1, duration=0, layer=0, alternate_group=0, volume=0.0,
                  transform_matrix=[65536, 0, 0, 0, 65536, 0, 0, 0, 1073741824],
@@ -450,6 +579,9 @@ class BoxPayloadTKHD(BoxPayload):
 
 
 class BoxPayloadMDHD(BoxPayload):
+    __slots__ = ("creation_time", "duration", "language", "modification_time",
+                 "time_scale", "version")
+
     def __init__(self, version=0, creation_time=0, modification_time=0,
                  time_scale=1000, duration=0, language="eng"):
         self.version = version
@@ -498,6 +630,8 @@ class BoxPayloadMDHD(BoxPayload):
 
 
 class BoxPayloadHDLR(BoxPayload):
+    __slots__ = ("handler_type", "name", "predefined", "version")
+
     def __init__(self, version=0, predefined=0, handler_type="vide",
                  name=""):
         self.version = version
@@ -542,6 +676,8 @@ class BoxPayloadHDLR(BoxPayload):
 
 
 class BoxPayloadVMHD(BoxPayload):
+    __slots__ = ("flags", "graphics_mode", "op_color", "version")
+
     def __init__(self, version=0, flags=1, graphics_mode=0, op_color=[0, 0, 0]):
         self.version = version
         self.flags = flags
@@ -574,6 +710,8 @@ class BoxPayloadVMHD(BoxPayload):
 
 
 class BoxPayloadDREF(BoxContainer):
+    __slots__ = ("version",)
+
     def __init__(self, version=0, boxes=[]):
         self.version = version
         self.boxes = boxes
@@ -610,6 +748,8 @@ class BoxPayloadDREF(BoxContainer):
 
 
 class BoxPayloadURL(BoxPayload):
+    __slots__ = ("flags", "version")
+
     def __init__(self, version=0, flags=1):
         self.version = version
         self.flags = flags
@@ -631,6 +771,8 @@ class BoxPayloadURL(BoxPayload):
 
 
 class BoxPayloadSTSD(BoxContainer):
+    __slots__ = ("descriptions", "version")
+
     def __init__(self, version=0, descriptions=[]):
         self.version = version
         self.descriptions = descriptions
@@ -671,6 +813,9 @@ class BoxPayloadSTSD(BoxContainer):
 
 
 class BoxPayloadVisualSample(BoxContainer):
+    __slots__ = ("compressor_name", "data_reference_index", "frame_count",
+                 "height", "horiz_resolution", "vert_resolution", "width")
+
     def __init__(self, data_reference_index=0, width=0, height=0,
                  horiz_resolution=0.0, vert_resolution=0.0, frame_count=0,
                  compressor_name="", depth=0, boxes=[]):
@@ -701,21 +846,33 @@ class BoxPayloadVisualSample(BoxContainer):
 
 
 class BoxPayloadMDAT(RawPayload):
+    __slots__ = ()
+
     def __repr__(self):
         return "<BoxPayloadMDAT size={0}>".format(self.size)
 
 
 class BoxPayloadSKIP(RawPayload):
+    __slots__ = ()
+
     def __repr__(self):
         return "<BoxPayloadSKIP size={0}>".format(self.size)
 
 
 class BoxPayloadFREE(RawPayload):
+    __slots__ = ()
+
     def __repr__(self):
         return "<BoxPayloadFREE size={0}>".format(self.size)
 
 
 class BoxPayloadABST(BoxPayload):
+    __slots__ = ("bootstrap_info_version", "current_media_time", "drm_data",
+                 "flags", "fragment_run_table_entries", "metadata",
+                 "movie_identifier", "quality_entry_table",
+                 "segment_run_table_entries", "server_entry_table",
+                 "smpte_time_code_offset", "time_scale", "version")
+
     class Flags(Union):
         class Bits(BigEndianStructure):
             _fields_ = [("profile", c_uint8, 2),
@@ -725,6 +882,10 @@ class BoxPayloadABST(BoxPayload):
 
         _fields_ = [("bit", Bits), ("byte", c_uint8)]
 
+    # Version, reserved, bootstrap info version, flags,
+    # time scale, current media time and SMPTE time code offset
+    __packer__ = PrimitiveType(">B3xIBIQQ")
+
     def __init__(self, version, bootstrap_info_version, profile, live, update,
                  time_scale, current_media_time, smpte_time_code_offset,
                  movie_identifier, server_entry_table, quality_entry_table,
@@ -809,14 +970,10 @@ class BoxPayloadABST(BoxPayload):
 
     @classmethod
     def _deserialize(cls, io):
-        version = U8.read(io)
-        U24BE.read(io)  # Reserved
-        bootstrap_info_version = U32BE.read(io)
         flags = cls.Flags()
-        flags.byte = U8.read(io)
-        time_scale = U32BE.read(io)
-        current_media_time = U64BE.read(io)
-        smpte_time_code_offset = U64BE.read(io)
+        (version, bootstrap_info_version, flags.byte, time_scale,
+         current_media_time,
+         smpte_time_code_offset) = cls.__packer__.unpack(io.read(cls.__packer__.size))
         movie_identifier = CString.read(io)
 
         server_entry_table = []
@@ -858,6 +1015,9 @@ class BoxPayloadABST(BoxPayload):
 
 
 class SegmentRunEntry(BoxPayload):
+    __slots__ = ("first_segment", "fragments_per_segment")
+    __packer__ = PrimitiveType(">II")
+
     def __init__(self, first_segment, fragments_per_segment):
         self.first_segment = first_segment
         self.fragments_per_segment = fragments_per_segment
@@ -867,18 +1027,32 @@ class SegmentRunEntry(BoxPayload):
         return 8
 
     def _serialize(self, packet):
-        packet += U32BE(self.first_segment)
-        packet += U32BE(self.fragments_per_segment)
+        packet += self.__packer__.pack(self.first_segment,
+                                       self.fragments_per_segment)
 
     @classmethod
     def _deserialize(cls, io):
-        first_segment = U32BE.read(io)
-        fragments_per_segment = U32BE.read(io)
+        first_segment, fragments_per_segment = cls.__packer__.unpack(io.read(8))
 
         return cls(first_segment, fragments_per_segment)
 
+    @classmethod
+    def deserialize_table(cls, io, count):
+        """Reads count entries with a single read."""
+        try:
+            data = io.read(count * 8)
+            unpack_from = cls.__packer__.unpack_from
+
+            return [cls(*unpack_from(data, offset))
+                    for offset in range(0, count * 8, 8)]
+        except struct_error as err:
+            raise cls.exception(err)
+
 
 class BoxPayloadASRT(BoxPayload):
+    __slots__ = ("flags", "quality_segment_url_modifiers",
+                 "segment_run_entry_table", "version")
+
     def __init__(self, version, flags, quality_segment_url_modifiers,
                  segment_run_entry_table):
         self.version = version
@@ -912,8 +1086,8 @@ class BoxPayloadASRT(BoxPayload):
 
     @classmethod
     def _deserialize(cls, io):
-        version = U8.read(io)
-        flags = U24BE.read(io)
+        version_flags = U32BE.read(io)
+        version, flags = version_flags >> 24, version_flags & 0xFFFFFF
 
         quality_segment_url_modifiers = []
         quality_entry_count = U8.read(io)
@@ -923,17 +1097,17 @@ class BoxPayloadASRT(BoxPayload):
             quality_segment_url_modifiers.append(quality)
 
         segment_run_entry_count = U32BE.read(io)
-        segment_run_entry_table = []
-
-        for i in range(segment_run_entry_count):
-            segment_run_entry = SegmentRunEntry.deserialize(io)
-            segment_run_entry_table.append(segment_run_entry)
+        segment_run_entry_table = SegmentRunEntry.deserialize_table(io, segment_run_entry_count)
 
         return cls(version, flags, quality_segment_url_modifiers,
                    segment_run_entry_table)
 
 
 class FragmentRunEntry(BoxPayload):
+    __slots__ = ("discontinuity_indicator", "first_fragment",
+                 "first_fragment_timestamp", "fragment_duration")
+    __packer__ = PrimitiveType(">IQI")
+
     def __init__(self, first_fragment, first_fragment_timestamp,
                  fragment_duration, discontinuity_indicator):
         self.first_fragment = first_fragment
@@ -951,18 +1125,17 @@ class FragmentRunEntry(BoxPayload):
         return size
 
     def _serialize(self, packet):
-        packet += U32BE(self.first_fragment)
-        packet += U64BE(self.first_fragment_timestamp)
-        packet += U32BE(self.fragment_duration)
+        packet += self.__packer__.pack(self.first_fragment,
+                                       self.first_fragment_timestamp,
+                                       self.fragment_duration)
 
         if self.fragment_duration == 0:
             packet += U8(self.discontinuity_indicator)
 
     @classmethod
     def _deserialize(cls, io):
-        first_fragment = U32BE.read(io)
-        first_fragment_timestamp = U64BE.read(io)
-        fragment_duration = U32BE.read(io)
+        (first_fragment, first_fragment_timestamp,
+         fragment_duration) = cls.__packer__.unpack(io.read(16))
 
         if fragment_duration == 0:
             discontinuity_indicator = U8.read(io)
@@ -972,8 +1145,48 @@ class FragmentRunEntry(BoxPayload):
         return cls(first_fragment, first_fragment_timestamp,
                    fragment_duration, discontinuity_indicator)
 
+    @classmethod
+    def deserialize_table(cls, io, count):
+        """Reads count entries in as few reads as possible, without
+           reading past the last entry."""
+        unpack_from = cls.__packer__.unpack_from
+        entries = []
+        data, offset = b"", 0
+
+        try:
+            for i in range(count):
+                # An entry is at least 16 bytes, 17 when it has
+                # a discontinuity indicator
+                if len(data) - offset < 16:
+                    data = data[offset:] + io.read((count - i) * 16 - (len(data) - offset))
+                    offset = 0
+
+                (first_fragment, first_fragment_timestamp,
+                 fragment_duration) = unpack_from(data, offset)
+                offset += 16
+
+                if fragment_duration == 0:
+                    if offset == len(data):
+                        data = io.read((count - i - 1) * 16 + 1)
+                        offset = 0
+
+                    discontinuity_indicator = U8.unpack_from(data, offset)[0]
+                    offset += 1
+                else:
+                    discontinuity_indicator = None
+
+                entries.append(cls(first_fragment, first_fragment_timestamp,
+                                   fragment_duration, discontinuity_indicator))
+        except struct_error as err:
+            raise cls.exception(err)
+
+        return entries
+
 
 class BoxPayloadAFRT(BoxPayload):
+    __slots__ = ("flags", "fragment_run_entry_table",
+                 "quality_segment_url_modifiers", "time_scale", "version")
+
     def __init__(self, version, flags, time_scale,
                  quality_segment_url_modifiers,
                  fragment_run_entry_table):
@@ -1010,9 +1223,8 @@ class BoxPayloadAFRT(BoxPayload):
 
     @classmethod
     def _deserialize(cls, io):
-        version = U8.read(io)
-        flags = U24BE.read(io)
-        time_scale = U32BE.read(io)
+        version_flags, time_scale = unpack_many_from(io.read(8), 0, (U32BE, U32BE))
+        version, flags = version_flags >> 24, version_flags & 0xFFFFFF
 
         quality_segment_url_modifiers = []
         quality_entry_count = U8.read(io)
@@ -1022,11 +1234,7 @@ class BoxPayloadAFRT(BoxPayload):
             quality_segment_url_modifiers.append(quality)
 
         fragment_run_entry_count = U32BE.read(io)
-        fragment_run_entry_table = []
-
-        for i in range(fragment_run_entry_count):
-            fragment_run_entry = FragmentRunEntry.deserialize(io)
-            fragment_run_entry_table.append(fragment_run_entry)
+        fragment_run_entry_table = FragmentRunEntry.deserialize_table(io, fragment_run_entry_count)
 
         return cls(version, flags, time_scale,
                    quality_segment_url_modifiers,
@@ -1034,43 +1242,43 @@ class BoxPayloadAFRT(BoxPayload):
 
 
 class BoxPayloadMVEX(BoxContainer):
-    pass
+    __slots__ = ()
 
 
 class BoxPayloadMFRA(BoxContainer):
-    pass
+    __slots__ = ()
 
 
 class BoxPayloadTRAK(BoxContainer):
-    pass
+    __slots__ = ()
 
 
 class BoxPayloadMDIA(BoxContainer):
-    pass
+    __slots__ = ()
 
 
 class BoxPayloadMINF(BoxContainer):
-    pass
+    __slots__ = ()
 
 
 class BoxPayloadSTBL(BoxContainer):
-    pass
+    __slots__ = ()
 
 
 class BoxPayloadMOOV(BoxContainer):
-    pass
+    __slots__ = ()
 
 
 class BoxPayloadMOOF(BoxContainer):
-    pass
+    __slots__ = ()
 
 
 class BoxPayloadMETA(BoxContainer):
-    pass
+    __slots__ = ()
 
 
 class BoxPayloadDINF(BoxContainerSingle):
-    pass
+    __slots__ = ()
 
 
 PayloadTypes = {
@@ -1,6 +1,8 @@
 import os
 import sys
 
+from collections import OrderedDict
+
 is_py2 = (sys.version_info[0] == 2)
 is_py3 = (sys.version_info[0] == 3)
 is_win32 = os.name == "nt"
@@ -27,11 +29,5 @@ elif is_py3:
     string_types = (str,)
     integer_types = (int,)
 
-
-try:
-    from collections import OrderedDict
-except ImportError:
-    from .ordereddict import OrderedDict
-
 __all__ = ["is_py2", "is_py3", "is_win32", "str", "bytes", "range",
            "OrderedDict"]
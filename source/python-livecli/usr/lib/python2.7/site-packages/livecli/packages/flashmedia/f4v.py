@@ -1,26 +1,42 @@
 #!/usr/bin/env python
 
-from .box import Box, RawPayload
+from .box import Box, RawPayload, StreamPayload
 from .compat import is_py2
 
 
 class F4V(object):
-    def __init__(self, fd, strict=False, raw_payload=False):
+    """Iterates over the boxes in fd.
+
+    With stream_payload the payloads are not read into memory, they
+    are file-like objects reading from fd which are valid until the
+    next box is requested.
+    """
+
+    def __init__(self, fd, strict=False, raw_payload=False,
+                 stream_payload=False):
         self.fd = fd
         self.raw_payload = raw_payload
+        self.stream_payload = stream_payload
         self.strict = strict
+        self.box = None
 
     def __iter__(self):
         return self
 
     def __next__(self):
+        if self.box and isinstance(self.box.payload, StreamPayload):
+            self.box.payload.skip()
+
         try:
             box = Box.deserialize(self.fd,
                                   strict=self.strict,
-                                  raw_payload=self.raw_payload)
+                                  raw_payload=self.raw_payload,
+                                  stream_payload=self.stream_payload)
         except IOError:
             raise StopIteration
 
+        self.box = box
+
         return box
 
     if is_py2:
@@ -4,6 +4,8 @@ import struct
 
 
 class Packet(object):
+    __slots__ = ()
+
     exception = IOError
 
     @classmethod
@@ -55,6 +57,8 @@ class Packet(object):
 
 
 class TagData(Packet):
+    __slots__ = ()
+
     @property
     def size(self):
         if isinstance(self.data, Packet):
@@ -97,6 +97,9 @@ class VideoFlags(Union):
 
 
 class Header(Packet):
+    __slots__ = ("data_offset", "flags", "tag0_size", "version")
+    __packer__ = PrimitiveType(">3sBBII")
+
     exception = FLVError
 
     def __init__(self, version=1, has_audio=False, has_video=False, data_offset=9, tag0_size=0):
@@ -121,46 +124,30 @@ class Header(Packet):
 
     @classmethod
     def _deserialize(cls, io):
-        head = io.read(3)
-
-        if head != b"FLV":
-            raise FLVError("Invalid FLV header")
-
-        version = U8.read(io)
-        flags = TypeFlags()
-        flags.byte = U8.read(io)
-        offset = U32BE.read(io)
-        tag0_size = U32BE.read(io)
-
-        return Header(version, bool(flags.bit.audio), bool(flags.bit.video),
-                      offset, tag0_size)
+        return cls._deserialize_from(io.read(cls.__packer__.size), 0)[0]
 
     @classmethod
     def _deserialize_from(cls, buf, offset):
         head = buf[offset:offset + 3]
-        offset += 3
 
         if head != b"FLV":
             raise FLVError("Invalid FLV header")
 
         flags = TypeFlags()
 
-        (version, flags.byte, tag0_offset,
-         tag0_size) = unpack_many_from(buf, offset, (U8, U8, U32BE, U32BE))
+        (head, version, flags.byte, tag0_offset,
+         tag0_size) = cls.__packer__.unpack_from(buf, offset)
 
         rval = Header(version, bool(flags.bit.audio), bool(flags.bit.video),
                       tag0_offset, tag0_size)
 
-        offset += 10
+        offset += cls.__packer__.size
 
         return (rval, offset)
 
     def _serialize(self, packet):
-        packet += b"FLV"
-        packet += U8(self.version)
-        packet += U8(self.flags.byte)
-        packet += U32BE(self.data_offset)
-        packet += U32BE(self.tag0_size)
+        packet += self.__packer__.pack(b"FLV", self.version, self.flags.byte,
+                                       self.data_offset, self.tag0_size)
 
     def _serialize_into(self, packet, offset):
         offset = pack_bytes_into(packet, offset, b"FLV")
@@ -173,6 +160,11 @@ class Header(Packet):
 
 
 class Tag(Packet):
+    __slots__ = ("data", "flags", "padding", "streamid", "timestamp")
+    # Flags, data size, timestamp, timestamp extension and stream id,
+    # the 24-bit integers are split into 16 and 8 bits like U24BE
+    __packer__ = PrimitiveType(">BHBHBBHB")
+
     exception = FLVError
 
     def __init__(self, typ=TAG_TYPE_SCRIPT, timestamp=0, data=None,
@@ -214,6 +206,21 @@ class Tag(Packet):
     def size(self):
         return 4 + self.tag_size
 
+    @classmethod
+    def _unpack_header(cls, buf, offset):
+        """Returns the flags, data size, timestamp and stream id
+           of the tag header at offset in buf."""
+        (flagb, size_high, size_low, timestamp_high, timestamp_low,
+         timestamp_ext, streamid_high,
+         streamid_low) = cls.__packer__.unpack_from(buf, offset)
+
+        flags = TagFlags()
+        flags.byte = flagb
+
+        return (flags, (size_high << 8) | size_low,
+                (timestamp_high << 8) | timestamp_low | (timestamp_ext << 24),
+                (streamid_high << 8) | streamid_low)
+
     @classmethod
     def _deserialize(cls, io, strict=False, raw_data=False):
         header = io.read(11)
@@ -221,12 +228,8 @@ class Tag(Packet):
         if len(header) < 11:
             raise FLVError("Insufficient tag header")
 
-        (flagb, data_size, timestamp, timestamp_ext,
-         streamid) = unpack_many_from(header, 0, (U8, U24BE, U24BE, U8, U24BE))
-
-        flags = TagFlags()
-        flags.byte = flagb
-        timestamp |= timestamp_ext << 24
+        (flags, data_size, timestamp,
+         streamid) = cls._unpack_header(header, 0)
 
         # Don't parse encrypted data
         if flags.bit.filter == 1:
@@ -260,15 +263,11 @@ class Tag(Packet):
     @classmethod
     def _deserialize_from(cls, buf, offset, strict=False,
                           raw_data=False):
-        (flagb, data_size, timestamp, timestamp_ext,
-         streamid) = unpack_many_from(buf, offset, (U8, U24BE, U24BE, U8, U24BE))
+        (flags, data_size, timestamp,
+         streamid) = cls._unpack_header(buf, offset)
 
         offset += 11
 
-        flags = TagFlags()
-        flags.byte = flagb
-        timestamp |= timestamp_ext << 24
-
         # Don't parse encrypted data
         if flags.bit.filter == 1:
             raw_data = True
@@ -299,12 +298,15 @@ class Tag(Packet):
         return (tag, offset)
 
     def _serialize(self, packet, strict=True):
-        packet += U8(self.flags.byte)
-        packet += U24BE(self.data_size)
+        data_size = self.data_size
+        timestamp = self.timestamp
+        streamid = self.streamid
 
-        packet += U24BE(self.timestamp & 0xFFFFFF)
-        packet += U8((self.timestamp >> 24) & 0x7F)
-        packet += U24BE(self.streamid)
+        packet += self.__packer__.pack(self.flags.byte,
+                                       data_size >> 8, data_size & 0xFF,
+                                       (timestamp >> 8) & 0xFFFF, timestamp & 0xFF,
+                                       (timestamp >> 24) & 0x7F,
+                                       streamid >> 8, streamid & 0xFF)
 
         self.data.serialize(packet)
         packet += self.padding
@@ -332,6 +334,8 @@ class Tag(Packet):
 
 
 class FrameData(TagData):
+    __slots__ = ("data", "type")
+
     def __init__(self, type=1, data=b""):
         self.type = type
         self.data = data
@@ -383,6 +387,8 @@ class FrameData(TagData):
 
 
 class RawData(TagData):
+    __slots__ = ("data",)
+
     def __init__(self, data=None):
         if not data:
             data = b""
@@ -415,6 +421,8 @@ class RawData(TagData):
 
 
 class AudioData(TagData):
+    __slots__ = ("data", "flags")
+
     def __init__(self, codec=0, rate=0, bits=0, type=0, data=None):
         self.flags = AudioFlags()
         self.flags.bit.codec = codec
@@ -498,10 +506,12 @@ class AudioData(TagData):
 
 
 class AACAudioData(FrameData):
-    pass
+    __slots__ = ()
 
 
 class VideoData(TagData):
+    __slots__ = ("data", "flags")
+
     def __init__(self, type=0, codec=0, data=None):
         self.flags = VideoFlags()
         self.flags.bit.type = type
@@ -589,10 +599,12 @@ class VideoData(TagData):
 
 
 class VideoCommandFrame(FrameData):
-    pass
+    __slots__ = ()
 
 
 class AVCVideoData(TagData):
+    __slots__ = ("composition_time", "data", "type")
+
     def __init__(self, type=1, composition_time=0, data=None):
         self.type = type
         self.composition_time = composition_time
@@ -659,6 +671,8 @@ class AVCVideoData(TagData):
 
 
 class ScriptData(TagData):
+    __slots__ = ("name", "value")
+
     def __init__(self, name=None, value=None):
         self.name = name
         self.value = value
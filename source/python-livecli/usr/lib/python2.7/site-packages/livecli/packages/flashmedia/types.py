@@ -448,6 +448,8 @@ class CString(String):
 
 
 class ScriptDataType(object):
+    __slots__ = ()
+
     __identifier__ = 0
 
 
@@ -498,6 +500,8 @@ class ScriptDataObjectEnd(Exception):
 
 
 class ScriptDataObject(OrderedDict, ScriptDataType):
+    __slots__ = ()
+
     __identifier__ = SCRIPT_DATA_TYPE_OBJECT
 
     @classmethod
@@ -575,6 +579,8 @@ class ScriptDataObject(OrderedDict, ScriptDataType):
 
 
 class ScriptDataECMAArray(ScriptDataObject):
+    __slots__ = ()
+
     __identifier__ = SCRIPT_DATA_TYPE_ECMAARRAY
 
     @classmethod
@@ -1407,6 +1413,8 @@ class AMF3ArrayPacker(DynamicType, AMF3Type):
 
 
 class AMF3Date(object):
+    __slots__ = ("time",)
+
     def __init__(self, time):
         self.time = time
 
@@ -2,8 +2,6 @@
 
 from .compat import bytes, is_py2, string_types
 
-import struct
-
 
 def byte(ordinal):
     if isinstance(ordinal, string_types):
@@ -63,8 +61,7 @@ def pack_many_into(buf, offset, types, values):
 
 def pack_bytes_into(buf, offset, data):
     size = len(data)
-    fmt = str(size) + "s"
-    struct.pack_into(fmt, buf, offset, data)
+    buf[offset:offset + size] = data
 
     return offset + size
 
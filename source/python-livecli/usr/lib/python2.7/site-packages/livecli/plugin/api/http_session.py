@@ -1,6 +1,8 @@
 import time
+from threading import Lock
+
 from requests import Session, __build__ as requests_version
-from requests.adapters import HTTPAdapter
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
 
 from livecli.packages.requests_file import FileAdapter
 
@@ -20,10 +22,15 @@ try:
 except (ImportError, AttributeError):
     pass
 
+try:
+    from requests.packages.urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+except ImportError:
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
 from ...exceptions import PluginError
 from ...utils import parse_json, parse_xml
 
-__all__ = ["HTTPSession"]
+__all__ = ["HTTPSession", "HTTPPoolStats"]
 
 
 def _parse_keyvalue_list(val):
@@ -35,12 +42,185 @@ def _parse_keyvalue_list(val):
             continue
 
 
-class HTTPAdapterWithReadTimeout(HTTPAdapter):
+class HTTPPoolStats(object):
+    """Connection counters of a single host.
+
+    :attr requests: requests sent to the host
+    :attr connections: connections created by the pool
+    :attr handshakes: TCP/TLS connects, including reconnects
+                      of dropped keep-alive connections
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.handshakes = 0
+        self.lock = Lock()
+
+    def inc(self, counter):
+        """Increments a counter, the pool is used by many threads."""
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @property
+    def reuses(self):
+        """Requests sent over an already established connection."""
+        return max(self.requests - self.handshakes, 0)
+
+    def as_dict(self):
+        with self.lock:
+            return dict(requests=self.requests,
+                        reuses=self.reuses,
+                        connections=self.connections,
+                        handshakes=self.handshakes)
+
+
+class PoolStatsMixin(object):
+    """Counts requests and connects of a urllib3 connection pool
+       and allows growing the pool while it's in use."""
+
+    def __init__(self, host, port=None, pool_stats=None, **kwargs):
+        super(PoolStatsMixin, self).__init__(host, port, **kwargs)
+        self.stats = pool_stats(self.scheme, host, self.port)
+
+    def _new_conn(self):
+        conn = super(PoolStatsMixin, self)._new_conn()
+        self.stats.inc("connections")
+
+        connect = conn.connect
+        stats = self.stats
+
+        def counted_connect(*args, **kwargs):
+            stats.inc("handshakes")
+            return connect(*args, **kwargs)
+
+        conn.connect = counted_connect
+
+        return conn
+
+    def urlopen(self, *args, **kwargs):
+        self.stats.inc("requests")
+        return super(PoolStatsMixin, self).urlopen(*args, **kwargs)
+
+    def resize(self, maxsize):
+        """Grows the pool to keep up to maxsize idle connections.
+
+        Returns False if the pool is not a queue.Queue as in the
+        urllib3 versions this was written for, it is left alone then.
+        """
+        slots = self.pool
+        if slots is None:
+            return True
+
+        if not all(hasattr(slots, name) for name in ("maxsize", "mutex", "not_empty", "queue")):
+            return False
+
+        if maxsize <= slots.maxsize:
+            return True
+
+        with slots.mutex:
+            grow = maxsize - slots.maxsize
+            slots.maxsize = maxsize
+            # The pool is a LIFO queue, the new empty slots go to the
+            # bottom so that idle connections are still used first.
+            if isinstance(slots.queue, list):
+                slots.queue[:0] = [None] * grow
+            else:
+                slots.queue.extendleft([None] * grow)
+            slots.not_empty.notify(grow)
+
+        return True
+
+
+class HTTPStatsConnectionPool(PoolStatsMixin, HTTPConnectionPool):
+    pass
+
+
+class HTTPSStatsConnectionPool(PoolStatsMixin, HTTPSConnectionPool):
+    pass
+
+
+class HTTPPoolAdapter(HTTPAdapter):
+    """A HTTPAdapter that keeps per-host connection statistics
+       and can be resized without dropping its idle connections."""
+
+    def __init__(self, *args, **kwargs):
+        self.stats = {}
+        self.stats_lock = Lock()
+        HTTPAdapter.__init__(self, *args, **kwargs)
+
+    def __setstate__(self, state):
+        self.stats = {}
+        self.stats_lock = Lock()
+        HTTPAdapter.__setstate__(self, state)
+
+    def host_stats(self, scheme, host, port):
+        key = "{0}://{1}:{2}".format(scheme, host, port)
+        with self.stats_lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = HTTPPoolStats()
+
+        return stats
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        HTTPAdapter.init_poolmanager(self, connections, maxsize, block=block, **pool_kwargs)
+
+        def pool_class(cls):
+            def new_pool(host, port=None, **kwargs):
+                kwargs.update(maxsize=self._pool_maxsize,
+                              block=self._pool_block)
+                return cls(host, port, pool_stats=self.host_stats, **kwargs)
+            return new_pool
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": pool_class(HTTPStatsConnectionPool),
+            "https": pool_class(HTTPSStatsConnectionPool)
+        }
+
+    def resize(self, connections, maxsize, block):
+        """Updates the pool sizes, pools that are already open
+           are grown in place to keep their connections alive."""
+        if (connections, maxsize, block) == (self._pool_connections,
+                                             self._pool_maxsize,
+                                             self._pool_block):
+            return
+
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+
+        # The pool manager keys its pools by their settings, so they are
+        # left alone and new pools pick up the sizes in new_pool()
+        pools = self.poolmanager.pools
+        try:
+            if connections > pools._maxsize:
+                pools._maxsize = connections
+
+            resized = True
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+
+                pool.block = block
+                if isinstance(pool, PoolStatsMixin):
+                    resized = pool.resize(maxsize) and resized
+        except (AttributeError, TypeError):
+            resized = False
+
+        if not resized:
+            # The urllib3 internals differ, start over with new pools,
+            # their idle connections are closed
+            self.init_poolmanager(connections, maxsize, block=block)
+
+
+class HTTPAdapterWithReadTimeout(HTTPPoolAdapter):
     """This is a backport of the timeout behaviour from requests 2.3.0+
        where timeout is applied to both connect and read."""
 
     def get_connection(self, *args, **kwargs):
-        conn = HTTPAdapter.get_connection(self, *args, **kwargs)
+        conn = HTTPPoolAdapter.get_connection(self, *args, **kwargs)
 
         # Override the urlopen method on this connection
         if not hasattr(conn.urlopen, "wrapped"):
@@ -65,12 +245,81 @@ class HTTPSession(Session):
 
         self.timeout = 20.0
 
+        # Connection pool options, None is sized automatically
+        # from the segment threads of the active streams
+        self.pool_connections = None
+        self.pool_maxsize = None
+        self.pool_block = False
+        self.pool_lock = Lock()
+        self.pool_streams = 0
+        self.pool_threads = 0
+
         if TIMEOUT_ADAPTER_NEEDED:
-            self.mount("http://", HTTPAdapterWithReadTimeout())
-            self.mount("https://", HTTPAdapterWithReadTimeout())
+            adapter_class = HTTPAdapterWithReadTimeout
+        else:
+            adapter_class = HTTPPoolAdapter
 
+        self.mount("http://", adapter_class())
+        self.mount("https://", adapter_class())
         self.mount('file://', FileAdapter())
 
+    def acquire_pool(self, threads):
+        """Registers a stream that downloads with up to threads
+           connections at once and grows the connection pools."""
+        with self.pool_lock:
+            self.pool_streams += 1
+            self.pool_threads += threads
+            self.update_pool()
+
+    def release_pool(self, threads):
+        """Unregisters a stream added with acquire_pool()."""
+        with self.pool_lock:
+            self.pool_streams = max(self.pool_streams - 1, 0)
+            self.pool_threads = max(self.pool_threads - threads, 0)
+
+    def update_pool(self):
+        """Applies the pool options to the mounted HTTP adapters.
+
+        Pools are never shrunk automatically, surplus connections
+        are closed when they are released anyway.
+        """
+        connections = self.pool_connections
+        if not connections:
+            # Streams usually talk to a playlist host and a media host
+            connections = max(DEFAULT_POOLSIZE, self.pool_streams * 2)
+
+        maxsize = self.pool_maxsize
+        if not maxsize:
+            # One connection per segment thread, plus one for
+            # playlist and key requests of each stream
+            maxsize = max(DEFAULT_POOLSIZE, self.pool_threads + self.pool_streams)
+
+        for adapter in self.adapters.values():
+            if isinstance(adapter, HTTPPoolAdapter):
+                if not self.pool_connections:
+                    connections = max(connections, adapter._pool_connections)
+                if not self.pool_maxsize:
+                    maxsize = max(maxsize, adapter._pool_maxsize)
+                adapter.resize(connections, maxsize, bool(self.pool_block))
+
+    def pool_stats(self):
+        """Returns the connection statistics of every host
+           contacted by this session.
+
+        :return: a dict of ``scheme://host:port`` to a dict with the
+                 ``requests``, ``reuses``, ``connections`` and
+                 ``handshakes`` counters
+        """
+        stats = {}
+        for adapter in self.adapters.values():
+            if isinstance(adapter, HTTPPoolAdapter):
+                with adapter.stats_lock:
+                    items = list(adapter.stats.items())
+                for key, host_stats in items:
+                    stats[key] = host_stats.as_dict()
+
+        return stats
+
     @classmethod
     def determine_json_encoding(cls, sample):
         """
@@ -171,6 +420,7 @@ class HTTPSession(Session):
                     err = exception("Unable to open URL: {url} ({err})".format(url=url,
                                                                                err=rerr))
                     err.err = rerr
+                    err.retries = retries
                     raise err
                 retries += 1
                 # back off retrying, but only to a maximum sleep time
@@ -180,5 +430,7 @@ class HTTPSession(Session):
 
         if schema:
             res = schema.validate(res.text, name="response text", exception=PluginError)
+        else:
+            res.retries = retries
 
         return res
@@ -0,0 +1,261 @@
+"""An index of the loaded plugins used to find the plugins
+   that may handle an URL without trying all of them."""
+
+import re
+
+from collections import OrderedDict
+from threading import Lock
+
+from ..compat import is_py2
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+__all__ = ["PluginIndex", "plugin_patterns", "required_literals"]
+
+_chr = unichr if is_py2 else chr  # noqa: F821
+_regex_type = type(re.compile(""))
+
+# Length of the substrings the index is keyed by
+GRAM_SIZE = 3
+
+_index_cache = {}
+_literals_cache = {}
+
+
+def _literal_sets(items):
+    """Returns a list of sets of strings, every string matched by the
+       parsed items contains at least one string of each set."""
+    run = []
+    found = []
+
+    def end_run():
+        if run:
+            found.append(set(["".join(run)]))
+            del run[:]
+
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            run.append(_chr(av))
+            continue
+        elif op == sre_parse.IN and len(av) == 1 and av[0][0] == sre_parse.LITERAL:
+            run.append(_chr(av[0][1]))
+            continue
+
+        end_run()
+        if op == sre_parse.SUBPATTERN:
+            # (group, add_flags, del_flags, pattern) on Python 3.6+
+            found.extend(_literal_sets(av[-1]))
+        elif op == sre_parse.BRANCH:
+            branches = [_longest(_literal_sets(branch)) for branch in av[1]]
+            if all(branches):
+                found.append(set().union(*branches))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] > 0:
+            found.extend(_literal_sets(av[2]))
+
+    end_run()
+
+    return found
+
+
+def _longest(literal_sets):
+    """Returns the set with the longest shortest string."""
+    best = None
+    for literals in literal_sets:
+        if best is None or min(map(len, literals)) > min(map(len, best)):
+            best = literals
+
+    return best
+
+
+def required_literals(pattern, flags=0):
+    """Returns a list of sets of lowercase strings, every string the
+       pattern matches contains at least one string of each set."""
+    key = (pattern, flags)
+    if key in _literals_cache:
+        return _literals_cache[key]
+
+    try:
+        literal_sets = _literal_sets(sre_parse.parse(pattern, flags))
+    except Exception:
+        literal_sets = []
+
+    literal_sets = [frozenset(literal.lower() for literal in literals)
+                    for literals in literal_sets]
+
+    # Plugins are loaded again by every session, their
+    # patterns are only parsed once per process
+    _literals_cache[key] = literal_sets
+
+    return literal_sets
+
+
+def plugin_regexes(plugin):
+    """Returns the compiled regexes that can_handle_url of a plugin
+       refers to, by name, in the plugin class or its module."""
+    func = getattr(plugin.can_handle_url, "__func__", plugin.can_handle_url)
+    code = getattr(func, "__code__", None)
+    if code is None:
+        return []
+
+    regexes = []
+    for name in code.co_names:
+        value = getattr(plugin, name, None)
+        if value is None:
+            value = func.__globals__.get(name)
+        if value is re:
+            # Matches against a pattern that is not known here
+            return []
+        elif isinstance(value, _regex_type):
+            regexes.append(value)
+
+    return regexes
+
+
+def plugin_patterns(plugin):
+    """Returns the (pattern, flags) of the regexes of plugin_regexes()."""
+    return tuple((regex.pattern, regex.flags)
+                 for regex in plugin_regexes(plugin))
+
+
+def _iter_grams(value):
+    for i in range(len(value) - GRAM_SIZE + 1):
+        yield value[i:i + GRAM_SIZE]
+
+
+def _build_index(signature):
+    """Returns a dict of substrings to the positions of the plugins
+       requiring them and a list of plugins that are always tried."""
+    grams = {}
+    plugins = []
+
+    for order, (module, patterns) in enumerate(signature):
+        choices = []
+        for pattern, flags in patterns:
+            literal_sets = [literals for literals in required_literals(pattern, flags)
+                            if min(map(len, literals)) >= GRAM_SIZE]
+            choices.append(literal_sets)
+            for literals in literal_sets:
+                for literal in literals:
+                    for gram in _iter_grams(literal):
+                        grams[gram] = grams.get(gram, 0) + 1
+
+        plugins.append((order, choices))
+
+    def rarity(literal):
+        return min(grams[gram] for gram in _iter_grams(literal))
+
+    def cost(literals):
+        return sum(rarity(literal) for literal in literals)
+
+    # Key each plugin by the literals that are the least common,
+    # e.g. a domain name instead of "http"
+    index = {}
+    fallback = []
+    for order, choices in plugins:
+        if not choices or not all(choices):
+            fallback.append(order)
+            continue
+
+        for literal_sets in choices:
+            for literal in min(literal_sets, key=cost):
+                gram = min(_iter_grams(literal), key=grams.get)
+                index.setdefault(gram, set()).add(order)
+
+    return index, fallback
+
+
+class PluginIndex(object):
+    """Finds the plugin for an URL.
+
+    Every literal a plugin's URL regexes require is indexed by one of
+    its substrings, a plugin is only tried when the URL contains one of
+    them. Plugins matching any URL, like hls or resolve, are always
+    tried. The plugins found for the most recent URLs are cached.
+    """
+
+    def __init__(self, cache_size=64):
+        self.cache_size = cache_size
+        self.names = None
+        self.grams = {}
+        self.fallback = []
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+    def clear(self):
+        """Forgets the index, it is rebuilt on the next lookup."""
+        with self._lock:
+            self.names = None
+            self._cache.clear()
+
+    def build(self, entries):
+        """Indexes the plugins, in the order they are tried.
+
+        :param entries: a list of (name, patterns) where patterns is
+                        the value of plugin_patterns() of the plugin
+        """
+        signature = tuple((name, tuple(patterns)) for name, patterns in entries)
+
+        # Every session loads the same plugins again,
+        # so the index is shared between sessions
+        index = _index_cache.get(signature)
+        if index is None:
+            if len(_index_cache) >= 4:
+                _index_cache.clear()
+            index = _index_cache[signature] = _build_index(signature)
+
+        self.names = [name for name, patterns in signature]
+        self.grams, self.fallback = index
+
+    def candidates(self, url):
+        """Returns the names of the plugins that may handle the URL,
+           in the order they were indexed."""
+        url = url.lower()
+        grams = self.grams
+        found = set(self.fallback)
+        for i in range(len(url) - GRAM_SIZE + 1):
+            orders = grams.get(url[i:i + GRAM_SIZE])
+            if orders:
+                found.update(orders)
+
+        return [self.names[order] for order in sorted(found)]
+
+    def resolve(self, url, plugins):
+        """Returns the plugin with the highest priority that can handle
+           the URL or None.
+
+        :param url: the URL to match
+        :param plugins: a dict of the plugins by name, indexed on the
+                        first lookup after clear(), only the plugins
+                        that may handle the URL are looked up in it
+        """
+        with self._lock:
+            if url in self._cache:
+                plugin = self._cache.pop(url)
+                self._cache[url] = plugin
+                return plugin
+
+            if self.names is None:
+                patterns = getattr(plugins, "patterns", None)
+                self.build((name, patterns(name) if patterns else plugin_patterns(plugins[name]))
+                           for name in plugins)
+
+            candidates = self.candidates(url)
+
+        available_plugins = []
+        for name in candidates:
+            plugin = plugins.get(name)
+            if plugin and plugin.can_handle_url(url):
+                available_plugins.append(plugin)
+
+        available_plugins.sort(key=lambda x: x.priority(url), reverse=True)
+        plugin = available_plugins[0] if available_plugins else None
+
+        with self._lock:
+            self._cache[url] = plugin
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return plugin
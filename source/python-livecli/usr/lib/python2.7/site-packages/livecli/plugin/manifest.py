@@ -0,0 +1,157 @@
+"""A manifest of the plugins in a directory, it allows sessions to
+   import a plugin module only when an URL or option needs it."""
+
+import json
+import os
+import sys
+import tempfile
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+from .index import plugin_patterns
+from .. import __version__
+
+__all__ = ["PluginMap", "load_manifest", "save_manifest"]
+
+MANIFEST_VERSION = 1
+
+
+def _manifest_key(path):
+    """Identifies the state of the plugin modules in path,
+       a manifest is only valid for the same key."""
+    files = []
+    for filename in sorted(os.listdir(path)):
+        name, ext = os.path.splitext(filename)
+        if ext != ".py":
+            continue
+
+        stat = os.stat(os.path.join(path, filename))
+        files.append([filename, int(stat.st_mtime), stat.st_size])
+
+    return dict(manifest=MANIFEST_VERSION,
+                livecli=__version__,
+                python="{0}.{1}".format(*sys.version_info),
+                path=os.path.abspath(path),
+                files=files)
+
+
+def load_manifest(filename, path):
+    """Returns a list of (module name, url patterns) of the plugins in
+       path, or None if the manifest is missing or out of date."""
+    try:
+        with open(filename, "r") as fd:
+            manifest = json.load(fd)
+
+        if manifest.get("key") != _manifest_key(path):
+            return None
+
+        return [(str(name), tuple(tuple(pattern) for pattern in patterns))
+                for name, patterns in manifest["plugins"]]
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _is_ascii(value):
+    try:
+        value.encode("ascii") if isinstance(value, type(u"")) else value.decode("ascii")
+        return True
+    except (UnicodeDecodeError, UnicodeEncodeError):
+        return False
+
+
+def _manifest_patterns(plugin):
+    patterns = plugin_patterns(plugin)
+    if all(_is_ascii(pattern) for pattern, flags in patterns):
+        return patterns
+
+    # JSON would turn a byte string pattern into a different unicode
+    # pattern on Python 2, without patterns the plugin is always tried
+    return ()
+
+
+def save_manifest(filename, path, plugins):
+    """Writes the manifest of the plugins loaded from path,
+       errors are silently ignored."""
+    manifest = dict(key=_manifest_key(path),
+                    plugins=[(name, _manifest_patterns(plugin))
+                             for name, plugin in plugins])
+    tempname = None
+    try:
+        if not os.path.exists(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+
+        # A unique name, sessions of other threads may save it too
+        fd, tempname = tempfile.mkstemp(dir=os.path.dirname(filename))
+        with os.fdopen(fd, "w") as fd:
+            json.dump(manifest, fd)
+
+        os.rename(tempname, filename)
+    except (IOError, OSError, ValueError):
+        try:
+            if tempname:
+                os.remove(tempname)
+        except OSError:
+            pass
+
+
+class PluginMap(MutableMapping):
+    """The plugins of a session by module name.
+
+    Plugins added with add_lazy() are imported by calling load(name)
+    the first time they are accessed, until then their URL patterns
+    come from the manifest.
+    """
+
+    def __init__(self, load):
+        self.load = load
+        self.loaded = {}
+        self.lazy = {}
+        self.order = []
+
+    def add_lazy(self, name, patterns):
+        if name not in self.lazy and name not in self.loaded:
+            self.order.append(name)
+        self.lazy[name] = patterns
+
+    def patterns(self, name):
+        """Returns the URL patterns of a plugin without importing it."""
+        if name in self.lazy:
+            return self.lazy[name]
+
+        return plugin_patterns(self.loaded[name])
+
+    def __getitem__(self, name):
+        if name not in self.loaded and name in self.lazy:
+            plugin = self.load(name)
+            self.lazy.pop(name, None)
+            if plugin is None:
+                self.order.remove(name)
+            else:
+                self.loaded[name] = plugin
+
+        return self.loaded[name]
+
+    def __setitem__(self, name, plugin):
+        if name not in self.lazy and name not in self.loaded:
+            self.order.append(name)
+        self.lazy.pop(name, None)
+        self.loaded[name] = plugin
+
+    def __delitem__(self, name):
+        if name not in self.lazy and name not in self.loaded:
+            raise KeyError(name)
+        self.lazy.pop(name, None)
+        self.loaded.pop(name, None)
+        self.order.remove(name)
+
+    def __contains__(self, name):
+        return name in self.loaded or name in self.lazy
+
+    def __iter__(self):
+        return iter(list(self.order))
+
+    def __len__(self):
+        return len(self.order)
@@ -170,7 +170,8 @@ class Plugin(object):
     @classmethod
     def bind(cls, session, module):
         cls.cache = Cache(filename="plugin-cache.json",
-                          key_prefix=module)
+                          key_prefix=module,
+                          session=session)
         cls.logger = session.logger.new_module("plugin." + module)
         cls.module = module
         cls.session = session
@@ -59,7 +59,8 @@ class WWENetwork(Plugin):
     def __init__(self, url):
         super(WWENetwork, self).__init__(url)
         http.headers.update({"User-Agent": useragents.CHROME})
-        self._session_attributes = Cache(filename="plugin-cache.json", key_prefix="wwenetwork:attributes")
+        self._session_attributes = Cache(filename="plugin-cache.json", key_prefix="wwenetwork:attributes",
+                                         session=self.session)
         self._session_key = self.cache.get("session_key")
         self._authed = self._session_attributes.get("ipid") and self._session_attributes.get("fprt")
 
@@ -74,7 +74,8 @@ class Zattoo(Plugin):
 
     def __init__(self, url):
         super(Zattoo, self).__init__(url)
-        self._session_attributes = Cache(filename='plugin-cache.json', key_prefix='zattoo:attributes')
+        self._session_attributes = Cache(filename='plugin-cache.json', key_prefix='zattoo:attributes',
+                                         session=self.session)
         self._authed = self._session_attributes.get('beaker.session.id') and self._session_attributes.get('pzuid') and self._session_attributes.get('power_guide_hash')
         self._uuid = self._session_attributes.get('uuid')
         self._expires = self._session_attributes.get('expires', 946684800)
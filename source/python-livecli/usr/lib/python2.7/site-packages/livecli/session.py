@@ -1,4 +1,5 @@
 import imp
+import os
 import pkgutil
 import sys
 import traceback
@@ -10,8 +11,15 @@ from . import plugins, __version__
 from .compat import is_win32
 from .exceptions import NoPluginError, PluginError
 from .logger import Logger
+from .metrics import Metrics
 from .options import Options
+from .cache import cache_dir
 from .plugin import api
+from .plugin.index import PluginIndex
+from .plugin.manifest import PluginMap, load_manifest, save_manifest
+
+
+PLUGIN_MANIFEST = os.path.join(cache_dir, "plugins.json")
 
 
 def print_small_exception(start_after):
@@ -41,6 +49,7 @@ class Livecli(object):
     def __init__(self):
         self.http = api.HTTPSession()
         self.options = Options({
+            "cache-backend": "json",
             "hds-live-edge": 10.0,
             "hds-segment-attempts": 3,
             "hds-segment-threads": 1,
@@ -48,7 +57,12 @@ class Livecli(object):
             "hds-timeout": 60.0,
             "hls-live-edge": 3,
             "hls-segment-attempts": 3,
+            "hls-segment-cache-dir": None,
+            "hls-segment-cache-live": False,
+            "hls-segment-cache-size": None,
+            "hls-segment-coalesce": 1024 * 1024 * 8,  # 8 MB
             "hls-segment-threads": 1,
+            "hls-segment-threads-max": None,
             "hls-segment-timeout": 10.0,
             "hls-timeout": 60.0,
             "hls-playlist-reload-attempts": 3,
@@ -70,8 +84,10 @@ class Livecli(object):
             "ffmpeg-audio-transcode": "copy",
             "locale": None
         })
-        self.plugins = {}
+        self.plugins = PluginMap(self.load_lazy_plugin)
+        self.plugin_index = PluginIndex()
         self.logger = Logger()
+        self.metrics = Metrics()
         self.load_builtin_plugins()
 
     def set_option(self, key, value):
@@ -85,6 +101,12 @@ class Livecli(object):
         **Available options**:
 
         ======================== =========================================
+        cache-backend            (str) Where plugins and streams cache
+                                 data such as login tokens, ``json``,
+                                 ``memory``, ``sqlite`` or ``dbm``,
+                                 unavailable backends fall back to
+                                 ``json``, default: ``json``
+
         hds-live-edge            ( float) Specify the time live HDS
                                  streams will start from the edge of
                                  stream, default: ``10.0``
@@ -107,9 +129,35 @@ class Livecli(object):
         hls-segment-attempts     (int) How many attempts should be done
                                  to download each HLS segment, default: ``3``
 
+        hls-segment-cache-size   (int) Enables the on-disk cache of HLS
+                                 segments and limits its size in bytes,
+                                 the least recently used segments are
+                                 removed first, default: ``None``
+
+        hls-segment-cache-dir    (str) The directory of the HLS segment
+                                 cache, default: ``segments`` in the
+                                 livecli cache directory
+
+        hls-segment-cache-live   (bool) Also cache the segments of live
+                                 playlists, by default only playlists
+                                 with an ``EXT-X-ENDLIST`` tag are cached,
+                                 default: ``False``
+
+        hls-segment-coalesce     (int) Adjacent ``EXT-X-BYTERANGE``
+                                 segments of the same URI are fetched
+                                 with a single request of up to this
+                                 many bytes, ``0`` disables it,
+                                 default: ``8388608``
+
         hls-segment-threads      (int) The size of the thread pool used
                                  to download segments, default: ``1``
 
+        hls-segment-threads-max  (int) Enables the adaptive thread pool,
+                                 the number of concurrent HLS segment
+                                 downloads is adjusted between
+                                 hls-segment-threads and this value,
+                                 default: ``None``
+
         hls-segment-timeout      (float) HLS segment connect and read
                                  timeout, default: ``10.0``
 
@@ -147,6 +195,19 @@ class Livecli(object):
                                  can be either a .pem file (str) or a
                                  .crt/.key pair (tuple)
 
+        http-pool-connections    (int) How many hosts to keep connection
+                                 pools for, default: ``None`` (at least
+                                 10, grows with the active streams)
+
+        http-pool-maxsize        (int) How many idle connections to keep
+                                 alive per host, default: ``None`` (at
+                                 least 10, grows with the segment threads
+                                 of the active streams)
+
+        http-pool-block          (bool) Wait for a free connection instead
+                                 of opening a new one when a pool is
+                                 exhausted, default: ``False``
+
         http-timeout             (float) General timeout used by all HTTP
                                  requests except the ones covered by
                                  other options, default: ``20.0``
@@ -265,6 +326,15 @@ class Livecli(object):
             self.http.cert = value
         elif key == "http-timeout":
             self.http.timeout = value
+        elif key == "http-pool-connections":
+            self.http.pool_connections = value
+            self.http.update_pool()
+        elif key == "http-pool-maxsize":
+            self.http.pool_maxsize = value
+            self.http.update_pool()
+        elif key == "http-pool-block":
+            self.http.pool_block = value
+            self.http.update_pool()
         else:
             self.options.set(key, value)
 
@@ -300,6 +370,12 @@ class Livecli(object):
             return self.http.cert
         elif key == "http-timeout":
             return self.http.timeout
+        elif key == "http-pool-connections":
+            return self.http.pool_connections
+        elif key == "http-pool-maxsize":
+            return self.http.pool_maxsize
+        elif key == "http-pool-block":
+            return self.http.pool_block
         else:
             return self.options.get(key)
 
@@ -317,6 +393,9 @@ class Livecli(object):
             plugin = self.plugins[plugin]
             plugin.set_option(key, value)
 
+            # Options can change which URLs a plugin handles
+            self.plugin_index.clear()
+
     def get_plugin_option(self, plugin, key):
         """Returns current value of plugin specific option.
 
@@ -373,14 +452,9 @@ class Livecli(object):
         """
         url = update_scheme("http://", url)
 
-        available_plugins = []
-        for name, plugin in self.plugins.items():
-            if plugin.can_handle_url(url):
-                available_plugins.append(plugin)
-
-        available_plugins.sort(key=lambda x: x.priority(url), reverse=True)
-        if available_plugins:
-            return available_plugins[0](url)
+        plugin = self.plugin_index.resolve(url, self.plugins)
+        if plugin:
+            return plugin(url)
 
         if follow_redirect:
             # Attempt to handle a redirect URL
@@ -423,12 +497,32 @@ class Livecli(object):
         return plugin.streams(**params)
 
     def get_plugins(self):
-        """Returns the loaded plugins for the session."""
+        """Returns the plugins of the session, builtin plugins
+           are imported when they are accessed."""
 
         return self.plugins
 
     def load_builtin_plugins(self):
-        self.load_plugins(plugins.__path__[0])
+        path = plugins.__path__[0]
+        manifest = load_manifest(PLUGIN_MANIFEST, path)
+
+        if manifest is None:
+            self.load_plugins(path)
+            save_manifest(PLUGIN_MANIFEST, path, self.plugins.items())
+        else:
+            # Only import the plugins an URL or option needs
+            for name, patterns in manifest:
+                self.plugins.add_lazy(name, patterns)
+            self.plugin_index.clear()
+
+    def load_lazy_plugin(self, name):
+        """Imports a builtin plugin listed in the manifest."""
+        try:
+            file, pathname, desc = imp.find_module(name, plugins.__path__)
+            return self.import_plugin(name, file, pathname, desc)
+        except Exception:
+            sys.stderr.write("Failed to load plugin {0}:\n".format(name))
+            print_small_exception("load_lazy_plugin")
 
     def load_plugins(self, path):
         """Attempt to load plugins from the path specified.
@@ -449,9 +543,24 @@ class Livecli(object):
                 continue
 
     def load_plugin(self, name, file, pathname, desc):
+        plugin = self.import_plugin(name, file, pathname, desc)
+
+        if plugin:
+            self.plugins[plugin.module] = plugin
+            self.plugin_index.clear()
+
+    def import_plugin(self, name, file, pathname, desc):
+        """Imports a plugin module and binds its plugin to the session.
+
+        :return: the plugin or None if the module has no plugin
+        """
         # Set the global http session for this plugin
         api.http = self.http
-        module = imp.load_module(name, file, pathname, desc)
+        try:
+            module = imp.load_module(name, file, pathname, desc)
+        finally:
+            if file:
+                file.close()
 
         if hasattr(module, "__plugin__"):
             module_name = getattr(module, "__name__")
@@ -459,10 +568,7 @@ class Livecli(object):
             plugin = getattr(module, "__plugin__")
             plugin.bind(self, module_name)
 
-            self.plugins[plugin.module] = plugin
-
-        if file:
-            file.close()
+            return plugin
 
     @property
     def version(self):
@@ -8,6 +8,7 @@ from livecli.stream.http import HTTPStream
 from livecli.stream.rtmpdump import RTMPStream
 from livecli.stream.streamprocess import StreamProcess
 from livecli.stream.wrappers import StreamIOWrapper, StreamIOIterWrapper, StreamIOThreadWrapper
+from livecli.stream.wrappers import iter_readinto
 
 from livecli.stream.flvconcat import extract_flv_header_tags
 from livecli.stream.playlist import Playlist, FLVPlaylist
@@ -25,6 +26,7 @@ __all__ = [
     "StreamIOWrapper",
     "StreamIOIterWrapper",
     "StreamIOThreadWrapper",
+    "iter_readinto",
     "extract_flv_header_tags",
     "Playlist",
     "FLVPlaylist",
@@ -9,6 +9,7 @@ import sys
 from livecli import StreamError
 from livecli.stream import Stream
 from livecli.stream.stream import StreamIO
+from livecli.stream.wrappers import iter_readinto
 from livecli.utils import NamedPipe
 from livecli.compat import compat_devnull
 from livecli.compat import compat_which
@@ -60,16 +61,15 @@ class FFMPEGMuxer(StreamIO):
     def copy_to_pipe(self, stream, pipe):
         self.logger.debug("Starting copy to pipe: {0}".format(pipe.path))
         pipe.open("wb")
-        while not stream.closed:
-            try:
-                data = stream.read(8192)
-                if len(data):
-                    pipe.write(data)
-                else:
+        try:
+            for data in iter_readinto(stream, 8192):
+                pipe.write(data)
+
+                if stream.closed:
                     break
-            except IOError:
-                self.logger.error("Pipe copy aborted: {0}".format(pipe.path))
-                return
+        except IOError:
+            self.logger.error("Pipe copy aborted: {0}".format(pipe.path))
+            return
         try:
             pipe.close()
         except IOError:  # might fail closing, but that should be ok for the pipe
@@ -148,6 +148,9 @@ class FFMPEGMuxer(StreamIO):
         data = self.process.stdout.read(size)
         return data
 
+    def readinto(self, b):
+        return self.process.stdout.readinto(b)
+
     def close(self):
         self.logger.debug("Closing ffmpeg thread")
         if self.process:
@@ -1,5 +1,7 @@
 from __future__ import division
 
+import struct
+
 from collections import namedtuple
 from io import IOBase
 from itertools import chain, islice
@@ -14,6 +16,7 @@ from ..packages.flashmedia.tag import (AAC_PACKET_TYPE_SEQUENCE_HEADER,
                                        AVC_PACKET_TYPE_SEQUENCE_HEADER,
                                        AUDIO_CODEC_ID_AAC,
                                        VIDEO_CODEC_ID_AVC,
+                                       VIDEO_FRAME_TYPE_COMMAND_FRAME,
                                        TAG_TYPE_AUDIO,
                                        TAG_TYPE_VIDEO)
 
@@ -22,8 +25,148 @@ __all__ = ["extract_flv_header_tags", "FLVTagConcat", "FLVTagConcatIO"]
 
 FLVHeaderTags = namedtuple("FLVHeaderTags", "metadata aac vc")
 
+# Flags and data size, timestamp and its extension, skipping
+# the stream id, and the first two bytes of the tag data
+TAG_HEADER = struct.Struct(">LL3xBB")
+TAG_SIZE = struct.Struct(">L")
+
+
+class RawTag(object):
+    """An audio or video tag kept as the bytes it was read from.
+
+    Only the fields FLVTagConcat looks at are decoded, serialize()
+    writes the timestamp back into the bytes instead of serializing
+    the tag again.
+    """
+
+    __slots__ = ("data", "type", "timestamp", "codec", "frame_type",
+                 "packet_type")
+
+    filter = False
+
+    def __init__(self, data, type, timestamp, codec,
+                 frame_type=None, packet_type=None):
+        self.data = data
+        self.type = type
+        self.timestamp = timestamp
+        self.codec = codec
+        self.frame_type = frame_type
+        self.packet_type = packet_type
+
+    def __repr__(self):
+        reprformat = "<RawTag type={type} timestamp={timestamp} size={size}>"
+        return reprformat.format(type=self.type, timestamp=self.timestamp,
+                                 size=len(self.data))
+
+    @classmethod
+    def parse(cls, buf, offset=0):
+        """Returns the tag at offset in buf, without its data, or None
+           if the tag must be deserialized, i.e. it is not an audio or
+           video tag or it is a sequence header."""
+        if len(buf) - offset < 13:
+            return None
+
+        (flags_size, timestamp, first,
+         second) = TAG_HEADER.unpack_from(buf, offset)
+        flags, data_size = flags_size >> 24, flags_size & 0xFFFFFF
+        timestamp = (timestamp >> 8) | ((timestamp & 0xFF) << 24)
+        typ = flags & 0x1F
+
+        # Encrypted tags are rejected by verify_tag()
+        if flags & 0x20 or data_size < 2:
+            return None
+
+        if typ == TAG_TYPE_AUDIO:
+            codec = first >> 4
+            if codec != AUDIO_CODEC_ID_AAC:
+                return cls(None, typ, timestamp, codec)
+            elif second != AAC_PACKET_TYPE_SEQUENCE_HEADER:
+                return cls(None, typ, timestamp, codec, packet_type=second)
+
+        elif typ == TAG_TYPE_VIDEO:
+            frame_type, codec = first >> 4, first & 0x0F
+            if frame_type == VIDEO_FRAME_TYPE_COMMAND_FRAME or codec != VIDEO_CODEC_ID_AVC:
+                return cls(None, typ, timestamp, codec, frame_type)
+            elif data_size >= 5 and second != AVC_PACKET_TYPE_SEQUENCE_HEADER:
+                return cls(None, typ, timestamp, codec, frame_type, second)
+
+        return None
+
+    @staticmethod
+    def tag_size(buf, offset=0):
+        """Returns the size of the tag at offset in buf,
+           including the previous tag size that follows it."""
+        return 11 + (TAG_SIZE.unpack_from(buf, offset)[0] & 0xFFFFFF) + 4
+
+    def serialize(self):
+        data = self.data
+        timestamp = self.timestamp
+
+        # The same fields Tag.serialize() writes: no reserved
+        # flags and the data size as previous tag size
+        data[0] = self.type
+        TAG_SIZE.pack_into(data, 4, ((timestamp & 0xFFFFFF) << 8) |
+                                    ((timestamp >> 24) & 0x7F))
+        TAG_SIZE.pack_into(data, len(data) - 4, len(data) - 4)
+
+        return data
 
-def iter_flv_tags(fd=None, buf=None, strict=False, skip_header=False):
+
+def _read_raw_tag(fd, strict=False):
+    header = fd.read(11)
+    if len(header) < 11:
+        raise FLVError("Insufficient tag header")
+
+    data = bytearray(RawTag.tag_size(header))
+    view = memoryview(data)
+    view[:11] = header
+    offset = 11
+
+    while offset < len(data):
+        chunk = fd.read(len(data) - offset)
+        if not chunk:
+            raise FLVError("End of stream before required data could be read")
+
+        view[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+
+    tag = RawTag.parse(data)
+    if tag is None:
+        tag, offset = Tag.deserialize_from(bytes(data), 0, strict=strict)
+        return tag
+
+    if strict and TAG_SIZE.unpack_from(data, len(data) - 4)[0] != len(data) - 4:
+        raise FLVError("Data size mismatch when deserialising tag")
+
+    tag.data = data
+
+    return tag
+
+
+def _read_raw_tag_from(buf, offset, strict=False):
+    tag = RawTag.parse(buf, offset)
+    if tag is not None:
+        end = offset + RawTag.tag_size(buf, offset)
+        if end > len(buf):
+            tag = None
+
+    if tag is None:
+        return Tag.deserialize_from(buf, offset, strict=strict)
+
+    tag.data = bytearray(memoryview(buf)[offset:end])
+    if strict and TAG_SIZE.unpack_from(tag.data, len(tag.data) - 4)[0] != len(tag.data) - 4:
+        raise FLVError("Data size mismatch when deserialising tag")
+
+    return tag, end
+
+
+def iter_flv_tags(fd=None, buf=None, strict=False, skip_header=False,
+                  raw_tags=False):
+    """Reads the FLV tags from fd or buf.
+
+    With raw_tags the audio and video tags that are not sequence
+    headers are returned as RawTag objects.
+    """
     if not (fd or buf):
         return
 
@@ -36,8 +179,12 @@ def iter_flv_tags(fd=None, buf=None, strict=False, skip_header=False):
 
     while fd or buf and offset < len(buf):
         try:
-            if fd:
+            if fd and raw_tags:
+                tag = _read_raw_tag(fd, strict=strict)
+            elif fd:
                 tag = Tag.deserialize(fd, strict=strict)
+            elif raw_tags:
+                tag, offset = _read_raw_tag_from(buf, offset, strict=strict)
             elif buf:
                 tag, offset = Tag.deserialize_from(buf, offset, strict=strict)
         except (IOError, FLVError) as err:
@@ -103,6 +250,9 @@ class FLVTagConcat(object):
         if tag.filter:
             raise IOError("Tag has filter flag set, probably encrypted")
 
+        if isinstance(tag, RawTag):
+            return self.verify_raw_tag(tag)
+
         # Only AAC and AVC has detectable headers
         if isinstance(tag.data, AudioData) and tag.data.codec != AUDIO_CODEC_ID_AAC:
             self.audio_header_written = True
@@ -160,6 +310,32 @@ class FLVTagConcat(object):
 
         return True
 
+    def verify_raw_tag(self, tag):
+        """Same as verify_tag() for the tags read as RawTag,
+           which are never sequence headers."""
+        if tag.type == TAG_TYPE_AUDIO and tag.codec != AUDIO_CODEC_ID_AAC:
+            self.audio_header_written = True
+        if tag.type == TAG_TYPE_VIDEO and tag.codec != VIDEO_CODEC_ID_AVC:
+            self.video_header_written = True
+
+        # Make sure there is no timestamp gap between audio and video when syncing
+        if self.sync_headers and self.timestamps_sub and not self.headers_written:
+            self.timestamps_sub = {}
+
+        if tag.frame_type == VIDEO_FRAME_TYPE_COMMAND_FRAME:
+            return
+
+        if self.sync_headers and not self.headers_written:
+            return
+
+        if tag.type == TAG_TYPE_AUDIO:
+            if tag.codec == AUDIO_CODEC_ID_AAC and not self.audio_header_written:
+                return
+        elif tag.codec == VIDEO_CODEC_ID_AVC and not self.video_header_written:
+            return
+
+        return True
+
     def adjust_tag_gap(self, tag):
         timestamp_gap = tag.timestamp - self.timestamps_orig.get(tag.type, 0)
         timestamp_sub = self.timestamps_sub.get(tag.type)
@@ -199,7 +375,8 @@ class FLVTagConcat(object):
             skip_header = not not self.tags
 
         tags_iterator = filter(None, self.tags)
-        flv_iterator = iter_flv_tags(fd=fd, buf=buf, skip_header=skip_header)
+        flv_iterator = iter_flv_tags(fd=fd, buf=buf, skip_header=skip_header,
+                                     raw_tags=True)
 
         for tag in chain(tags_iterator, flv_iterator):
             yield tag
@@ -311,3 +488,13 @@ class FLVTagConcatIO(IOBase):
 
         return self.buffer.read(size, block=self.worker.is_alive(),
                                 timeout=self.timeout)
+
+    def readinto(self, b):
+        if not self.buffer:
+            return 0
+
+        if self.worker.error:
+            raise self.worker.error
+
+        return self.buffer.readinto(b, block=self.worker.is_alive(),
+                                    timeout=self.timeout)
@@ -8,6 +8,7 @@ import os.path
 import string
 
 from binascii import unhexlify
+from bisect import bisect_left, bisect_right
 from collections import namedtuple
 from copy import deepcopy
 from hashlib import sha256
@@ -82,6 +83,10 @@ class HDSStreamWriter(SegmentedStreamWriter):
         except StreamError as err:
             self.logger.error("Failed to open fragment {0}-{1}: {2}",
                               fragment.segment, fragment.fragment, err)
+            if retries > 1:
+                self.metric_retries.inc()
+            else:
+                self.failed(err)
             return self.fetch(fragment, retries - 1)
 
     def write(self, fragment, res, chunk_size=8192):
@@ -91,24 +96,25 @@ class HDSStreamWriter(SegmentedStreamWriter):
     def convert_fragment(self, fragment, fd):
         mdat = None
         try:
-            f4v = F4V(fd, raw_payload=True)
+            f4v = F4V(fd, stream_payload=True)
             # Fast forward to mdat box
             for box in f4v:
                 if box.type == "mdat":
-                    mdat = box.payload.data
+                    mdat = box.payload
                     break
         except F4VError as err:
             self.logger.error("Failed to parse fragment {0}-{1}: {2}",
                               fragment.segment, fragment.fragment, err)
             return
 
-        if not mdat:
+        if mdat is None or mdat.size == 0:
             self.logger.error("No MDAT box found in fragment {0}-{1}",
                               fragment.segment, fragment.fragment)
             return
 
+        # The tags are read from the mdat box while it is downloaded
         try:
-            for chunk in self.concater.iter_chunks(buf=mdat, skip_header=True):
+            for chunk in self.concater.iter_chunks(fd=mdat, skip_header=True):
                 self.reader.buffer.write(chunk)
 
                 if self.closed:
@@ -116,6 +122,9 @@ class HDSStreamWriter(SegmentedStreamWriter):
             else:
                 self.logger.debug("Download of fragment {0}-{1} complete",
                                   fragment.segment, fragment.fragment)
+        except F4VError as err:
+            self.logger.error("Failed to parse fragment {0}-{1}: {2}",
+                              fragment.segment, fragment.fragment, err)
         except IOError as err:
             if "Unknown tag type" in str(err):
                 self.logger.error("Unknown tag type found, this stream is "
@@ -162,7 +171,6 @@ class HDSStreamWorker(SegmentedStreamWorker):
         self.fragmentruntable = bootstrap.payload.fragment_run_table_entries[0]
 
         self.first_fragment, last_fragment = self.fragment_count()
-        fragment_duration = self.fragment_duration(last_fragment)
 
         if last_fragment != self.last_fragment:
             bootstrap_changed = True
@@ -170,6 +178,10 @@ class HDSStreamWorker(SegmentedStreamWorker):
         else:
             bootstrap_changed = False
 
+        self.index_fragment_table()
+        self.index_segment_table()
+        fragment_duration = self.fragment_duration(last_fragment)
+
         if self.current_fragment < 0:
             if self.live:
                 current_fragment = last_fragment
@@ -252,10 +264,12 @@ class HDSStreamWorker(SegmentedStreamWorker):
 
         return first_fragment, end_fragment
 
-    def fragment_duration(self, fragment):
-        fragment_duration = 0
+    def index_fragment_table(self):
+        """Indexes the fragment runs by their first fragment,
+           only the runs a duration can be looked up from are kept."""
         table = self.fragmentruntable.payload.fragment_run_entry_table
         time_scale = self.fragmentruntable.payload.time_scale
+        runs = []
 
         for i, fragmentrun in enumerate(table):
             if fragmentrun.discontinuity_indicator is not None:
@@ -271,21 +285,66 @@ class HDSStreamWorker(SegmentedStreamWorker):
                 elif fragmentrun.discontinuity_indicator > 0:
                     continue
 
-            if fragment >= fragmentrun.first_fragment:
-                fragment_duration = fragmentrun.fragment_duration / time_scale
+            runs.append((fragmentrun.first_fragment,
+                         fragmentrun.fragment_duration / time_scale))
 
-        return fragment_duration
+        # The duration of a fragment comes from the last run starting
+        # at or before it, a run is only kept if every run after it
+        # starts later, which also sorts the kept runs.
+        index = []
+        for first_fragment, duration in reversed(runs):
+            if not index or first_fragment < index[-1][0]:
+                index.append((first_fragment, duration))
+        index.reverse()
 
-    def segment_from_fragment(self, fragment):
+        self.fragment_run_starts = [run[0] for run in index]
+        self.fragment_run_durations = [run[1] for run in index]
+
+    def index_segment_table(self):
+        """Indexes the fragment range of each segment run, in the
+           order iter_segment_table() yields them."""
         table = self.segmentruntable.payload.segment_run_entry_table
+        self.segment_run_forward = bool(table) and table[0].first_segment == 1
+        self.segment_run_segments = []
+        self.segment_run_bounds = []
+        self.segment_run_ends = []
+
+        if not table:
+            return
 
         for segment, start, end in self.iter_segment_table(table):
-            if start - 1 <= fragment <= end:
-                return segment
+            self.segment_run_segments.append(segment)
+            self.segment_run_ends.append(end)
+
+            # A fragment at the boundary of two runs belongs to the run
+            # yielded first, so when walking backwards the starts are
+            # negated to keep the list ascending.
+            if self.segment_run_forward:
+                self.segment_run_bounds.append(start - 1)
+            else:
+                self.segment_run_bounds.append(1 - start)
+
+    def fragment_duration(self, fragment):
+        i = bisect_right(self.fragment_run_starts, fragment)
+        if i == 0:
+            return 0
+
+        return self.fragment_run_durations[i - 1]
+
+    def segment_from_fragment(self, fragment):
+        segments = self.segment_run_segments
+        if self.segment_run_forward:
+            # Ends ascend, the first run ending at or after the
+            # fragment is the only one that can contain it
+            i = bisect_left(self.segment_run_ends, fragment)
+            if i < len(segments) and self.segment_run_bounds[i] <= fragment:
+                return segments[i]
         else:
-            segment = 1
+            i = bisect_left(self.segment_run_bounds, -fragment)
+            if i < len(segments) and fragment <= self.segment_run_ends[i]:
+                return segments[i]
 
-        return segment
+        return 1
 
     def iter_segment_table(self, table):
         # If the first segment in the table starts at the beginning we
@@ -411,7 +470,8 @@ class HDSStream(Stream):
             bootstrap = self.bootstrap
 
         if isinstance(self.metadata, ScriptData):
-            metadata = self.metadata.__dict__
+            metadata = dict(name=self.metadata.name,
+                            value=self.metadata.value)
         else:
             metadata = self.metadata
 
@@ -579,7 +639,7 @@ class HDSStream(Stream):
             data = pv
             hdntl = ""
 
-        cache = Cache(filename="stream.json")
+        cache = Cache(filename="stream.json", session=session)
         key = "akamaihd-player:" + pvswf
         cached = cache.get(key)
 
@@ -2,7 +2,9 @@ from __future__ import print_function
 
 import re
 import struct
-from collections import defaultdict, namedtuple
+from collections import defaultdict, namedtuple, OrderedDict
+from functools import partial
+from threading import Event, Lock
 from time import time
 
 from livecli.cache import Cache
@@ -11,6 +13,7 @@ from livecli.compat import urlparse
 from livecli.stream import hls_playlist
 from livecli.stream.ffmpegmux import FFMPEGMuxer, MuxedStream
 from livecli.stream.http import HTTPStream
+from livecli.stream.segment_cache import CachedSegment, segment_cache
 from livecli.stream.segmented import (SegmentedStreamReader,
                                       SegmentedStreamWriter,
                                       SegmentedStreamWorker)
@@ -35,19 +38,166 @@ def pkcs7_decode(paddedData, keySize=16):
     return paddedData[:-val]
 
 
+class HLSKeyCache(object):
+    """Decryption keys by key URI, shared by all writers in the process.
+
+    Concurrent requests for the same URI wait for a single fetch.
+    """
+
+    def __init__(self, maxsize=32, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._keys = OrderedDict()
+        self._pending = {}
+        self._lock = Lock()
+
+    def get(self, uri, fetch):
+        """Returns the key for uri, calls fetch() to get it if it
+        is not cached yet."""
+        while True:
+            with self._lock:
+                entry = self._keys.pop(uri, None)
+                if entry and entry[0] > time():
+                    # Move it to the end, the least recently used key
+                    # is evicted first
+                    self._keys[uri] = entry
+                    return entry[1]
+
+                event = self._pending.get(uri)
+                if event is None:
+                    event = self._pending[uri] = Event()
+                    break
+
+            # Another thread is fetching this key, if that fails
+            # the next waiter will try it
+            event.wait()
+
+        try:
+            data = fetch()
+
+            with self._lock:
+                self._keys[uri] = (time() + self.ttl, data)
+                while len(self._keys) > self.maxsize:
+                    self._keys.popitem(last=False)
+
+            return data
+        finally:
+            with self._lock:
+                del self._pending[uri]
+
+            event.set()
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+
+key_cache = HLSKeyCache()
+
+
+class HLSByteRangeRun(object):
+    """Adjacent byterange segments of one URI that are fetched
+    with a single request.
+
+    The segments are written in order, each one reads its own
+    bytes from the shared response.
+    """
+
+    def __init__(self, uri, ranges):
+        self.uri = uri
+        self.ranges = ranges
+        self.start = ranges[0][1][0]
+        self.end = ranges[-1][1][1]
+        self.cache_keys = {}
+        self.duration = None
+        self.res = None
+
+        self._chunks = None
+        self._pending = b""
+
+    def open(self, res, chunk_size=8192):
+        self.res = res
+        self._chunks = res.iter_content(chunk_size)
+
+        # The server ignored the Range header
+        if res.status_code != 206 and self.start:
+            for chunk in self.iter_bytes(self.start):
+                pass
+
+    def close(self):
+        if self.res is not None:
+            self.res.close()
+
+    def iter_bytes(self, size):
+        """Yields the next size bytes of the response."""
+        while size > 0:
+            if not self._pending:
+                self._pending = next(self._chunks, b"")
+                if not self._pending:
+                    raise StreamError("Unexpected end of byterange response")
+
+            chunk, self._pending = self._pending[:size], self._pending[size:]
+            size -= len(chunk)
+
+            yield chunk
+
+    def segment(self, sequence):
+        """Returns the response of a single segment of the run."""
+        for num, (start, end) in self.ranges:
+            if num == sequence.num:
+                break
+        else:
+            raise StreamError("Segment {0} is not part of the byterange run".format(sequence.num))
+
+        iter_segment = partial(self.iter_segment, end - start + 1,
+                               num == self.ranges[-1][0])
+
+        return HLSByteRangeSegment(iter_segment, self.cache_keys.get(num))
+
+    def iter_segment(self, size, last):
+        try:
+            for chunk in self.iter_bytes(size):
+                yield chunk
+        finally:
+            if last:
+                self.close()
+
+
+class HLSByteRangeSegment(object):
+    def __init__(self, iter_segment, segment_cache_key=None):
+        self.iter_segment = iter_segment
+        self.segment_cache_key = segment_cache_key
+
+    def iter_content(self, chunk_size=8192):
+        # The chunks are those of the shared response
+        return self.iter_segment()
+
+
 class HLSStreamWriter(SegmentedStreamWriter):
     def __init__(self, reader, *args, **kwargs):
         options = reader.stream.session.options
         kwargs["retries"] = options.get("hls-segment-attempts")
         kwargs["threads"] = options.get("hls-segment-threads")
+        kwargs["threads_max"] = options.get("hls-segment-threads-max")
         kwargs["timeout"] = options.get("hls-segment-timeout")
         kwargs["ignore_names"] = options.get("hls-segment-ignore-names")
         kwargs["user_key_uri"] = options.get("hls-key-uri")
         SegmentedStreamWriter.__init__(self, reader, *args, **kwargs)
 
         self.byterange_offsets = defaultdict(int)
+        self.byterange_ranges = {}
+        self.byterange_runs = {}
+        self.byterange_coalesce = options.get("hls-segment-coalesce")
         self.key_data = None
         self.key_uri = None
+        self.metric_decrypt = self.session.metrics.histogram(
+            "hls_decrypt_seconds", help="Time to decrypt a segment")
+
+        self.segment_cache = None
+        self.segment_cache_live = options.get("hls-segment-cache-live")
+        if options.get("hls-segment-cache-size"):
+            self.segment_cache = segment_cache(options.get("hls-segment-cache-dir"),
+                                               options.get("hls-segment-cache-size"))
         if self.ignore_names:
             # creates a regex from a list of segment names,
             # this will be used to ignore segments.
@@ -80,10 +230,7 @@ class HLSStreamWriter(SegmentedStreamWriter):
                     new_key_uri = re.sub(_at_re, _old_data, new_key_uri)
                 self.logger.debug("New key-uri: {0}".format(new_key_uri))
 
-            res = self.session.http.get(new_key_uri, exception=StreamError,
-                                        retries=self.retries,
-                                        **self.reader.request_params)
-            self.key_data = res.content
+            self.key_data = key_cache.get(new_key_uri, partial(self.fetch_key, new_key_uri))
             self.key_uri = key.uri
 
         iv = key.iv or num_to_iv(sequence)
@@ -93,24 +240,203 @@ class HLSStreamWriter(SegmentedStreamWriter):
 
         return crypto_AES.new(self.key_data, crypto_AES.MODE_CBC, iv)
 
-    def create_request_params(self, sequence):
+    def fetch_key(self, uri):
+        res = self.session.http.get(uri, exception=StreamError,
+                                    retries=self.retries,
+                                    **self.reader.request_params)
+        return res.content
+
+    def close(self):
+        SegmentedStreamWriter.close(self)
+
+        for run, future in list(self.byterange_runs.values()):
+            run.close()
+        self.byterange_runs.clear()
+
+    def byterange(self, sequence):
+        """Returns the first and last byte of a byterange segment.
+
+        Segments without an offset start where the previous segment
+        of the same URI ended, so they have to be resolved in order.
+        """
+        byterange = self.byterange_ranges.pop(sequence.num, None)
+        if byterange:
+            return byterange
+
+        bytes_start = self.byterange_offsets[sequence.segment.uri]
+        if sequence.segment.byterange.offset is not None:
+            bytes_start = sequence.segment.byterange.offset
+
+        bytes_len = max(sequence.segment.byterange.range - 1, 0)
+        bytes_end = bytes_start + bytes_len
+        self.byterange_offsets[sequence.segment.uri] = bytes_end + 1
+
+        return bytes_start, bytes_end
+
+    def create_request_params(self, sequence, byterange=None):
         request_params = dict(self.reader.request_params)
-        headers = request_params.pop("headers", {})
+        headers = dict(request_params.pop("headers", {}))
 
-        if sequence.segment.byterange:
-            bytes_start = self.byterange_offsets[sequence.segment.uri]
-            if sequence.segment.byterange.offset is not None:
-                bytes_start = sequence.segment.byterange.offset
+        if byterange is None and sequence.segment.byterange:
+            byterange = self.byterange(sequence)
 
-            bytes_len = max(sequence.segment.byterange.range - 1, 0)
-            bytes_end = bytes_start + bytes_len
-            headers["Range"] = "bytes={0}-{1}".format(bytes_start, bytes_end)
-            self.byterange_offsets[sequence.segment.uri] = bytes_end + 1
+        if byterange:
+            headers["Range"] = "bytes={0}-{1}".format(*byterange)
 
         request_params["headers"] = headers
 
         return request_params
 
+    def segment_cache_key(self, sequence, request_params):
+        """Returns the key of a segment in the segment cache, or None
+        if the segment should not be cached.
+
+        Only segments of playlists with an end are cached,
+        unless live segments are explicitly allowed.
+        """
+        if not self.segment_cache:
+            return
+
+        if self.reader.worker.playlist_end is None and not self.segment_cache_live:
+            return
+
+        byterange = request_params["headers"].get("Range")
+        if byterange:
+            return "{0} {1}".format(sequence.segment.uri, byterange)
+
+        return sequence.segment.uri
+
+    def put(self, sequence):
+        if self.closed:
+            return
+
+        if sequence is None or not sequence.segment.byterange:
+            return SegmentedStreamWriter.put(self, sequence)
+
+        run, future = self.byterange_runs.pop(sequence.num, (None, None))
+        if run is None:
+            # The range is resolved here, segments are put in order
+            byterange = self.byterange(sequence)
+            run = self.create_byterange_run(sequence, byterange)
+
+            if run is None:
+                self.byterange_ranges[sequence.num] = byterange
+                return SegmentedStreamWriter.put(self, sequence)
+
+            fetch = self.fetch_byterange_run
+            if self.threads_max > self.threads_min:
+                fetch = self.fetch_byterange_run_adaptive
+
+            future = self.executor.submit(self.timed_fetch, fetch, run,
+                                          retries=self.retries)
+            for num, byterange in run.ranges[1:]:
+                self.byterange_runs[num] = (run, future)
+
+        self.enqueue(sequence, future)
+
+    def create_byterange_run(self, sequence, byterange):
+        """Returns a HLSByteRangeRun of sequence and the segments that
+        directly follow it in the playlist, or None if sequence should
+        be fetched on its own.
+
+        Segments are added while they continue the byte range of the
+        same URI and the run is smaller than hls-segment-coalesce bytes.
+        Cached and ignored segments are fetched on their own.
+        """
+        if not self.byterange_coalesce:
+            return
+
+        uri = sequence.segment.uri
+        if self.ignore_names and self.ignore_names_re.search(uri):
+            return
+
+        ranges = [(sequence.num, byterange)]
+        duration = self.segment_duration(sequence) or 0
+        cache_keys = {}
+        end = byterange[1]
+        worker = self.reader.worker
+        sequences = worker.playlist_sequences
+
+        def cache_key(seq, byterange):
+            request_params = self.create_request_params(seq, byterange)
+            return self.segment_cache_key(seq, request_params)
+
+        key = cache_key(sequence, byterange)
+        if key:
+            if key in self.segment_cache:
+                return
+            cache_keys[sequence.num] = key
+
+        index = sequence.num - sequences[0].num if sequences else -1
+        if not (0 <= index < len(sequences) and sequences[index].num == sequence.num):
+            index = len(sequences)
+
+        for next_sequence in sequences[index + 1:]:
+            segment = next_sequence.segment
+            if (segment.uri != uri or not segment.byterange or
+                    (worker.playlist_end is not None and next_sequence.num > worker.playlist_end)):
+                break
+
+            bytes_start = end + 1
+            if segment.byterange.offset is not None and segment.byterange.offset != bytes_start:
+                break
+
+            bytes_end = bytes_start + max(segment.byterange.range - 1, 0)
+            if bytes_end - ranges[0][1][0] + 1 > self.byterange_coalesce:
+                break
+
+            key = cache_key(next_sequence, (bytes_start, bytes_end))
+            if key and key in self.segment_cache:
+                break
+
+            ranges.append((next_sequence.num, (bytes_start, bytes_end)))
+            duration += self.segment_duration(next_sequence) or 0
+            if key:
+                cache_keys[next_sequence.num] = key
+            end = bytes_end
+
+        self.byterange_offsets[uri] = end + 1
+
+        run = HLSByteRangeRun(uri, ranges)
+        run.cache_keys = cache_keys
+        run.duration = duration
+
+        return run
+
+    def fetch_byterange_run(self, run, retries=None):
+        if self.closed or not retries:
+            return
+
+        request_params = self.create_request_params(None, (run.start, run.end))
+        try:
+            res = self.session.http.get(run.uri,
+                                        stream=True,
+                                        timeout=self.timeout,
+                                        exception=StreamError,
+                                        retries=self.retries,
+                                        **request_params)
+        except StreamError as err:
+            self.failed(err)
+            self.logger.error("Failed to open segments {0}-{1}: {2}",
+                              run.ranges[0][0], run.ranges[-1][0], err)
+            return
+
+        self.logger.debug("Fetching segments {0}-{1} with a single request",
+                          run.ranges[0][0], run.ranges[-1][0])
+        run.open(res)
+
+        return run
+
+    def fetch_byterange_run_adaptive(self, run, retries=None):
+        """Fetches a run in a single download slot, its time budget
+           is the play time of all its segments."""
+        self.acquire_fetch_slot()
+        start = time()
+        try:
+            return self.fetch_byterange_run(run, retries=retries)
+        finally:
+            self.release_fetch_slot(time() - start, run.duration)
+
     def fetch(self, sequence, retries=None):
         if self.closed or not retries:
             return
@@ -122,16 +448,80 @@ class HLSStreamWriter(SegmentedStreamWriter):
                 self.logger.debug("Skipping segment {0}".format(sequence.num))
                 return
 
-            return self.session.http.get(sequence.segment.uri,
-                                         timeout=self.timeout,
-                                         exception=StreamError,
-                                         retries=self.retries,
-                                         **request_params)
+            cache_key = self.segment_cache_key(sequence, request_params)
+            if cache_key:
+                cached = self.segment_cache.get(cache_key)
+                if cached:
+                    return cached
+
+            res = self.session.http.get(sequence.segment.uri,
+                                        timeout=self.timeout,
+                                        exception=StreamError,
+                                        retries=self.retries,
+                                        **request_params)
+            res.segment_cache_key = cache_key
+
+            return res
         except StreamError as err:
+            self.failed(err)
             self.logger.error("Failed to open segment {0}: {1}", sequence.num, err)
             return
 
+    def iter_decrypt(self, decryptor, chunks, block_size=16):
+        """Decrypts an iterator of chunks block by block.
+
+        The last full block is held back until the end of the data,
+        so that the PKCS#7 padding can be removed from it.
+        """
+        pending = b""
+        decrypt_time = 0.0
+        for chunk in chunks:
+            data = pending + chunk
+            size = len(data) - len(data) % block_size - block_size
+            if size > 0:
+                start = time()
+                data, pending = decryptor.decrypt(data[:size]), data[size:]
+                decrypt_time += time() - start
+                yield data
+            else:
+                pending = data
+
+        # If the input data is not a multiple of 16, cut off any garbage
+        garbage_len = len(pending) % block_size
+        if garbage_len:
+            self.logger.debug("Cutting off {0} bytes of garbage "
+                              "before decrypting", garbage_len)
+            pending = pending[:-garbage_len]
+
+        if pending:
+            start = time()
+            data = pkcs7_decode(decryptor.decrypt(pending), block_size)
+            self.metric_decrypt.observe(decrypt_time + time() - start)
+            yield data
+
+    def segment_duration(self, sequence):
+        return self.reader.worker.playlist_target_duration or sequence.segment.duration
+
     def write(self, sequence, res, chunk_size=8192):
+        if isinstance(res, HLSByteRangeRun):
+            try:
+                res = res.segment(sequence)
+            except StreamError as err:
+                self.failed(err)
+                self.logger.error("Failed to open segment {0}: {1}", sequence.num, err)
+                return
+
+        if isinstance(res, CachedSegment):
+            # Cached segments are stored decrypted
+            for chunk in res.iter_content(chunk_size):
+                self.reader.buffer.write(chunk)
+
+                if self.closed:
+                    return
+
+            self.logger.debug("Loaded segment {0} from the cache", sequence.num)
+            return
+
         if sequence.segment.key and sequence.segment.key.method != "NONE":
             try:
                 decryptor = self.create_decryptor(sequence.segment.key,
@@ -141,21 +531,34 @@ class HLSStreamWriter(SegmentedStreamWriter):
                 self.close()
                 return
 
-            data = res.content
-            # If the input data is not a multiple of 16, cut off any garbage
-            garbage_len = len(data) % 16
-            if garbage_len:
-                self.logger.debug("Cutting off {0} bytes of garbage "
-                                  "before decrypting", garbage_len)
-                decrypted_chunk = decryptor.decrypt(data[:-garbage_len])
-            else:
-                decrypted_chunk = decryptor.decrypt(data)
-
-            self.reader.buffer.write(pkcs7_decode(decrypted_chunk))
+            chunks = self.iter_decrypt(decryptor, res.iter_content(chunk_size))
         else:
-            for chunk in res.iter_content(chunk_size):
+            chunks = res.iter_content(chunk_size)
+
+        cache_entry = None
+        if getattr(res, "segment_cache_key", None):
+            cache_entry = self.segment_cache.put(res.segment_cache_key)
+
+        try:
+            for chunk in chunks:
+                if cache_entry:
+                    cache_entry.write(chunk)
                 self.reader.buffer.write(chunk)
 
+                if self.closed:
+                    return
+
+            if cache_entry:
+                cache_entry.commit()
+        except StreamError as err:
+            # A byterange run ended early or the padding is corrupt
+            self.failed(err)
+            self.logger.error("Failed to read segment {0}: {1}", sequence.num, err)
+            return
+        finally:
+            if cache_entry:
+                cache_entry.abort()
+
         self.logger.debug("Download of segment {0} complete", sequence.num)
 
 
@@ -168,7 +571,9 @@ class HLSStreamWorker(SegmentedStreamWorker):
         self.playlist_end = None
         self.playlist_sequence = -1
         self.playlist_sequences = []
+        self.playlist_last_sequence = None
         self.playlist_reload_time = 15
+        self.playlist_target_duration = None
         self.live_edge = self.session.options.get("hls-live-edge")
         self.playlist_reload_retries = self.session.options.get("hls-playlist-reload-attempts")
         self.duration_offset_start = int(self.stream.start_offset + (self.session.options.get("hls-start-offset") or 0))
@@ -206,7 +611,8 @@ class HLSStreamWorker(SegmentedStreamWorker):
         self.logger.debug("Reloading session for playlist")
         cache = Cache(
             filename="streamdata.json",
-            key_prefix="cache:{0}".format(self.stream.url)
+            key_prefix="cache:{0}".format(self.stream.url),
+            session=self.session
         )
         cache_stream_name = cache.get("cache_stream_name", "best")
         cache_url = cache.get("cache_url")
@@ -236,7 +642,8 @@ class HLSStreamWorker(SegmentedStreamWorker):
         self.stream = streams[cache_stream_name]
         new_cache = Cache(
             filename="streamdata.json",
-            key_prefix="cache:{0}".format(self.stream.url)
+            key_prefix="cache:{0}".format(self.stream.url),
+            session=self.session
         )
         new_cache.set("cache_stream_name", cache_stream_name, (self.session_reload + 60))
         new_cache.set("cache_url", cache_url, (self.session_reload + 60))
@@ -252,8 +659,15 @@ class HLSStreamWorker(SegmentedStreamWorker):
                                     exception=StreamError,
                                     retries=self.playlist_reload_retries,
                                     **self.reader.request_params)
+
+        # Segments that were already queued are not parsed again,
+        # unless the sequence numbers are allowed to go backwards
+        skip_sequence = None
+        if self.playlist_last_sequence is not None and not self.sequence_ignore_number:
+            skip_sequence = min(self.playlist_last_sequence, self.playlist_sequence - 1)
+
         try:
-            playlist = hls_playlist.load(res.text, res.url)
+            playlist = hls_playlist.load(res.text, res.url, skip_sequence=skip_sequence)
         except ValueError as err:
             raise StreamError(err)
 
@@ -264,32 +678,47 @@ class HLSStreamWorker(SegmentedStreamWorker):
         if playlist.iframes_only:
             raise StreamError("Streams containing I-frames only is not playable")
 
-        media_sequence = playlist.media_sequence or 0
+        media_sequence = (playlist.media_sequence or 0) + playlist.segments_skipped
         sequences = [Sequence(media_sequence + i, s)
                      for i, s in enumerate(playlist.segments)]
 
-        if sequences:
+        if sequences or playlist.segments_skipped:
             self.process_sequences(playlist, sequences)
 
     def process_sequences(self, playlist, sequences):
-        first_sequence, last_sequence = sequences[0], sequences[-1]
+        """Updates the worker with the sequences of a reloaded playlist.
+
+        sequences only contains the segments that were not skipped
+        by the parser, it is empty if the playlist has not changed.
+        """
+        last_num = (playlist.media_sequence or 0) + playlist.segments_skipped + len(sequences) - 1
 
-        if first_sequence.segment.key and first_sequence.segment.key.method != "NONE":
-            self.logger.debug("Segments in this playlist are encrypted")
+        if sequences and self.playlist_last_sequence is None:
+            first_sequence = sequences[0]
+            if first_sequence.segment.key and first_sequence.segment.key.method != "NONE":
+                self.logger.debug("Segments in this playlist are encrypted")
+
+        self.playlist_changed = last_num != self.playlist_last_sequence
+        self.playlist_last_sequence = last_num
+        self.playlist_target_duration = playlist.target_duration
+        if playlist.target_duration:
+            self.playlist_reload_time = playlist.target_duration
+        elif sequences:
+            self.playlist_reload_time = sequences[-1].segment.duration
 
-        self.playlist_changed = ([s.num for s in self.playlist_sequences] !=
-                                 [s.num for s in sequences])
-        self.playlist_reload_time = (playlist.target_duration or
-                                     last_sequence.segment.duration)
         self.playlist_sequences = sequences
 
         if not self.playlist_changed:
             self.playlist_reload_time = max(self.playlist_reload_time / 2, 1)
 
         if playlist.is_endlist:
-            self.playlist_end = last_sequence.num
+            self.playlist_end = last_num
+
+        if not sequences:
+            return
 
         if self.playlist_sequence < 0:
+            first_sequence = sequences[0]
             if self.playlist_end is None and not self.hls_live_restart:
                 edge_index = -(min(len(sequences), max(int(self.live_edge), 1)))
                 edge_sequence = sequences[edge_index]
@@ -41,6 +41,12 @@ Segment = namedtuple("Segment", "uri duration title key discontinuity "
 ATTRIBUTE_REGEX = (r"([A-Z\-]+)=(\d+\.\d+|0x[0-9A-z]+|\d+x\d+|\d+|"
                    r"\"(.+?)\"|[0-9A-z\-]+)")
 
+_attribute_re = re.compile(ATTRIBUTE_REGEX)
+_byterange_re = re.compile(r"(?P<range>\d+)(@(?P<offset>.+))?")
+_extinf_re = re.compile(r"(?P<duration>\d+(\.\d+)?)(,(?P<title>.+))?")
+_resolution_re = re.compile(r"(\d+)x(\d+)")
+_tag_re = re.compile(r"#(?P<tag>[\w-]+)(:(?P<value>.+))?")
+
 
 class M3U8(object):
     def __init__(self):
@@ -60,10 +66,16 @@ class M3U8(object):
         self.playlists = []
         self.segments = []
 
+        # Number of segments at the start of the playlist that were
+        # skipped by the parser and are not in segments
+        self.segments_skipped = 0
+
 
 class M3U8Parser(object):
-    def __init__(self, base_uri=None):
+    def __init__(self, base_uri=None, skip_sequence=None):
         self.base_uri = base_uri
+        self.base_dir = None
+        self.skip_sequence = skip_sequence
 
     def create_stream_info(self, streaminf, cls=None):
         program_id = streaminf.get("PROGRAM-ID")
@@ -93,7 +105,7 @@ class M3U8Parser(object):
                               streaminf.get("SUBTITLES"))
 
     def split_tag(self, line):
-        match = re.match("#(?P<tag>[\w-]+)(:(?P<value>.+))?", line)
+        match = _tag_re.match(line)
 
         if match:
             return match.group("tag"), (match.group("value") or "").strip()
@@ -104,7 +116,7 @@ class M3U8Parser(object):
         def map_attribute(key, value, quoted):
             return (key, quoted or value)
 
-        attr = re.findall(ATTRIBUTE_REGEX, value)
+        attr = _attribute_re.findall(value)
 
         return dict(starmap(map_attribute, attr))
 
@@ -112,14 +124,15 @@ class M3U8Parser(object):
         return value == "YES"
 
     def parse_byterange(self, value):
-        match = re.match("(?P<range>\d+)(@(?P<offset>.+))?", value)
+        match = _byterange_re.match(value)
 
         if match:
+            offset = match.group("offset")
             return ByteRange(int(match.group("range")),
-                             int(match.group("offset") or 0))
+                             int(offset) if offset is not None else None)
 
     def parse_extinf(self, value):
-        match = re.match("(?P<duration>\d+(\.\d+)?)(,(?P<title>.+))?", value)
+        match = _extinf_re.match(value)
         if match:
             return float(match.group("duration")), match.group("title")
         return (0, None)
@@ -132,7 +145,7 @@ class M3U8Parser(object):
         return unhexlify(value)
 
     def parse_resolution(self, value):
-        match = re.match("(\d+)x(\d+)", value)
+        match = _resolution_re.match(value)
 
         if match:
             width, height = int(match.group(1)), int(match.group(2))
@@ -149,99 +162,206 @@ class M3U8Parser(object):
 
         return value
 
+    def skip_segment(self):
+        """Checks if the next segment has a media sequence number at or
+        below skip_sequence."""
+        if self.skip_sequence is None:
+            return False
+
+        sequence = ((self.m3u8.media_sequence or 0) +
+                    self.m3u8.segments_skipped + len(self.m3u8.segments))
+
+        return sequence <= self.skip_sequence
+
+    def parse_uri_line(self, line):
+        if self.state.get("skip_segment"):
+            # Only the segment specific state is dropped, keys and
+            # maps still apply to the following segments
+            for name in ("skip_segment", "expect_segment", "byterange",
+                         "extinf", "date", "discontinuity"):
+                self.state.pop(name, None)
+
+            self.m3u8.segments_skipped += 1
+        elif self.state.pop("expect_segment", None):
+            byterange = self.state.pop("byterange", None)
+            extinf = self.state.pop("extinf", (0, None))
+            date = self.state.pop("date", None)
+            map_ = self.state.get("map")
+            key = self.state.get("key")
+
+            segment = Segment(self.uri(line), extinf[0],
+                              extinf[1], key,
+                              self.state.pop("discontinuity", False),
+                              byterange, date, map_)
+            self.m3u8.segments.append(segment)
+        elif self.state.pop("expect_playlist", None):
+            streaminf = self.state.pop("streaminf", {})
+            stream_info = self.create_stream_info(streaminf)
+            playlist = Playlist(self.uri(line), stream_info, [], False)
+            self.m3u8.playlists.append(playlist)
+
     def parse_line(self, lineno, line):
         if lineno == 0 and not line.startswith("#EXTM3U"):
             raise ValueError("Missing #EXTM3U header")
 
         if not line.startswith("#"):
-            if self.state.pop("expect_segment", None):
-                byterange = self.state.pop("byterange", None)
-                extinf = self.state.pop("extinf", (0, None))
-                date = self.state.pop("date", None)
-                map_ = self.state.get("map")
-                key = self.state.get("key")
-
-                segment = Segment(self.uri(line), extinf[0],
-                                  extinf[1], key,
-                                  self.state.pop("discontinuity", False),
-                                  byterange, date, map_)
-                self.m3u8.segments.append(segment)
-            elif self.state.pop("expect_playlist", None):
-                streaminf = self.state.pop("streaminf", {})
-                stream_info = self.create_stream_info(streaminf)
-                playlist = Playlist(self.uri(line), stream_info, [], False)
-                self.m3u8.playlists.append(playlist)
-        elif line.startswith("#EXTINF"):
-            self.state["expect_segment"] = True
-            self.state["extinf"] = self.parse_tag(line, self.parse_extinf)
-        elif line.startswith("#EXT-X-BYTERANGE"):
-            self.state["expect_segment"] = True
-            self.state["byterange"] = self.parse_tag(line, self.parse_byterange)
-        elif line.startswith("#EXT-X-TARGETDURATION"):
-            self.m3u8.target_duration = self.parse_tag(line, int)
-        elif line.startswith("#EXT-X-MEDIA-SEQUENCE"):
-            self.m3u8.media_sequence = self.parse_tag(line, int)
-        elif line.startswith("#EXT-X-KEY"):
-            attr = self.parse_tag(line, self.parse_attributes)
-            iv = attr.get("IV")
-            if iv:
-                iv = self.parse_hex(iv)
-            self.state["key"] = Key(attr.get("METHOD"),
-                                    self.uri(attr.get("URI")),
-                                    iv, attr.get("KEYFORMAT"),
-                                    attr.get("KEYFORMATVERSIONS"))
-        elif line.startswith("#EXT-X-PROGRAM-DATE-TIME"):
-            self.state["date"] = self.parse_tag(line)
-        elif line.startswith("#EXT-X-ALLOW-CACHE"):
-            self.m3u8.allow_cache = self.parse_tag(line, self.parse_bool)
-        elif line.startswith("#EXT-X-STREAM-INF"):
-            self.state["streaminf"] = self.parse_tag(line, self.parse_attributes)
-            self.state["expect_playlist"] = True
-        elif line.startswith("#EXT-X-PLAYLIST-TYPE"):
-            self.m3u8.playlist_type = self.parse_tag(line)
-        elif line.startswith("#EXT-X-ENDLIST"):
-            self.m3u8.is_endlist = True
-        elif line.startswith("#EXT-X-MEDIA"):
-            attr = self.parse_tag(line, self.parse_attributes)
-            media = Media(self.uri(attr.get("URI")), attr.get("TYPE"),
-                          attr.get("GROUP-ID"), attr.get("LANGUAGE"),
-                          attr.get("NAME"),
-                          self.parse_bool(attr.get("DEFAULT")),
-                          self.parse_bool(attr.get("AUTOSELECT")),
-                          self.parse_bool(attr.get("FORCED")),
-                          attr.get("CHARACTERISTICS"))
-            self.m3u8.media.append(media)
-        elif line.startswith("#EXT-X-DISCONTINUITY"):
-            self.state["discontinuity"] = True
-            self.state["map"] = None
-        elif line.startswith("#EXT-X-DISCONTINUITY-SEQUENCE"):
-            self.m3u8.discontinuity_sequence = self.parse_tag(line, int)
-        elif line.startswith("#EXT-X-I-FRAMES-ONLY"):
-            self.m3u8.iframes_only = True
-        elif line.startswith("#EXT-X-MAP"):
-            attr = self.parse_tag(line, self.parse_attributes)
-            byterange = self.parse_byterange(attr.get("BYTERANGE", ""))
-            self.state["map"] = Map(attr.get("URI"), byterange)
-        elif line.startswith("#EXT-X-I-FRAME-STREAM-INF"):
-            attr = self.parse_tag(line, self.parse_attributes)
-            streaminf = self.state.pop("streaminf", attr)
-            stream_info = self.create_stream_info(streaminf, IFrameStreamInfo)
-            playlist = Playlist(self.uri(attr.get("URI")), stream_info, [], True)
-            self.m3u8.playlists.append(playlist)
-        elif line.startswith("#EXT-X-VERSION"):
-            self.m3u8.version = self.parse_tag(line, int)
-        elif line.startswith("#EXT-X-START"):
-            attr = self.parse_tag(line, self.parse_attributes)
-            start = Start(attr.get("TIME-OFFSET"),
-                          self.parse_bool(attr.get("PRECISE", "NO")))
-            self.m3u8.start = start
+            self.parse_uri_line(line)
+            return
+
+        tag, _, value = line[1:].partition(":")
+        method = self.tags.get(tag.rstrip())
+        if method:
+            getattr(self, method)(value.strip())
+
+    def tag_extinf(self, value):
+        self.state["expect_segment"] = True
+        if self.skip_segment():
+            self.state["skip_segment"] = True
+        else:
+            self.state["extinf"] = self.parse_extinf(value)
+
+    def tag_byterange(self, value):
+        self.state["expect_segment"] = True
+        self.state["byterange"] = self.parse_byterange(value)
+
+    def tag_target_duration(self, value):
+        self.m3u8.target_duration = int(value)
+
+    def tag_media_sequence(self, value):
+        self.m3u8.media_sequence = int(value)
+
+    def tag_key(self, value):
+        attr = self.parse_attributes(value)
+        iv = attr.get("IV")
+        if iv:
+            iv = self.parse_hex(iv)
+        self.state["key"] = Key(attr.get("METHOD"),
+                                self.uri(attr.get("URI")),
+                                iv, attr.get("KEYFORMAT"),
+                                attr.get("KEYFORMATVERSIONS"))
+
+    def tag_program_date_time(self, value):
+        self.state["date"] = value
+
+    def tag_allow_cache(self, value):
+        self.m3u8.allow_cache = self.parse_bool(value)
+
+    def tag_stream_inf(self, value):
+        self.state["streaminf"] = self.parse_attributes(value)
+        self.state["expect_playlist"] = True
+
+    def tag_playlist_type(self, value):
+        self.m3u8.playlist_type = value
+
+    def tag_endlist(self, value):
+        self.m3u8.is_endlist = True
+
+    def tag_media(self, value):
+        attr = self.parse_attributes(value)
+        media = Media(self.uri(attr.get("URI")), attr.get("TYPE"),
+                      attr.get("GROUP-ID"), attr.get("LANGUAGE"),
+                      attr.get("NAME"),
+                      self.parse_bool(attr.get("DEFAULT")),
+                      self.parse_bool(attr.get("AUTOSELECT")),
+                      self.parse_bool(attr.get("FORCED")),
+                      attr.get("CHARACTERISTICS"))
+        self.m3u8.media.append(media)
+
+    def tag_discontinuity(self, value):
+        self.state["discontinuity"] = True
+        self.state["map"] = None
+
+    def tag_discontinuity_sequence(self, value):
+        self.m3u8.discontinuity_sequence = int(value)
+
+    def tag_iframes_only(self, value):
+        self.m3u8.iframes_only = True
+
+    def tag_map(self, value):
+        attr = self.parse_attributes(value)
+        byterange = self.parse_byterange(attr.get("BYTERANGE", ""))
+        self.state["map"] = Map(attr.get("URI"), byterange)
+
+    def tag_iframe_stream_inf(self, value):
+        attr = self.parse_attributes(value)
+        streaminf = self.state.pop("streaminf", attr)
+        stream_info = self.create_stream_info(streaminf, IFrameStreamInfo)
+        playlist = Playlist(self.uri(attr.get("URI")), stream_info, [], True)
+        self.m3u8.playlists.append(playlist)
+
+    def tag_version(self, value):
+        self.m3u8.version = int(value)
+
+    def tag_start(self, value):
+        attr = self.parse_attributes(value)
+        start = Start(attr.get("TIME-OFFSET"),
+                      self.parse_bool(attr.get("PRECISE", "NO")))
+        self.m3u8.start = start
+
+    # Tag name to method, tags not listed here are ignored
+    tags = {
+        "EXTINF": "tag_extinf",
+        "EXT-X-BYTERANGE": "tag_byterange",
+        "EXT-X-TARGETDURATION": "tag_target_duration",
+        "EXT-X-MEDIA-SEQUENCE": "tag_media_sequence",
+        "EXT-X-KEY": "tag_key",
+        "EXT-X-PROGRAM-DATE-TIME": "tag_program_date_time",
+        "EXT-X-ALLOW-CACHE": "tag_allow_cache",
+        "EXT-X-STREAM-INF": "tag_stream_inf",
+        "EXT-X-PLAYLIST-TYPE": "tag_playlist_type",
+        "EXT-X-ENDLIST": "tag_endlist",
+        "EXT-X-MEDIA": "tag_media",
+        "EXT-X-DISCONTINUITY": "tag_discontinuity",
+        "EXT-X-DISCONTINUITY-SEQUENCE": "tag_discontinuity_sequence",
+        "EXT-X-I-FRAMES-ONLY": "tag_iframes_only",
+        "EXT-X-MAP": "tag_map",
+        "EXT-X-I-FRAME-STREAM-INF": "tag_iframe_stream_inf",
+        "EXT-X-VERSION": "tag_version",
+        "EXT-X-START": "tag_start",
+    }
 
     def parse(self, data):
         self.state = {}
         self.m3u8 = M3U8()
 
-        for lineno, line in enumerate(filter(bool, data.splitlines())):
-            self.parse_line(lineno, line)
+        m3u8 = self.m3u8
+        state = self.state
+        parse_extinf = self.parse_extinf
+        parse_line = self.parse_line
+        uri = self.uri
+        skipping = self.skip_sequence is not None
+
+        lines = enumerate(filter(bool, data.splitlines()))
+        for lineno, line in lines:
+            # Fast path for the common "#EXTINF" + URI pair, segments
+            # with other tags in front of them take the generic path
+            if (lineno and line.startswith("#EXTINF:") and
+                    "expect_segment" not in state and "date" not in state and
+                    "discontinuity" not in state):
+                skip = skipping and self.skip_segment()
+                if not skip:
+                    extinf = parse_extinf(line[8:].strip())
+
+                lineno, line = next(lines, (None, None))
+                if line is not None and not line.startswith("#"):
+                    if skip:
+                        m3u8.segments_skipped += 1
+                    else:
+                        m3u8.segments.append(Segment(uri(line), extinf[0], extinf[1],
+                                                     state.get("key"), False, None,
+                                                     None, state.get("map")))
+                    continue
+
+                state["expect_segment"] = True
+                if skip:
+                    state["skip_segment"] = True
+                else:
+                    state["extinf"] = extinf
+
+                if line is None:
+                    break
+
+            parse_line(lineno, line)
 
         # Associate Media entries with each Playlist
         for playlist in self.m3u8.playlists:
@@ -257,6 +377,16 @@ class M3U8Parser(object):
         return self.m3u8
 
     def uri(self, uri):
+        # Most segment URIs are plain relative paths, those are joined
+        # with the directory of base_uri without parsing them
+        if (uri and ":" not in uri and uri[0] not in "/.?#" and
+                "/." not in uri and "//" not in uri):
+            if self.base_dir is None:
+                self.base_dir = self.create_base_dir()
+
+            if self.base_dir:
+                return self.base_dir + uri
+
         if uri and urlparse(uri).scheme:
             return uri
         elif self.base_uri and uri:
@@ -264,8 +394,20 @@ class M3U8Parser(object):
         else:
             return uri
 
+    def create_base_dir(self):
+        """Returns the prefix that relative paths are joined to, or
+        an empty string if the base URI does not support it."""
+        if not self.base_uri:
+            return ""
+
+        base_dir = urljoin(self.base_uri, "_")
+        if not base_dir.endswith("_") or base_dir == "_":
+            return ""
+
+        return base_dir[:-1]
 
-def load(data, base_uri=None, parser=M3U8Parser):
+
+def load(data, base_uri=None, parser=M3U8Parser, skip_sequence=None):
     """Attempts to parse a M3U8 playlist from a string of data.
 
     If specified, *base_uri* is the base URI that relative URIs will
@@ -274,5 +416,12 @@ def load(data, base_uri=None, parser=M3U8Parser):
     If specified, *parser* can be a M3U8Parser subclass to be used
     to parse the data.
 
+    If specified, segments with a media sequence number at or below
+    *skip_sequence* are only counted in
+    :attr:`M3U8.segments_skipped` and not added to the segments.
+
     """
-    return parser(base_uri).parse(data)
+    if skip_sequence is None:
+        return parser(base_uri).parse(data)
+
+    return parser(base_uri, skip_sequence=skip_sequence).parse(data)
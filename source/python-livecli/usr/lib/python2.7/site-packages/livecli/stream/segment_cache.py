@@ -0,0 +1,240 @@
+"""An on-disk cache of downloaded segments, shared by the streams
+   of all sessions in the process."""
+
+import os
+import tempfile
+
+from collections import OrderedDict
+from functools import partial
+from hashlib import sha1
+from threading import Lock
+from time import time
+
+from ..cache import cache_dir
+
+__all__ = ["CachedSegment", "SegmentCache", "segment_cache"]
+
+default_cache_dir = os.path.join(cache_dir, "segments")
+
+# Unfinished entries older than this are left over from a crash
+PART_MAX_AGE = 60 * 60
+
+_caches = {}
+_caches_lock = Lock()
+
+
+def segment_cache(path, max_size):
+    """Returns the cache of the directory path, there is only one
+       per directory so that the size limit applies to all streams."""
+    path = os.path.abspath(path or default_cache_dir)
+
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = SegmentCache(path, max_size)
+        else:
+            cache.max_size = max_size
+
+    return cache
+
+
+class CachedSegment(object):
+    """The data of a segment read from the cache."""
+
+    def __init__(self, key, fd):
+        self.key = key
+        self.fd = fd
+
+    def iter_content(self, chunk_size=8192):
+        try:
+            for chunk in iter(partial(self.fd.read, chunk_size), b""):
+                yield chunk
+        finally:
+            self.fd.close()
+
+
+class SegmentCacheEntry(object):
+    """A segment that is being written to the cache.
+
+    The data is written to a temporary file that replaces the entry
+    on commit(), readers never see a partial segment.
+    """
+
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+        self.size = 0
+
+        fd, self.tempname = tempfile.mkstemp(dir=cache.path, suffix=".part")
+        self.fd = os.fdopen(fd, "wb")
+
+    def write(self, data):
+        if self.fd is None:
+            return
+
+        self.size += len(data)
+        if self.size > self.cache.max_size:
+            # Would evict everything else
+            self.abort()
+            return
+
+        try:
+            self.fd.write(data)
+        except (IOError, OSError):
+            self.abort()
+
+    def commit(self):
+        if self.fd is None:
+            return
+
+        try:
+            self.fd.close()
+            self.fd = None
+            self.cache.add(self.key, self.tempname, self.size)
+            self.tempname = None
+        except (IOError, OSError):
+            self.abort()
+
+    def abort(self):
+        """Discards the entry, does nothing after commit()."""
+        if self.fd is not None:
+            self.fd.close()
+            self.fd = None
+
+        if self.tempname is None:
+            return
+
+        try:
+            os.remove(self.tempname)
+        except OSError:
+            pass
+        self.tempname = None
+
+
+class SegmentCache(object):
+    """Stores the data of segments in a directory.
+
+    Entries are keyed by a string, usually the segment URI and byte
+    range. When the total size exceeds max_size the least recently
+    used entries are removed, the order is kept in the modification
+    time of the files so that it survives restarts.
+    """
+
+    def __init__(self, path, max_size):
+        self.path = path
+        self.max_size = max_size
+
+        self._entries = None
+        self._size = 0
+        self._lock = Lock()
+
+    @staticmethod
+    def filename(key):
+        if not isinstance(key, bytes):
+            key = key.encode("utf8")
+
+        return sha1(key).hexdigest()
+
+    def _load(self):
+        """Indexes the entries on disk, called with the lock held."""
+        if self._entries is not None:
+            return
+
+        self._entries = OrderedDict()
+        self._size = 0
+
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+        files = []
+        now = time()
+        for name in os.listdir(self.path):
+            filename = os.path.join(self.path, name)
+            try:
+                stat = os.stat(filename)
+                if name.endswith(".part"):
+                    if stat.st_mtime < now - PART_MAX_AGE:
+                        os.remove(filename)
+                    continue
+            except OSError:
+                continue
+
+            files.append((stat.st_mtime, name, stat.st_size))
+
+        for mtime, name, size in sorted(files):
+            self._entries[name] = size
+            self._size += size
+
+    def _evict(self):
+        """Removes the least recently used entries until the cache
+           fits into max_size, called with the lock held."""
+        while self._entries and self._size > self.max_size:
+            name, size = self._entries.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+
+    def __contains__(self, key):
+        return os.path.exists(os.path.join(self.path, self.filename(key)))
+
+    def get(self, key):
+        """Returns a CachedSegment of the entry or None."""
+        name = self.filename(key)
+        filename = os.path.join(self.path, name)
+
+        with self._lock:
+            try:
+                self._load()
+                fd = open(filename, "rb")
+            except (IOError, OSError):
+                if self._entries:
+                    self._size -= self._entries.pop(name, 0)
+                return None
+
+            size = os.fstat(fd.fileno()).st_size
+            try:
+                # Marks the entry as recently used
+                os.utime(filename, None)
+            except OSError:
+                pass
+
+            # The entry may have been added by another process
+            self._size += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+
+        return CachedSegment(key, fd)
+
+    def put(self, key):
+        """Returns a SegmentCacheEntry to write the data of key to,
+           or None if the cache directory is not writable."""
+        for attempt in range(2):
+            try:
+                with self._lock:
+                    self._load()
+
+                return SegmentCacheEntry(self, key)
+            except (IOError, OSError):
+                # The directory may have been removed, index it again
+                with self._lock:
+                    self._entries = None
+
+    def add(self, key, tempname, size):
+        name = self.filename(key)
+
+        with self._lock:
+            os.rename(tempname, os.path.join(self.path, name))
+            self._size += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+            self._evict()
+
+    def clear(self):
+        """Removes all entries."""
+        with self._lock:
+            self._load()
+            self.max_size, max_size = 0, self.max_size
+            try:
+                self._evict()
+            finally:
+                self.max_size = max_size
@@ -1,10 +1,13 @@
+from collections import deque
 from concurrent import futures
-from threading import Thread, Event
+from math import ceil
+from threading import Condition, Thread
+from time import time
 
 from .stream import StreamIO
 from ..buffers import RingBuffer
-
-from livecli.compat import compat_queue
+from ..metrics import BYTES, BYTES_PER_SECOND, COUNT
+from ..utils.events import Event
 
 
 class SegmentedStreamWorker(Thread):
@@ -22,7 +25,8 @@ class SegmentedStreamWorker(Thread):
         self.session = reader.stream.session
         self.logger = reader.logger
 
-        self._wait = None
+        # Only set by close(), which interrupts any wait
+        self._wait = Event()
 
         Thread.__init__(self)
         self.daemon = True
@@ -33,8 +37,7 @@ class SegmentedStreamWorker(Thread):
             self.logger.debug("Closing worker thread")
 
         self.closed = True
-        if self._wait:
-            self._wait.set()
+        self._wait.set()
 
     def wait(self, time):
         """Pauses the thread for a specified time.
@@ -42,7 +45,6 @@ class SegmentedStreamWorker(Thread):
         Returns False if interrupted by another thread and True if the
         time runs out normally.
         """
-        self._wait = Event()
         return not self._wait.wait(time)
 
     def iter_segments(self):
@@ -69,7 +71,8 @@ class SegmentedStreamWriter(Thread):
     and finally writing the data to the buffer.
     """
 
-    def __init__(self, reader, size=20, retries=None, threads=None, timeout=None, ignore_names=None, user_key_uri=None):
+    def __init__(self, reader, size=20, retries=None, threads=None, threads_max=None, timeout=None,
+                 ignore_names=None, user_key_uri=None):
         self.closed = False
         self.reader = reader
         self.stream = reader.stream
@@ -85,12 +88,59 @@ class SegmentedStreamWriter(Thread):
         if not timeout:
             timeout = self.session.options.get("stream-segment-timeout")
 
+        if not threads_max or threads_max < threads:
+            threads_max = threads
+
         self.retries = retries
         self.timeout = timeout
         self.ignore_names = ignore_names
         self.user_key_uri = user_key_uri
-        self.executor = futures.ThreadPoolExecutor(max_workers=threads)
-        self.futures = compat_queue.Queue(size)
+        self.executor = futures.ThreadPoolExecutor(max_workers=threads_max)
+
+        # Segments are fetched concurrently but written in order, the
+        # window holds the fetches that are running or waiting to be
+        # written and is woken up when one of them is done
+        self.window = deque()
+        self.window_size = max(size, threads_max * 2)
+        self.window_changed = Condition()
+
+        # Time spent waiting for a segment while later ones were done
+        self.blocked_time = 0.0
+        self.blocked_segments = 0
+
+        metrics = self.session.metrics
+        self.metric_fetch = metrics.histogram("segment_fetch_seconds",
+                                              help="Time to open or download a segment")
+        self.metric_write = metrics.histogram("segment_write_seconds",
+                                              help="Time to read, process and buffer a segment")
+        self.metric_size = metrics.histogram("segment_size_bytes", BYTES,
+                                             help="Bytes buffered per segment")
+        self.metric_throughput = metrics.histogram("segment_throughput_bytes_per_second",
+                                                   BYTES_PER_SECOND,
+                                                   help="Segment size by fetch and write time")
+        self.metric_bytes = metrics.counter("segment_bytes_total",
+                                            help="Bytes buffered by the writers")
+        self.metric_retries = metrics.counter("segment_retries_total",
+                                              help="Retried segment requests")
+        self.metric_failures = metrics.counter("segment_failures_total",
+                                               help="Segments that could not be fetched")
+        self.metric_depth = metrics.histogram("writer_queue_depth", COUNT,
+                                              help="Fetches in the window when one is written")
+        self.metric_blocked = metrics.histogram("writer_blocked_seconds",
+                                                help="Head-of-line blocking per segment")
+
+        # Adaptive mode, the number of concurrent fetches is kept
+        # between threads and threads_max
+        self.threads = threads
+        self.threads_min = threads
+        self.threads_max = threads_max
+        self.fetch_slots = Condition()
+        self.fetch_active = 0
+        self.fetch_waiting = 0
+        self.fetch_time = None
+
+        # Keep enough idle connections around for every download slot
+        self.session.http.acquire_pool(threads_max)
 
         Thread.__init__(self)
         self.daemon = True
@@ -99,10 +149,37 @@ class SegmentedStreamWriter(Thread):
         """Shuts down the thread."""
         if not self.closed:
             self.logger.debug("Closing writer thread")
+            self.closed = True
+            self.session.http.release_pool(self.threads_max)
+            self.log_pool_stats()
+            if self.blocked_segments:
+                self.logger.debug("Head-of-line blocking: {0:.2f}s by {1} segments",
+                                  self.blocked_time, self.blocked_segments)
 
-        self.closed = True
         self.reader.buffer.close()
-        self.executor.shutdown(wait=True)
+
+        # Fetches that have not started yet are dropped, running
+        # ones are not waited for, their results are never written
+        with self.window_changed:
+            for segment, future in self.window:
+                if future is not None:
+                    future.cancel()
+
+            self.window.clear()
+            self.window_changed.notify_all()
+
+        # Release fetches waiting for a download slot
+        with self.fetch_slots:
+            self.fetch_slots.notify_all()
+
+        self.executor.shutdown(wait=False)
+
+    def log_pool_stats(self):
+        """Logs the connection reuse of every host used by the session."""
+        for host, stats in sorted(self.session.http.pool_stats().items()):
+            self.logger.debug("HTTP pool {0}: {1[requests]} requests, "
+                              "{1[reuses]} reused, {1[connections]} connections, "
+                              "{1[handshakes]} handshakes", host, stats)
 
     def put(self, segment):
         """Adds a segment to the download pool and write queue."""
@@ -110,21 +187,76 @@ class SegmentedStreamWriter(Thread):
             return
 
         if segment is not None:
-            future = self.executor.submit(self.fetch, segment,
+            fetch = self.fetch
+            if self.threads_max > self.threads_min:
+                fetch = self.fetch_adaptive
+
+            future = self.executor.submit(self.timed_fetch, fetch, segment,
                                           retries=self.retries)
         else:
             future = None
 
-        self.queue(self.futures, (segment, future))
+        self.enqueue(segment, future)
 
-    def queue(self, queue_, value):
-        """Puts a value into a queue but aborts if this thread is closed."""
-        while not self.closed:
-            try:
-                queue_.put(value, block=True, timeout=1)
-                break
-            except compat_queue.Full:
-                continue
+    def enqueue(self, segment, future):
+        """Adds a segment and the future of its fetch to the window,
+        waits while the window is full.
+
+        A future of None marks the end of the stream.
+        """
+        if future is not None:
+            future.add_done_callback(self.fetch_done)
+
+        with self.window_changed:
+            while len(self.window) >= self.window_size and not self.closed:
+                self.window_changed.wait()
+
+            if not self.closed:
+                self.window.append((segment, future))
+                self.window_changed.notify_all()
+
+    def fetch_done(self, future):
+        """Wakes up the writer when a fetch is done."""
+        with self.window_changed:
+            self.window_changed.notify_all()
+
+    def next_fetch(self):
+        """Waits until the fetch of the oldest segment in the window
+        is done and returns the segment and its future.
+
+        Returns None if the thread is closed. Fetches finishing out
+        of order are kept in the window, the time the oldest one
+        blocks them is added to blocked_time.
+        """
+        blocked_since = None
+
+        with self.window_changed:
+            while not self.closed:
+                if self.window:
+                    segment, future = self.window[0]
+                    if future is None or future.done():
+                        self.metric_depth.observe(len(self.window))
+                        self.window.popleft()
+                        self.window_changed.notify_all()
+                        break
+
+                    if blocked_since is None and any(f is not None and f.done()
+                                                     for s, f in self.window):
+                        blocked_since = time()
+
+                self.window_changed.wait()
+            else:
+                return
+
+        if blocked_since is not None:
+            blocked = time() - blocked_since
+            self.blocked_time += blocked
+            self.blocked_segments += 1
+            self.metric_blocked.observe(blocked)
+            self.logger.debug("Waited {0:.2f}s for a segment while later "
+                              "segments were done", blocked)
+
+        return segment, future
 
     def fetch(self, segment):
         """Fetches a segment.
@@ -133,6 +265,103 @@ class SegmentedStreamWriter(Thread):
         """
         pass
 
+    def timed_fetch(self, fetch, segment, retries=None):
+        """Calls fetch and records the time it took and its retries,
+        the time is kept in the fetch_time of the result.
+        """
+        start = time()
+        result = fetch(segment, retries=retries)
+        elapsed = time() - start
+        self.metric_fetch.observe(elapsed)
+
+        if result is not None:
+            if getattr(result, "retries", 0):
+                self.metric_retries.inc(result.retries)
+            try:
+                result.fetch_time = elapsed
+            except AttributeError:
+                pass
+
+        return result
+
+    def failed(self, err):
+        """Records a segment that could not be fetched."""
+        self.metric_failures.inc()
+        if getattr(err, "retries", 0):
+            self.metric_retries.inc(err.retries)
+
+    def fetch_adaptive(self, segment, retries=None):
+        """Fetches a segment once a download slot is free and adjusts
+        the number of slots to the time it took.
+        """
+        self.acquire_fetch_slot()
+        start = time()
+        try:
+            return self.fetch(segment, retries=retries)
+        finally:
+            self.release_fetch_slot(time() - start, self.segment_duration(segment))
+
+    def acquire_fetch_slot(self):
+        """Waits until a download slot is free and takes it."""
+        with self.fetch_slots:
+            self.fetch_waiting += 1
+            while self.fetch_active >= self.threads and not self.closed:
+                self.fetch_slots.wait()
+
+            self.fetch_waiting -= 1
+            self.fetch_active += 1
+
+    def release_fetch_slot(self, elapsed, duration):
+        """Frees a download slot, the number of slots is adjusted to the
+        time the fetch took for duration seconds of the stream."""
+        with self.fetch_slots:
+            self.fetch_active -= 1
+
+            if duration:
+                self.adapt_threads(elapsed, duration)
+
+            self.fetch_slots.notify_all()
+
+    def segment_duration(self, segment):
+        """Returns the play time of a segment in seconds, used as the
+        time budget for downloading it in adaptive mode.
+
+        Should be overridden by the inheriting class.
+        """
+        pass
+
+    def adapt_threads(self, elapsed, duration):
+        """Grows or shrinks the number of concurrent fetches.
+
+        While fetches are waiting for a slot (VOD or catching up on a
+        live stream) the pool grows towards threads_max. Otherwise one
+        segment is needed per duration, so about fetch_time / duration
+        fetches have to run at once, twice that is kept for headroom.
+        The pool changes by one slot at a time.
+        """
+        if self.fetch_time is None:
+            self.fetch_time = elapsed
+        else:
+            self.fetch_time = self.fetch_time * 0.7 + elapsed * 0.3
+
+        if self.fetch_waiting:
+            needed = self.threads_max
+        else:
+            needed = int(ceil(2 * self.fetch_time / duration))
+
+        threads = self.threads
+        if needed > threads:
+            threads += 1
+        elif needed < threads:
+            threads -= 1
+
+        threads = max(self.threads_min, min(self.threads_max, threads))
+        if threads != self.threads:
+            self.logger.debug("Segment threads: {0} -> {1} (fetch time {2:.2f}s, "
+                              "segment duration {3:.2f}s)",
+                              self.threads, threads, self.fetch_time, duration)
+            self.threads = threads
+
     def write(self, segment, result):
         """Writes a segment to the buffer.
 
@@ -142,30 +371,47 @@ class SegmentedStreamWriter(Thread):
 
     def run(self):
         while not self.closed:
-            try:
-                segment, future = self.futures.get(block=True, timeout=0.5)
-            except compat_queue.Empty:
-                continue
+            fetch = self.next_fetch()
 
             # End of stream
-            if future is None:
+            if fetch is None or fetch[1] is None:
                 break
 
-            while not self.closed:
-                try:
-                    result = future.result(timeout=0.5)
-                except futures.TimeoutError:
-                    continue
-                except futures.CancelledError:
-                    break
-
-                if result is not None:
-                    self.write(segment, result)
+            segment, future = fetch
+            try:
+                result = future.result()
+            except futures.CancelledError:
+                continue
 
-                break
+            if result is not None:
+                self.timed_write(segment, result)
 
         self.close()
 
+    def timed_write(self, segment, result):
+        """Calls write and records the time it took and the size
+        of the segment."""
+        start = time()
+        written = self.reader.buffer.written
+        self.write(segment, result)
+        elapsed = time() - start
+        self.metric_write.observe(elapsed)
+
+        size = self.reader.buffer.written - written
+        if size:
+            self.metric_bytes.inc(size)
+            self.metric_size.observe(size)
+
+            # A run of byte ranges is fetched once for all its segments
+            fetch_time = getattr(result, "fetch_time", 0)
+            try:
+                result.fetch_time = 0
+            except AttributeError:
+                pass
+
+            if fetch_time + elapsed > 0:
+                self.metric_throughput.observe(size / (fetch_time + elapsed))
+
 
 class SegmentedStreamReader(StreamIO):
     __worker__ = SegmentedStreamWorker
@@ -183,7 +429,7 @@ class SegmentedStreamReader(StreamIO):
 
     def open(self):
         buffer_size = self.session.get_option("ringbuffer-size")
-        self.buffer = RingBuffer(buffer_size)
+        self.buffer = RingBuffer(buffer_size, metrics=self.session.metrics)
         self.writer = self.__writer__(self)
         self.worker = self.__worker__(self)
 
@@ -206,3 +452,10 @@ class SegmentedStreamReader(StreamIO):
 
         return self.buffer.read(size, block=self.writer.is_alive(),
                                 timeout=self.timeout)
+
+    def readinto(self, b):
+        if not self.buffer:
+            return 0
+
+        return self.buffer.readinto(b, block=self.writer.is_alive(),
+                                    timeout=self.timeout)
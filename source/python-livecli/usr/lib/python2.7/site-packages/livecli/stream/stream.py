@@ -43,7 +43,17 @@ class Stream(object):
 
 
 class StreamIO(io.IOBase):
-    pass
+    def readinto(self, b):
+        """Reads data into the writable buffer b and returns the
+        number of bytes read.
+
+        Falls back to :meth:`read` when not overridden.
+        """
+        data = self.read(len(b))
+        size = len(data)
+        memoryview(b)[:size] = data
+
+        return size
 
 
 __all__ = ["Stream", "StreamIO"]
@@ -1,10 +1,34 @@
 from ..buffers import Buffer, RingBuffer
+from ..compat import compat_view
 
+from functools import partial
 from threading import Thread
 
 import io
 
 
+def iter_readinto(fd, chunk_size=8192):
+    """Reads a file-like object until EOF, reusing a single buffer.
+
+    Each yielded chunk is only valid until the next one is requested.
+    File-like objects without readinto() are read with read().
+    """
+    readinto = getattr(fd, "readinto", None)
+    if readinto is None:
+        for data in iter(partial(fd.read, chunk_size), b""):
+            yield data
+
+        return
+
+    buf = bytearray(chunk_size)
+    while True:
+        size = readinto(buf)
+        if not size:
+            break
+
+        yield compat_view(buf, size)
+
+
 class StreamIOWrapper(io.IOBase):
     """Wraps file-like objects that are not inheriting from IOBase"""
 
@@ -14,6 +38,16 @@ class StreamIOWrapper(io.IOBase):
     def read(self, size=-1):
         return self.fd.read(size)
 
+    def readinto(self, b):
+        if hasattr(self.fd, "readinto"):
+            return self.fd.readinto(b)
+
+        data = self.fd.read(len(b))
+        size = len(data)
+        memoryview(b)[:size] = data
+
+        return size
+
     def close(self):
         if hasattr(self.fd, "close"):
             self.fd.close()
@@ -26,10 +60,7 @@ class StreamIOIterWrapper(io.IOBase):
         self.iterator = iterator
         self.buffer = Buffer()
 
-    def read(self, size=-1):
-        if size < 0:
-            size = self.buffer.length
-
+    def _fill(self, size):
         while self.buffer.length < size:
             try:
                 chunk = next(self.iterator)
@@ -37,8 +68,19 @@ class StreamIOIterWrapper(io.IOBase):
             except StopIteration:
                 break
 
+    def read(self, size=-1):
+        if size < 0:
+            size = self.buffer.length
+
+        self._fill(size)
+
         return self.buffer.read(size)
 
+    def readinto(self, b):
+        self._fill(len(b))
+
+        return self.buffer.readinto(b)
+
     def close(self):
         pass
 
@@ -63,17 +105,14 @@ class StreamIOThreadWrapper(io.IOBase):
         def run(self):
             self.running = True
 
-            while self.running:
-                try:
-                    data = self.fd.read(8192)
-                except IOError as error:
-                    self.error = error
-                    break
-
-                if len(data) == 0:
-                    break
+            try:
+                for data in iter_readinto(self.fd, 8192):
+                    self.buffer.write(data)
 
-                self.buffer.write(data)
+                    if not self.running:
+                        break
+            except IOError as error:
+                self.error = error
 
             self.stop()
 
@@ -102,6 +141,13 @@ class StreamIOThreadWrapper(io.IOBase):
         return self.buffer.read(size, block=self.filler.is_alive(),
                                 timeout=self.timeout)
 
+    def readinto(self, b):
+        if self.filler.error and self.buffer.length == 0:
+            raise self.filler.error
+
+        return self.buffer.readinto(b, block=self.filler.is_alive(),
+                                    timeout=self.timeout)
+
     def close(self):
         self.filler.stop()
 
@@ -109,4 +155,5 @@ class StreamIOThreadWrapper(io.IOBase):
             self.filler.join()
 
 
-__all__ = ["StreamIOWrapper", "StreamIOIterWrapper", "StreamIOThreadWrapper"]
+__all__ = ["StreamIOWrapper", "StreamIOIterWrapper", "StreamIOThreadWrapper",
+           "iter_readinto"]
@@ -0,0 +1,181 @@
+"""An Event whose timed waits do not poll.
+
+On Python 2 a Condition.wait() with a timeout sleeps in slices of up
+to 50ms until it is notified or the timeout runs out, every waiting
+thread wakes up about 20 times a second. This Event waits without a
+timeout instead, a single timer thread notifies it when the timeout
+runs out. On Python 3 threading.Event already blocks until either
+happens and is used as is.
+"""
+
+import heapq
+import os
+import select
+import threading
+
+from itertools import count
+from threading import Condition, Lock, Thread
+from time import time
+
+from ..compat import is_py2, is_win32
+
+__all__ = ["Event", "condition_wait"]
+
+
+class Timer(Thread):
+    """Calls callbacks at their deadline, it sleeps in select() on
+       a pipe that is written to when an earlier deadline is added."""
+
+    def __init__(self):
+        Thread.__init__(self, name="Thread-livecli-timer")
+        self.daemon = True
+
+        self._lock = Lock()
+        self._heap = []
+        self._count = count()
+        self._cancelled = 0
+        self._read, self._write = os.pipe()
+
+    def schedule(self, deadline, callback):
+        """Calls callback at deadline, returns an entry for cancel()."""
+        entry = [deadline, next(self._count), callback]
+        with self._lock:
+            heapq.heappush(self._heap, entry)
+            earliest = self._heap[0] is entry
+
+        if earliest:
+            os.write(self._write, b"\0")
+
+        return entry
+
+    def cancel(self, entry):
+        with self._lock:
+            if entry[2] is None:
+                return
+
+            entry[2] = None
+            self._cancelled += 1
+
+            # Most waits end before their deadline, drop them from
+            # the heap once they make up half of it
+            if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+                self._heap = [e for e in self._heap if e[2] is not None]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+
+    def run(self):
+        while True:
+            callbacks = []
+            with self._lock:
+                now = time()
+                while self._heap and (self._heap[0][2] is None or self._heap[0][0] <= now):
+                    entry = heapq.heappop(self._heap)
+                    if entry[2] is None:
+                        self._cancelled -= 1
+                    else:
+                        callbacks.append(entry[2])
+                        entry[2] = None
+
+                timeout = self._heap[0][0] - now if self._heap else None
+
+            for callback in callbacks:
+                callback()
+
+            try:
+                readable, _, _ = select.select([self._read], [], [], timeout)
+            except (select.error, OSError):
+                # Interrupted by a signal
+                continue
+
+            if readable:
+                os.read(self._read, 4096)
+
+
+_timer = None
+_timer_lock = Lock()
+
+
+def timer():
+    global _timer
+
+    with _timer_lock:
+        if _timer is None:
+            _timer = Timer()
+            _timer.start()
+
+    return _timer
+
+
+class TimerEvent(object):
+    """A threading.Event that is woken up by the timer thread when
+       a wait times out."""
+
+    def __init__(self):
+        self._cond = Condition(Lock())
+        self._flag = False
+
+    def is_set(self):
+        return self._flag
+
+    isSet = is_set
+
+    def set(self):
+        with self._cond:
+            self._flag = True
+            self._cond.notify_all()
+
+    def clear(self):
+        with self._cond:
+            self._flag = False
+
+    def _notify(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        with self._cond:
+            if self._flag:
+                return True
+
+            if timeout is None:
+                while not self._flag:
+                    self._cond.wait()
+
+                return True
+
+            deadline = time() + timeout
+            entry = timer().schedule(deadline, self._notify)
+            try:
+                # Other waits of this event are notified as well
+                while not self._flag and time() < deadline:
+                    self._cond.wait()
+            finally:
+                timer().cancel(entry)
+
+            return self._flag
+
+
+def _condition_wait(cond, timeout):
+    """Waits on cond, which the caller holds, until it is notified or
+       timeout runs out, the timer thread notifies it then."""
+    def notify():
+        with cond:
+            cond.notify_all()
+
+    entry = timer().schedule(time() + timeout, notify)
+    try:
+        cond.wait()
+    finally:
+        timer().cancel(entry)
+
+
+def _condition_wait_py3(cond, timeout):
+    cond.wait(timeout)
+
+
+if is_py2 and not is_win32:
+    Event = TimerEvent
+    condition_wait = _condition_wait
+else:
+    Event = threading.Event
+    condition_wait = _condition_wait_py3
@@ -58,6 +58,9 @@ class NamedPipe(object):
         if self.pipe:
             windll.kernel32.ConnectNamedPipe(self.pipe, None)
             written = c_ulong(0)
+            if not isinstance(data, bytes):
+                # WriteFile needs a bytes object, not a view of one
+                data = bytes(data)
             windll.kernel32.WriteFile(self.pipe, cast(data, c_void_p),
                                       len(data), byref(written),
                                       None)
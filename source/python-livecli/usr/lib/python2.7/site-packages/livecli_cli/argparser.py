@@ -314,6 +314,24 @@ general.add_argument(
     Default is system locale.
     """
 )
+general.add_argument(
+    "--cache-backend",
+    choices=["json", "memory", "sqlite", "dbm"],
+    default="json",
+    help="""
+    Where plugins and streams cache data such as login tokens and
+    the data of --hls-session-reload.
+
+    json: A JSON file per cache in the Livecli cache directory.
+    memory: Only in memory, nothing is kept after Livecli exits.
+    sqlite: A sqlite database per cache.
+    dbm: A dbm database per cache.
+
+    Backends that are not available fall back to json.
+
+    Default is "json".
+    """
+)
 
 player = parser.add_argument_group("Player options")
 player.add_argument(
@@ -537,6 +555,18 @@ output.add_argument(
     Download directory for --auto-output
     """
 )
+output.add_argument(
+    "--metrics-file",
+    metavar="FILENAME",
+    help="""
+    Write the metrics of the segmented streams to this file as JSON,
+    every 10 seconds and when Livecli exits.
+
+    The metrics include the download time, size and throughput of
+    the segments, retries, decryption time and how full the buffer is.
+    With --server they are also available at /metrics.
+    """
+)
 
 server = parser.add_argument_group("Server options")
 server.add_argument(
@@ -553,6 +583,9 @@ server.add_argument(
 
     An IPTV M3U Playlist Generator for Livecli can be found at https://github.com/livecli/iptv
 
+    The metrics of all streams are available at /metrics, in the
+    Prometheus text format.
+
     Note: This command should be only used on a local network!
     """
 )
@@ -774,6 +807,21 @@ transport.add_argument(
     Default is 1.
     """
 )
+transport.add_argument(
+    "--hls-segment-threads-max",
+    type=num(int, max=10),
+    metavar="THREADS",
+    help="""
+    Enables the adaptive thread pool for HLS segments.
+
+    The number of concurrent segment downloads is adjusted between
+    --hls-segment-threads and this value, based on how long a segment
+    takes to download compared to the playlist target duration.
+    Maximum value is 10.
+
+    Default is disabled.
+    """
+)
 transport.add_argument(
     "--hls-segment-timeout",
     type=num(float, min=0),
@@ -783,6 +831,64 @@ transport.add_argument(
 
     Default is 10.0.
     """)
+transport.add_argument(
+    "--hls-segment-cache-size",
+    metavar="SIZE",
+    type=filesize,
+    help="""
+    Enables the on-disk cache of HLS segments and limits its size.
+    Add a M or K suffix to specify mega or kilo bytes instead of bytes.
+
+    Segments are stored after decryption and replayed from the cache
+    when the same VOD or catch-up stream is opened again. The least
+    recently used segments are removed first.
+
+    Only playlists with an end (VOD) are cached,
+    see --hls-segment-cache-live.
+
+    Default is disabled.
+    """
+)
+transport.add_argument(
+    "--hls-segment-cache-dir",
+    metavar="DIR",
+    help="""
+    The directory of the HLS segment cache.
+
+    Default is a "segments" directory in the livecli cache directory.
+    """
+)
+transport.add_argument(
+    "--hls-segment-cache-live",
+    action="store_true",
+    help="""
+    Also cache the segments of live HLS playlists.
+
+    Useful for timeshift playlists that are replayed before they end.
+    """
+)
+transport.add_argument(
+    "--hls-segment-coalesce",
+    metavar="SIZE",
+    type=filesize,
+    help="""
+    The maximum size of a request that fetches adjacent EXT-X-BYTERANGE
+    segments of the same URI at once. Add a M or K suffix to specify
+    mega or kilo bytes instead of bytes.
+
+    Byterange playlists usually split a single file into segments,
+    fetching them together saves a request per segment.
+
+    Default is 8M.
+    """
+)
+transport.add_argument(
+    "--hls-segment-no-coalesce",
+    action="store_true",
+    help="""
+    Fetch every EXT-X-BYTERANGE segment with its own request.
+    """
+)
 transport.add_argument(
     "--hls-segment-ignore-names",
     metavar="NAMES",
@@ -1203,6 +1309,36 @@ http.add_argument(
     Default is 20.0.
     """
 )
+http.add_argument(
+    "--http-pool-connections",
+    metavar="COUNT",
+    type=num(int, min=1),
+    help="""
+    How many hosts to keep HTTP connection pools for.
+
+    Default is to size it from the number of active streams, but at
+    least 10.
+    """
+)
+http.add_argument(
+    "--http-pool-maxsize",
+    metavar="COUNT",
+    type=num(int, min=1),
+    help="""
+    How many idle connections to keep alive per host.
+
+    Default is to size it from the segment threads of the active
+    streams, but at least 10.
+    """
+)
+http.add_argument(
+    "--http-pool-block",
+    action="store_true",
+    help="""
+    Wait for a free connection instead of opening a new one when
+    the connection pool of a host is exhausted.
+    """
+)
 
 
 plugin = parser.add_argument_group("Plugin options")
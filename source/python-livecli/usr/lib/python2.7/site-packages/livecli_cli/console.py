@@ -24,6 +24,7 @@ class ConsoleOutput(object):
 
     def ask(self, msg, *args, **kwargs):
         formatted = msg.format(*args, **kwargs)
+        self.livecli.logger.flush()
         sys.stderr.write(formatted)
 
         try:
@@ -35,6 +36,7 @@ class ConsoleOutput(object):
 
     def askpass(self, msg, *args, **kwargs):
         formatted = msg.format(*args, **kwargs)
+        self.livecli.logger.flush()
 
         return getpass(formatted)
 
@@ -42,6 +44,8 @@ class ConsoleOutput(object):
         formatted = msg.format(*args, **kwargs)
         formatted = u"{0}\n".format(formatted)
 
+        # Log messages are written by a thread, keep them in order
+        self.livecli.logger.flush()
         self.output.write(formatted)
 
     def msg_json(self, obj):
@@ -1,5 +1,6 @@
 from __future__ import print_function
 
+import atexit
 import errno
 import os
 import platform
@@ -12,9 +13,9 @@ import webbrowser
 from contextlib import closing
 from datetime import datetime
 from distutils.version import StrictVersion
-from functools import partial
 from itertools import chain
 from socks import __version__ as socks_version
+from threading import Thread
 from time import sleep
 from websocket import __version__ as websocket_version
 
@@ -30,6 +31,7 @@ from livecli.compat import is_py2
 from livecli.compat import is_win32
 from livecli.compat import str
 from livecli.stream import StreamProcess
+from livecli.stream import iter_readinto
 from livecli.plugins.twitch import TWITCH_CLIENT_ID
 
 from .argparser import parser
@@ -40,6 +42,7 @@ from .output import FileOutput, PlayerOutput
 from .utils import NamedPipe, HTTPServer, ignored, progress, stream_to_url
 from .utils import server_HTTPRequest
 from .utils import server_ThreadedHTTPServer
+from .utils import server_metrics
 
 ACCEPTABLE_ERRNO = (errno.EPIPE, errno.EINVAL, errno.ECONNRESET)
 try:
@@ -47,6 +50,7 @@ try:
 except AttributeError:
     pass  # Not windows
 QUIET_OPTIONS = ("json", "stream_url", "subprocess_cmdline", "quiet")
+METRICS_INTERVAL = 10
 
 args = console = livecli = plugin = stream_fd = output = None
 
@@ -339,7 +343,7 @@ def read_stream(stream, output, prebuffer, chunk_size=8192):
 
     stream_iterator = chain(
         [prebuffer],
-        iter(partial(stream.read, chunk_size), b"")
+        iter_readinto(stream, chunk_size)
     )
     if show_progress:
         stream_iterator = progress(stream_iterator,
@@ -722,6 +726,15 @@ def setup_http_session():
     if args.http_timeout:
         livecli.set_option("http-timeout", args.http_timeout)
 
+    if args.http_pool_connections:
+        livecli.set_option("http-pool-connections", args.http_pool_connections)
+
+    if args.http_pool_maxsize:
+        livecli.set_option("http-pool-maxsize", args.http_pool_maxsize)
+
+    if args.http_pool_block:
+        livecli.set_option("http-pool-block", True)
+
     if args.http_cookies:
         livecli.set_option("http-cookies", args.http_cookies)
 
@@ -741,6 +754,24 @@ def setup_plugins():
         load_plugins(args.plugin_dirs)
 
 
+def setup_metrics(metrics):
+    """Writes the metrics to --metrics-file periodically and at exit."""
+    def dump():
+        with ignored(IOError, OSError):
+            metrics.dump(args.metrics_file)
+
+    def run():
+        while True:
+            sleep(METRICS_INTERVAL)
+            dump()
+
+    thread = Thread(target=run, name="Thread-livecli-metrics")
+    thread.daemon = True
+    thread.start()
+
+    atexit.register(dump)
+
+
 def setup_livecli():
     """Creates the Livecli session."""
     global livecli
@@ -762,9 +793,27 @@ def setup_options():
     if args.hls_segment_threads:
         livecli.set_option("hls-segment-threads", args.hls_segment_threads)
 
+    if args.hls_segment_threads_max:
+        livecli.set_option("hls-segment-threads-max", args.hls_segment_threads_max)
+
     if args.hls_segment_timeout:
         livecli.set_option("hls-segment-timeout", args.hls_segment_timeout)
 
+    if args.hls_segment_cache_size:
+        livecli.set_option("hls-segment-cache-size", args.hls_segment_cache_size)
+
+    if args.hls_segment_cache_dir:
+        livecli.set_option("hls-segment-cache-dir", args.hls_segment_cache_dir)
+
+    if args.hls_segment_cache_live:
+        livecli.set_option("hls-segment-cache-live", args.hls_segment_cache_live)
+
+    if args.hls_segment_coalesce:
+        livecli.set_option("hls-segment-coalesce", args.hls_segment_coalesce)
+
+    if args.hls_segment_no_coalesce:
+        livecli.set_option("hls-segment-coalesce", 0)
+
     if args.hls_segment_ignore_names:
         livecli.set_option("hls-segment-ignore-names", args.hls_segment_ignore_names)
 
@@ -848,6 +897,7 @@ def setup_options():
     livecli.set_option("subprocess-errorlog", args.subprocess_errorlog)
     livecli.set_option("subprocess-errorlog-path", args.subprocess_errorlog_path)
     livecli.set_option("locale", args.locale)
+    livecli.set_option("cache-backend", args.cache_backend)
 
 
 def setup_plugin_options():
@@ -1068,7 +1118,7 @@ def log_current_versions():
 
 def check_version(force=False):
     console.logger.debug("run ... check_version")
-    cache = Cache(filename="cli.json")
+    cache = Cache(filename="cli.json", session=livecli)
     latest_version = cache.get("latest_version")
 
     if force or not latest_version:
@@ -1103,7 +1153,8 @@ def cache_stream_data(cache_stream_name, cache_stream_url):
     """
     cache = Cache(
         filename="streamdata.json",
-        key_prefix="cache:{0}".format(cache_stream_url)
+        key_prefix="cache:{0}".format(cache_stream_url),
+        session=livecli
     )
     cache.set("cache_stream_name", cache_stream_name, (args.hls_session_reload + 60))
     cache.set("cache_url", args.url, (args.hls_session_reload + 60))
@@ -1157,6 +1208,9 @@ def main():
     check_root()
     log_current_versions()
 
+    if args.metrics_file:
+        setup_metrics(server_metrics if args.server else livecli.metrics)
+
     if args.version_check or args.auto_version_check:
         with ignored(Exception):
             check_version(force=args.version_check)
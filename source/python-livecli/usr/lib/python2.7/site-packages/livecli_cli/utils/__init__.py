@@ -9,10 +9,11 @@ from .player import find_default_player
 from .stream import stream_to_url
 from .multi_server import HTTPRequest as server_HTTPRequest
 from .multi_server import ThreadedHTTPServer as server_ThreadedHTTPServer
+from .multi_server import metrics as server_metrics
 
 __all__ = [
     "NamedPipe", "HTTPServer", "JSONEncoder",
-    "server_HTTPRequest", "server_ThreadedHTTPServer",
+    "server_HTTPRequest", "server_ThreadedHTTPServer", "server_metrics",
     "find_default_player", "ignored", "progress", "stream_to_url"
 ]
 
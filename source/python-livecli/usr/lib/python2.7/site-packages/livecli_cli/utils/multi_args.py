@@ -60,17 +60,24 @@ def command_session(session, old_data):
         # set_option_store_true
         "ffmpeg-verbose": "set_option_store_true",
         "hls-live-restart": "set_option_store_true",
+        "hls-segment-cache-live": "set_option_store_true",
         "http-disable-dh": "set_option_store_true",
+        "http-pool-block": "set_option_store_true",
         "resolve-turn-off": "set_option_store_true",
         # set_option_comma_list
         "hls-segment-ignore-names": "set_option_comma_list",
+        # set_option_filesize
+        "hls-segment-cache-size": "set_option_filesize",
+        "hls-segment-coalesce": "set_option_filesize",
         # set_option
+        "cache-backend": "set_option",
         "ffmpeg-audio-transcode": "set_option",
         "ffmpeg-ffmpeg": "set_option",
         "ffmpeg-verbose-path": "set_option",
         "ffmpeg-video-transcode": "set_option",
         "hls-audio-select": "set_option",
         "hls-key-uri": "set_option",
+        "hls-segment-cache-dir": "set_option",
         "http-proxy": "set_option",
         "http-ssl-cert": "set_option",
         "https-proxy": "set_option",
@@ -89,8 +96,11 @@ def command_session(session, old_data):
         "hls-segment-attempts": "set_option_num",
         "hls-segment-ignore-number": "set_option_num",
         "hls-segment-threads": "set_option_num",
+        "hls-segment-threads-max": "set_option_num",
         "hls-segment-timeout": "set_option_num",
         "hls-timeout": "set_option_num",
+        "http-pool-connections": "set_option_num",
+        "http-pool-maxsize": "set_option_num",
         "http-stream-timeout": "set_option_num",
         "http-timeout": "set_option_num",
         "rtmp-timeout": "set_option_num",
@@ -141,7 +151,6 @@ def command_session(session, old_data):
         "npo-subtitles": "set_plugin_option_store_true",
         "pluzz-mux-subtitles": "set_plugin_option_store_true",
         "rtve-mux-subtitles": "set_plugin_option_store_true",
-        "twitch-oauth-authenticate": "set_plugin_option_store_true",
         "zattoo-purge-credentials": "set_plugin_option_store_true",
     }
 
@@ -157,13 +166,17 @@ def command_session(session, old_data):
         "crunchyroll-password": ("crunchyroll", "password"),
         "crunchyroll-session-id": ("crunchyroll", "session_id"),
         "crunchyroll-username": ("crunchyroll", "username"),
-        "funimation-language": ("funimation", "language"),
+        "funimation-language": ("funimationnow", "language"),
+        "funimation-mux-subtitles": ("funimationnow", "mux_subtitles"),
         "liveedu-email": ("liveedu", "email"),
         "liveedu-password": ("liveedu", "password"),
+        "npo-subtitles": ("npo", "subtitles"),
+        "pluzz-mux-subtitles": ("pluzz", "mux_subtitles"),
         "resolve-blacklist-netloc": ("resolve", "blacklist_netloc"),
         "resolve-blacklist-path": ("resolve", "blacklist_path"),
         "resolve-whitelist-netloc": ("resolve", "whitelist_netloc"),
         "resolve-whitelist-path": ("resolve", "whitelist_path"),
+        "rtve-mux-subtitles": ("rtve", "mux_subtitles"),
         "schoolism-email": ("schoolism", "email"),
         "schoolism-part": ("schoolism", "part"),
         "schoolism-password": ("schoolism", "password"),
@@ -175,13 +188,21 @@ def command_session(session, old_data):
         "wwenetwork-password": ("wwenetwork", "password"),
         "zattoo-email": ("zattoo", "email"),
         "zattoo-password": ("zattoo", "password"),
+        "zattoo-purge-credentials": ("zattoo", "purge_credentials"),
+    }
+
+    # keyvalue options are collected into the dict of the session option
+    set_option_key = {
+        "http-cookie": "http-cookies",
+        "http-header": "http-headers",
+        "http-query-param": "http-query-params",
     }
 
     data_other = {}
     for cmd, value in old_data:
         status_cmd = valid_cmd.get(cmd)
-        if status_cmd == ("set_plugin_option_value" or
-                          "set_plugin_option_comma_list" or
+        if status_cmd in ("set_plugin_option_value",
+                          "set_plugin_option_comma_list",
                           "set_plugin_option_store_true"):
             for plugin_name, plugin_option in [set_plugin_option[cmd]]:
                 if status_cmd == "set_plugin_option_comma_list":
@@ -189,11 +210,10 @@ def command_session(session, old_data):
                 elif status_cmd == "set_plugin_option_store_true":
                     value = True
                 session.set_plugin_option(plugin_name, plugin_option, value)
-        elif status_cmd == ("set_option" or
-                            "set_option_num" or
-                            "set_option_comma_list" or
-                            "set_option_store_true" or
-                            "set_option_key"):
+        elif status_cmd in ("set_option",
+                            "set_option_num",
+                            "set_option_comma_list",
+                            "set_option_store_true"):
             if status_cmd == "set_option_num":
                 try:
                     value = int(value)
@@ -203,9 +223,22 @@ def command_session(session, old_data):
                 value = comma_list(value)
             elif status_cmd == "set_option_store_true":
                 value = True
-            elif status_cmd == "set_option_key":
-                value = keyvalue(value)
             session.set_option(cmd, value)
+        elif status_cmd == "set_option_filesize":
+            try:
+                value = filesize(value)
+            except ValueError:
+                # 0 turns the option off
+                if value.strip() != "0":
+                    continue
+                value = 0
+            session.set_option(cmd, value)
+        elif status_cmd == "set_option_key":
+            try:
+                value = keyvalue(value)
+            except ValueError:
+                continue
+            session.set_option(set_option_key[cmd], dict([value]))
         elif status_cmd == "http-no-ssl-verify":
             session.set_option("http-ssl-verify", False)
         elif status_cmd == "http-ignore-env":
@@ -213,7 +246,7 @@ def command_session(session, old_data):
         elif status_cmd == "ringbuffer-size":
             value = filesize(value)
             session.set_option(cmd, value)
-        elif status_cmd == ("data_other" or "data_other_comma_list"):
+        elif status_cmd in ("data_other", "data_other_comma_list"):
             if status_cmd == "data_other_comma_list":
                 value = comma_list(value)
             data_other[cmd] = value
@@ -10,14 +10,22 @@ import errno
 import os
 import socket
 
+from collections import deque
+from itertools import islice
+from threading import Condition, Event, Lock, Thread
+
 from livecli import Livecli
 from livecli import StreamError
 from livecli.cache import Cache
 from livecli.compat import parse_qsl
 from livecli.compat import unquote_plus
 from livecli.compat import urlparse
+from livecli.metrics import Metrics
 from livecli.stream import HDSStream
+from livecli.stream import HLSStream
 from livecli.stream import HTTPStream
+from livecli.stream import iter_readinto
+from livecli.utils.events import condition_wait
 
 from .multi_args import command_session
 
@@ -47,9 +55,245 @@ except ImportError:
     is_kodi = False
 
 
+# query parameters that only affect a single client
+CLIENT_OPTIONS = ("cache", "l", "loglevel")
+
+# Shared streams are chunked on MPEG-TS packet boundaries, so that
+# clients joining late or skipped forward start with a whole packet
+TS_PACKET_SIZE = 188
+
+# Seconds a client waits for a chunk before it checks the upstream thread
+CHUNK_TIMEOUT = 5.0
+
+# The streams of all requests are recorded together for /metrics
+metrics = Metrics()
+
+
+class StreamFanout(object):
+    """Shares one opened stream between every client requesting it.
+
+    A single upstream thread reads the stream into a list of chunks,
+    each client keeps its own cursor into it. The oldest chunks are
+    dropped when the backlog exceeds max_size, clients that fell behind
+    are skipped forward and dropped if it keeps happening.
+    """
+
+    streams = {}
+    streams_lock = Lock()
+    max_skips = 3
+
+    def __init__(self, key):
+        self.key = key
+        self.clients = 0
+        self.closed = False
+        self.fd = None
+        self.logger = None
+        self.ready = Event()
+        self.thread = None
+
+        self.chunks = deque()
+        self.chunks_lock = Condition()
+        self.offset = 0
+        self.size = 0
+        self.max_size = 0
+
+    @classmethod
+    def join(cls, key):
+        """Returns the fanout of key and whether the caller has
+           to open the stream for it."""
+        with cls.streams_lock:
+            fanout = cls.streams.get(key)
+            owner = fanout is None
+            if owner:
+                fanout = cls.streams[key] = cls(key)
+
+            fanout.clients += 1
+
+        return fanout, owner
+
+    def leave(self):
+        with self.streams_lock:
+            self.clients -= 1
+            last = self.clients <= 0
+
+            # Removed right away, a client joining now opens a new stream
+            # instead of getting this one while it is closed
+            if last and self.streams.get(self.key) is self:
+                del self.streams[self.key]
+
+        if last:
+            self.close()
+
+    def start(self, fd, chunk_size, max_size, logger):
+        """Starts reading the opened stream, called by the owner."""
+        self.fd = fd
+        self.logger = logger
+        self.max_size = max_size
+
+        self.thread = Thread(target=self._read, args=(chunk_size,))
+        self.thread.daemon = True
+        self.thread.start()
+
+        self.ready.set()
+
+    def abort(self):
+        """Gives up on sharing, waiting clients open their own stream."""
+        self.close()
+        self.ready.set()
+
+    def close(self):
+        with self.streams_lock:
+            if self.streams.get(self.key) is self:
+                del self.streams[self.key]
+
+        with self.chunks_lock:
+            if self.closed:
+                return
+
+            self.closed = True
+            self.chunks_lock.notify_all()
+
+        if self.fd:
+            self.fd.close()
+
+    def _read(self, chunk_size):
+        chunk_size = max(chunk_size - chunk_size % TS_PACKET_SIZE, TS_PACKET_SIZE)
+
+        # Short reads are completed with the next read, so that every
+        # chunk is a whole number of packets
+        rest = b""
+        try:
+            for buff in iter_readinto(self.fd, chunk_size):
+                if self.closed:
+                    break
+
+                data = rest + bytes(buff)
+                end = len(data) - len(data) % TS_PACKET_SIZE
+                rest = data[end:]
+                if end:
+                    self._put(data[:end])
+
+            if rest and not self.closed:
+                self._put(rest)
+        except (IOError, StreamError) as err:
+            if not self.closed:
+                self.logger.error("Error reading shared stream: {0}".format(err))
+        except Exception as err:
+            if not self.closed:
+                self.logger.error("Unexpected error reading shared stream: {0!r}".format(err))
+        finally:
+            # The clients stop waiting for chunks
+            self.close()
+
+    def _put(self, chunk):
+        with self.chunks_lock:
+            self.chunks.append(chunk)
+            self.size += len(chunk)
+
+            while self.size > self.max_size and len(self.chunks) > 1:
+                self.size -= len(self.chunks.popleft())
+                self.offset += 1
+
+            self.chunks_lock.notify_all()
+
+    def iter_chunks(self, owner):
+        """Yields the chunks of the stream for a single client, the owner
+           starts from the beginning and other clients at the live edge."""
+        skips = 0
+        with self.chunks_lock:
+            cursor = 0 if owner else self.offset + len(self.chunks)
+
+        while True:
+            with self.chunks_lock:
+                while cursor >= self.offset + len(self.chunks) and not self.closed:
+                    condition_wait(self.chunks_lock, CHUNK_TIMEOUT)
+
+                    # The upstream thread always closes the fanout,
+                    # this guards against it dying without doing so
+                    if not self.thread.is_alive() and not self.closed:
+                        self.logger.error("Shared stream stopped without closing")
+                        break
+
+                if cursor < self.offset:
+                    skips += 1
+                    if skips > self.max_skips:
+                        self.logger.error("Dropping client, it can not keep up with the stream")
+                        return
+
+                    self.logger.warning("Client fell behind, skipping {0} chunks".format(self.offset - cursor))
+                    cursor = self.offset
+
+                chunks = list(islice(self.chunks, cursor - self.offset, None))
+
+            if not chunks:
+                return
+
+            cursor += len(chunks)
+            for chunk in chunks:
+                yield chunk
+
+
+def _stream_key(data):
+    """Clients requesting the same url, quality and options
+       share a single stream."""
+    return tuple(sorted((k, v) for k, v in data if k not in CLIENT_OPTIONS))
+
+
+def _write_stream(HTTPBase, logger, chunks):
+    HTTPBase._headers(200, "video/unknown")
+    try:
+        for buff in chunks:
+            HTTPBase.wfile.write(buff)
+        logger.error("No Data!")
+        HTTPBase.wfile.close()
+    except socket.error as e:
+        if isinstance(e.args, tuple):
+            if e.errno == errno.EPIPE:
+                # remote peer disconnected
+                logger.info("Detected remote disconnect")
+                pass
+            else:
+                logger.error(str(e))
+        else:
+            logger.error(str(e))
+
+
 def _play_stream(HTTPBase):
+    """Plays the stream, clients requesting the same stream
+       share a single livecli session."""
+    old_data = parse_qsl(urlparse(HTTPBase.path).query)
+    data = []
+    for k, v in old_data:
+        data += [(unquote_plus(k), unquote_plus(v))]
+
+    fanout, owner = StreamFanout.join(_stream_key(data))
+    try:
+        if not owner:
+            fanout.ready.wait()
+            if fanout.fd:
+                logger = fanout.logger
+                logger.info("Client: {0}".format(HTTPBase.client_address))
+                logger.info("Joining shared stream, {0} clients".format(fanout.clients))
+                _write_stream(HTTPBase, logger, fanout.iter_chunks(owner))
+                logger.info("Client left the shared stream")
+                return
+
+            # The stream could not be shared, open it without fanout
+            fanout.leave()
+            fanout, owner = None, False
+
+        _open_stream(HTTPBase, data, fanout)
+    finally:
+        if fanout:
+            if owner and not fanout.ready.is_set():
+                fanout.abort()
+            fanout.leave()
+
+
+def _open_stream(HTTPBase, data, fanout=None):
     """Creates a livecli session and plays the stream."""
     session = Livecli()
+    session.metrics = metrics
     session.set_logprefix("[ID-{0}]".format(str(int(time()))[4:]))
     logger = session.logger.new_module("livecli-server")
     session.set_loglevel("info")
@@ -62,11 +306,6 @@ def _play_stream(HTTPBase):
     if os.path.isdir(PLUGINS_DIR):
         session.load_plugins(PLUGINS_DIR)
 
-    old_data = parse_qsl(urlparse(HTTPBase.path).query)
-    data = []
-    for k, v in old_data:
-        data += [(unquote_plus(k), unquote_plus(v))]
-
     data_other, session = command_session(session, data)
 
     url = data_other.get("url")
@@ -74,14 +313,15 @@ def _play_stream(HTTPBase):
         HTTPBase._headers(404, "text/html")
         logger.error("No URL provided.")
         return
-    quality = (data_other.get("q") or
-               data_other.get("quality") or
-               data_other.get("stream") or
-               data_other.get("default-stream") or
-               "best")
+    # A comma separated list, the first available stream is played
+    qualities = (data_other.get("q") or
+                 data_other.get("quality") or
+                 data_other.get("stream") or
+                 data_other.get("default-stream") or
+                 ["best"])
     try:
-        cache = data_other.get("cache") or 4096
-    except TypeError:
+        cache = int(data_other.get("cache") or 4096)
+    except (TypeError, ValueError):
         cache = 4096
 
     loglevel = data_other.get("l") or data_other.get("loglevel") or "debug"
@@ -97,12 +337,12 @@ def _play_stream(HTTPBase):
         HTTPBase._headers(404, "text/html")
         return
 
-    # XXX: only one quality will work currently
-    try:
-        stream = streams[quality]
-    except KeyError:
-        stream = streams["best"]
+    for quality in qualities:
+        if quality in streams:
+            break
+    else:
         quality = "best"
+    stream = streams[quality]
 
     if isinstance(stream, HTTPStream) is False and isinstance(stream, HDSStream) is False:
         # allow only http based streams: HDS HLS HTTP
@@ -114,7 +354,8 @@ def _play_stream(HTTPBase):
     if hls_session_reload:
         livecli_cache = Cache(
             filename="streamdata.json",
-            key_prefix="cache:{0}".format(stream.url)
+            key_prefix="cache:{0}".format(stream.url),
+            session=session
         )
         livecli_cache.set("cache_stream_name", quality, (int(hls_session_reload) + 60))
         livecli_cache.set("cache_url", url, (int(hls_session_reload) + 60))
@@ -127,26 +368,21 @@ def _play_stream(HTTPBase):
         logger.error("Could not open stream: {0}".format(err))
         return
 
-    HTTPBase._headers(200, "video/unknown")
-    try:
-        logger.debug("Pre-buffering {0} bytes".format(cache))
-        while True:
-            buff = fd.read(cache)
-            if not buff:
-                logger.error("No Data!")
-                break
-            HTTPBase.wfile.write(buff)
-        HTTPBase.wfile.close()
-    except socket.error as e:
-        if isinstance(e.args, tuple):
-            if e.errno == errno.EPIPE:
-                # remote peer disconnected
-                logger.info("Detected remote disconnect")
-                pass
-            else:
-                logger.error(str(e))
+    logger.debug("Pre-buffering {0} bytes".format(cache))
+    if fanout and isinstance(stream, HLSStream):
+        # MPEG-TS can be joined at any point, other formats
+        # need their header and are not shared
+        fanout.start(fd, cache, session.get_option("ringbuffer-size"), logger)
+        _write_stream(HTTPBase, logger, fanout.iter_chunks(True))
+        if fanout.closed:
+            logger.info("Stream ended")
         else:
-            logger.error(str(e))
+            logger.info("Client left the shared stream")
+        return
+    elif fanout:
+        fanout.abort()
+
+    _write_stream(HTTPBase, logger, iter_readinto(fd, cache))
 
     fd.close()
     logger.info("Stream ended")
@@ -169,6 +405,9 @@ class HTTPRequest(BaseHTTPRequestHandler):
         """Respond to a GET request."""
         if self.path.startswith("/play/"):
             _play_stream(self)
+        elif self.path == "/metrics":
+            self._headers(200, "text/plain; version=0.0.4")
+            self.wfile.write(metrics.text().encode("utf8"))
         else:
             self._headers(404, "text/html")
 
@@ -37,23 +37,55 @@ try:
 except ImportError:
     numpy = None
 
+# Translation tables that XOR every byte with a value, by value
+_xor_tables = {}
+
+
+def _xor_table(value):
+    table = _xor_tables.get(value)
+    if table is None:
+        table = _xor_tables[value] = bytes(bytearray(b ^ value for b in range(256)))
+    return table
+
+
+def _mask_bytes(_m, _d):
+    # Every fourth byte is XORed with the same byte of the mask key,
+    # translate() does that for a whole slice in one call
+    _m = bytearray(_m)
+    masked = bytearray(len(_d))
+    for i in range(4):
+        masked[i::4] = _d[i::4].translate(_xor_table(_m[i]))
+
+    return bytes(masked)
+
+
+def _mask_loop(_m, _d):
+    _m = array.array("B", _m)
+    _d = array.array("B", _d)
+    for i in range(len(_d)):
+        _d[i] ^= _m[i % 4]
+
+    if six.PY3:
+        return _d.tobytes()
+    else:
+        return _d.tostring()
+
+
 try:
     # If wsaccel is available we use compiled routines to mask data.
     if not numpy:
         from wsaccel.xormask import XorMaskerSimple
 
         def _mask(_m, _d):
-            return XorMaskerSimple(_m).process(_d)
+            return XorMaskerSimple(array.array("B", _m)).process(array.array("B", _d))
 except ImportError:
     # wsaccel is not available, we rely on python implementations.
     def _mask(_m, _d):
-        for i in range(len(_d)):
-            _d[i] ^= _m[i % 4]
+        # The slices cost more than the loop for a few bytes
+        if len(_d) < 16:
+            return _mask_loop(_m, _d)
 
-        if six.PY3:
-            return _d.tobytes()
-        else:
-            return _d.tostring()
+        return _mask_bytes(_m, _d)
 
 
 __all__ = [
@@ -279,9 +311,7 @@ class ABNF(object):
               return masked.tobytes()[:origlen]
             return masked.tobytes()
         else:
-            _m = array.array("B", mask_key)
-            _d = array.array("B", data)
-            return _mask(_m, _d)
+            return _mask(mask_key, data)
 
 
 class frame_buffer(object):
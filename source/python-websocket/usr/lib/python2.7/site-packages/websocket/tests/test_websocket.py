@@ -12,6 +12,7 @@ import six
 
 # websocket-client
 import websocket as ws
+from websocket._abnf import ABNF
 from websocket._handshake import _create_sec_websocket_key, \
     _validate as _validate_header
 from websocket._http import read_headers
@@ -560,6 +561,17 @@ class UtilsTest(unittest.TestCase):
         state = validate_utf8(six.b(''))
         self.assertEqual(state, True)
 
+    def testMask(self):
+        mask_key = six.b('\x01\x80\xfe\x3c')
+        for size in (0, 1, 3, 4, 15, 16, 17, 125, 1000, 65537):
+            data = os.urandom(size)
+            expected = bytearray(data)
+            for i in range(size):
+                expected[i] ^= bytearray(mask_key)[i % 4]
+            masked = ABNF.mask(mask_key, data)
+            self.assertEqual(masked, bytes(expected))
+            self.assertEqual(ABNF.mask(mask_key, masked), data)
+
 class ProxyInfoTest(unittest.TestCase):
     def setUp(self):
         self.http_proxy = os.environ.get("http_proxy", None)
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Options of --server requests, as applied by command_session.
+
+    python -m pytest tests
+"""
+
+import glob
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[0:0] = sorted(glob.glob(os.path.join(ROOT, "source", "*", "usr", "lib",
+                                              "python2.7", "site-packages")))
+
+from livecli_cli.utils.multi_args import command_session  # noqa: E402
+
+
+class Session(object):
+    """Records the options that are set."""
+
+    def __init__(self):
+        self.options = {}
+        self.plugin_options = {}
+
+    def set_option(self, key, value):
+        self.options[key] = value
+
+    def set_plugin_option(self, plugin, key, value):
+        self.plugin_options[(plugin, key)] = value
+
+
+def apply(*data):
+    session = Session()
+    data_other, session = command_session(session, list(data))
+    return data_other, session
+
+
+class TestCommandSession(unittest.TestCase):
+    def test_set_option(self):
+        data_other, session = apply(("cache-backend", "sqlite"),
+                                    ("hls-segment-cache-dir", "/tmp/segments"))
+        self.assertEqual(session.options, {"cache-backend": "sqlite",
+                                           "hls-segment-cache-dir": "/tmp/segments"})
+
+    def test_set_option_num(self):
+        data_other, session = apply(("hls-segment-threads", "2"),
+                                    ("hls-segment-threads-max", "8"),
+                                    ("http-pool-connections", "4"),
+                                    ("http-pool-maxsize", "16"),
+                                    ("hls-live-edge", "invalid"))
+        self.assertEqual(session.options, {"hls-segment-threads": 2,
+                                           "hls-segment-threads-max": 8,
+                                           "http-pool-connections": 4,
+                                           "http-pool-maxsize": 16})
+
+    def test_set_option_store_true(self):
+        data_other, session = apply(("hls-segment-cache-live", "1"),
+                                    ("http-pool-block", "1"))
+        self.assertEqual(session.options, {"hls-segment-cache-live": True,
+                                           "http-pool-block": True})
+
+    def test_set_option_comma_list(self):
+        data_other, session = apply(("hls-segment-ignore-names", "a, b"))
+        self.assertEqual(session.options, {"hls-segment-ignore-names": ["a", "b"]})
+
+    def test_set_option_filesize(self):
+        data_other, session = apply(("hls-segment-cache-size", "64M"))
+        self.assertEqual(session.options, {"hls-segment-cache-size": 64 * 1024 * 1024})
+
+        data_other, session = apply(("hls-segment-cache-size", "invalid"))
+        self.assertEqual(session.options, {})
+
+        data_other, session = apply(("hls-segment-coalesce", "0"))
+        self.assertEqual(session.options, {"hls-segment-coalesce": 0})
+
+        data_other, session = apply(("hls-segment-coalesce", "-1"))
+        self.assertEqual(session.options, {})
+
+    def test_set_option_key(self):
+        data_other, session = apply(("http-header", "User-Agent=livecli"),
+                                    ("http-cookie", "invalid"))
+        self.assertEqual(session.options, {"http-headers": {"User-Agent": "livecli"}})
+
+    def test_set_plugin_option(self):
+        data_other, session = apply(("twitch-oauth-token", "token"),
+                                    ("resolve-blacklist-netloc", "a.com,b.com"),
+                                    ("npo-subtitles", "1"))
+        self.assertEqual(session.plugin_options,
+                         {("twitch", "oauth_token"): "token",
+                          ("resolve", "blacklist_netloc"): ["a.com", "b.com"],
+                          ("npo", "subtitles"): True})
+
+    def test_data_other(self):
+        data_other, session = apply(("url", "http://example.com"),
+                                    ("q", "720p,best"))
+        self.assertEqual(data_other, {"url": "http://example.com",
+                                      "q": ["720p", "best"]})
+        self.assertEqual(session.options, {})
+
+    def test_http_pool(self):
+        """The pool options of a request size the pools of its session."""
+        from livecli import Livecli
+
+        session = Livecli()
+        command_session(session, [("http-pool-connections", "4"),
+                                  ("http-pool-maxsize", "16"),
+                                  ("http-pool-block", "1"),
+                                  ("hls-segment-threads-max", "8")])
+
+        self.assertEqual(session.http.pool_connections, 4)
+        self.assertEqual(session.http.pool_maxsize, 16)
+        self.assertTrue(session.http.pool_block)
+        self.assertEqual(session.get_option("hls-segment-threads-max"), 8)
+
+        adapter = session.http.get_adapter("https://")
+        self.assertEqual((adapter._pool_connections, adapter._pool_maxsize,
+                          adapter._pool_block), (4, 16, True))
+
+
+if __name__ == "__main__":
+    unittest.main()